@@ -22,6 +22,46 @@ class PaintStep:
         sq = grid[self.affected_grid_square[0]][self.affected_grid_square[1]]
         sq.add(self.affected_layer)
 
+@dataclass
+class EraseStep(PaintStep):
+    """
+    A layer erased from a square: the reverse of a PaintStep.
+    The erased copy is the one at `position` in the square's stack_state(),
+    whichever layer the store's own erase() would remove, and undoing puts
+    it back there, so the square returns exactly to its earlier state.
+    """
+
+    position: int
+
+    @classmethod
+    def erase(cls, grid: Grid, square: tuple[int, int], layer: Layer) -> EraseStep | None:
+        """
+        Erase the newest copy of `layer` from a square.
+
+        Returns:
+        - the step taken, or None if the square doesn't hold the layer.
+
+        Complexity:
+        -Worst Case: O(n*add), rebuilding the square's n layers
+        -Best Case: O(n), the layer isn't there
+        """
+        layers = grid[square[0]][square[1]].stack_state()[0]
+        if layer.index not in layers:
+            return None
+        step = cls(square, layer, len(layers) - 1 - layers[::-1].index(layer.index))
+        step.redo_apply(grid)
+        return step
+
+    def undo_apply(self, grid: Grid):
+        sq = grid[self.affected_grid_square[0]][self.affected_grid_square[1]]
+        layers, inverted = sq.stack_state()
+        sq.restore_state(layers[:self.position] + (self.affected_layer.index,) + layers[self.position:], inverted)
+
+    def redo_apply(self, grid: Grid):
+        sq = grid[self.affected_grid_square[0]][self.affected_grid_square[1]]
+        layers, inverted = sq.stack_state()
+        sq.restore_state(layers[:self.position] + layers[self.position + 1:], inverted)
+
 
 @dataclass
 class PaintAction:
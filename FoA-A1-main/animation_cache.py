@@ -0,0 +1,111 @@
+"""
+Frame cache for animated layers.
+
+Animated layers are recomputed for every square on every frame, even though
+most of them only change every so often. The cache remembers packed results
+keyed by (layer, colour, square, time bucket):
+- stepwise layers use their own step function as the bucket, so cached
+  results are always exact.
+- periodic layers are only cached in approximate mode, where the bucket is
+  the timestamp (modulo the period) rounded to a multiple of `quantum`.
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from layer_util import Layer
+
+
+class AnimationCache:
+    DEFAULT_QUANTUM = 0.05
+    DEFAULT_MAX_ENTRIES = 1 << 16
+
+    def __init__(self, quantum: float = DEFAULT_QUANTUM, max_entries: int = DEFAULT_MAX_ENTRIES, approximate: bool = False) -> None:
+        """
+        Initialise the AnimationCache object.
+
+        Args:
+        - quantum: bucket width, in time units, for periodic layers in approximate mode.
+        - max_entries: entries kept before the least recently used one is evicted.
+        - approximate: whether to cache continuous (periodic) layers as well.
+
+        Raises:
+        - ValueError: if quantum or max_entries is not positive.
+
+        Complexity:
+        -Worst Case: O(1), constant
+        -Best Case: O(1), constant
+        """
+        if quantum <= 0:
+            raise ValueError("Quantum should be positive.")
+        if max_entries <= 0:
+            raise ValueError("Cache should hold at least one entry.")
+        self.quantum = quantum
+        self.max_entries = max_entries
+        self.approximate = approximate
+        self.entries = OrderedDict() #OrderedDict keeps recency order for LRU eviction
+        self.hits = 0
+        self.misses = 0
+
+    def bucket(self, layer: Layer, timestamp, x, y):
+        """
+        Returns the time bucket for this layer at this square,
+        or None if the layer cannot be cached.
+
+        Complexity:
+        -Worst Case: O(step), the cost of the layer's step function
+        -Best Case: O(1), uncachable layer
+        """
+        if layer.time_step is not None:
+            return layer.time_step(timestamp, x, y)
+        if self.approximate and layer.period is not None:
+            return round((timestamp % layer.period) / self.quantum)
+        return None
+
+    def apply(self, layer: Layer, color: int, timestamp, x, y) -> int:
+        """
+        Packed apply of `layer`, reusing a cached result when the bucket matches.
+
+        Args:
+        - layer: the layer to apply.
+        - color: packed input colour.
+        - timestamp, x, y: as for Layer.apply.
+
+        Raises:
+        -None
+
+        Returns:
+        - the packed output colour
+
+        Complexity:
+        -Worst Case: O(apply), a miss (or uncachable layer) runs the layer
+        -Best Case: O(1), a hit is a dictionary lookup
+        """
+        bucket = self.bucket(layer, timestamp, x, y)
+        if bucket is None:
+            return layer.apply_packed(color, timestamp, x, y)
+        key = (layer.index, color, x, y, bucket)
+        entries = self.entries
+        result = entries.get(key)
+        if result is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return result
+        self.misses += 1
+        if layer.time_step is None:
+            # Approximate: evaluate at the centre of the bucket so every
+            # timestamp in it gets the same answer.
+            timestamp = bucket * self.quantum
+        result = layer.apply_packed(color, timestamp, x, y)
+        entries[key] = result
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False) #evict the least recently used
+        return result
+
+    def clear(self) -> None:
+        """Forget every cached result."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,470 @@
+"""
+Background incremental autosave.
+
+Every save only looks at what changed since the previous one: the replay
+log already records every action, so its new entries give both the new
+history and the squares they touched, and the entries played back since
+give the squares the replay touched. The calling thread copies the final
+state of those squares, which costs time proportional to the change and not
+to the canvas, and hands the record to a writer thread.
+
+The writer keeps a sparse mirror of the saved session. It appends each
+record to `<path>.log` and every so often compacts the mirror into a full
+.paint snapshot at `<path>`, starting a new, empty log. recover() loads the
+snapshot and applies the log on top.
+"""
+
+from __future__ import annotations
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+
+from action import PaintAction
+from engine import PaintEngine
+from grid import Grid
+import paint_file
+
+LOG_MAGIC = b"PAINTLOG"
+LOG_HEADER = struct.Struct("<8sI") #magic, generation of the snapshot the log applies to
+RECORD_LENGTH = struct.Struct("<I")
+EMPTY = ((), False)
+
+@dataclass
+class AutosaveRecord:
+    """
+    Everything that changed between two saves.
+
+    If `reset` is set, the grid starts again empty (after a reset or a
+    replay starting). Then `specials` special actions are applied to every
+    square, and `cells` (final stack_state() of each touched square)
+    overwrite the result. The histories are sent whole, `replay` being the
+    actions still to be played. Actions are referred to by ids assigned by
+    AutosaveService.
+    """
+    reset: bool
+    draw_style: str
+    brush_size: int
+    width: int
+    height: int
+    specials: int = 0
+    cells: dict[tuple[int, int], tuple[tuple[int, ...], bool]] = field(default_factory=dict)
+    actions: dict[int, PaintAction] = field(default_factory=dict)
+    undo: list[int] = field(default_factory=list)
+    redo: list[int] = field(default_factory=list)
+    replay: list[tuple[int, bool]] = field(default_factory=list)
+
+class _Mirror:
+    """The writer's copy of the saved session, with only the non-default squares stored."""
+
+    def __init__(self, record: AutosaveRecord) -> None:
+        self.actions = {}
+        self.apply(record)
+
+    @classmethod
+    def from_document(cls, doc: paint_file.PaintDocument) -> _Mirror:
+        """Mirror of a snapshot written by compact()."""
+        actions = doc.actions()
+        aids = doc.column("AIDS")
+        draw_style, cells = doc.snapshot()
+        return cls(AutosaveRecord(
+            True, draw_style, doc.brush_size, doc.width, doc.height, cells=cells,
+            actions={aids[i]: action for i, action in enumerate(actions)},
+            undo=[aids[i] for i in doc.column("UNDO")],
+            redo=[aids[i] for i in doc.column("REDO")],
+            replay=[(aids[i], bool(u)) for i, u in zip(doc.column("RPLY"), doc.column("RPLU"))],
+        ))
+
+    def apply(self, record: AutosaveRecord) -> None:
+        """
+        Bring the mirror up to date with a record.
+
+        Complexity:
+        -Worst Case: O(k*m*n + c + a), k specials applied to m stored squares of n layers,
+                     c touched squares and a actions
+        -Best Case: O(c + a), no specials
+        """
+        if record.reset:
+            self.cells = {}
+            self.default = EMPTY #state of every square not in self.cells
+        self.draw_style = record.draw_style
+        self.brush_size = record.brush_size
+        self.width = record.width
+        self.height = record.height
+        if record.specials:
+            scratch = Grid(self.draw_style, 1, 1)[0][0] #a store to run special() on
+            def special(state):
+                scratch.restore_state(*state)
+                for _ in range(record.specials):
+                    scratch.special()
+                return scratch.stack_state()
+            self.cells = {square: special(state) for square, state in self.cells.items()}
+            self.default = special(self.default)
+        self.cells.update(record.cells)
+        self.actions.update(record.actions)
+        self.undo = record.undo
+        self.redo = record.redo
+        self.replay = record.replay
+        live = set(self.undo) | set(self.redo) | {aid for aid, _ in self.replay}
+        if len(live) < len(self.actions):
+            self.actions = {aid: action for aid, action in self.actions.items() if aid in live}
+
+    def columns(self, generation: int) -> list[tuple[str, array]]:
+        """The .paint columns of the mirror, plus the AUTO generation and AIDS action id columns."""
+        aids = sorted(self.actions)
+        index = {aid: i for i, aid in enumerate(aids)}
+        cells, default = self.cells, self.default
+        return (
+            paint_file.cell_columns(self.width, self.height, lambda x, y: cells.get((x, y), default))
+            + paint_file.history_columns(
+                [self.actions[aid] for aid in aids],
+                [index[aid] for aid in self.undo], [index[aid] for aid in self.redo],
+                [(index[aid], is_undo) for aid, is_undo in self.replay],
+            )
+            + [("AUTO", array("I", [generation])), ("AIDS", array("I", aids))]
+        )
+
+    def to_engine(self) -> PaintEngine:
+        """A new headless engine holding the mirrored session."""
+        engine = PaintEngine(self.draw_style, self.width, self.height)
+        if self.default == EMPTY:
+            states = self.cells
+        else:
+            states = {(x, y): self.cells.get((x, y), self.default) for x in range(self.width) for y in range(self.height)}
+        engine.grid.restore((self.draw_style, states))
+        engine.grid.brush_size = self.brush_size
+        engine.UndoTracker.restore([self.actions[aid] for aid in self.undo], [self.actions[aid] for aid in self.redo])
+        engine.ReplayTracker.restore([(self.actions[aid], is_undo) for aid, is_undo in self.replay])
+        return engine
+
+def _write_log_header(path: str, generation: int) -> None:
+    temp = path + ".tmp"
+    with open(temp, "wb") as file:
+        file.write(LOG_HEADER.pack(LOG_MAGIC, generation))
+    os.replace(temp, path)
+
+def _read_log(path: str, generation: int) -> list[AutosaveRecord]:
+    """The records in a log, or none if it belongs to another snapshot. A torn last record is dropped."""
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    if len(data) < LOG_HEADER.size or LOG_HEADER.unpack_from(data) != (LOG_MAGIC, generation):
+        return []
+    records = []
+    position = LOG_HEADER.size
+    while position + RECORD_LENGTH.size <= len(data):
+        length, = RECORD_LENGTH.unpack_from(data, position)
+        position += RECORD_LENGTH.size
+        if position + length > len(data):
+            break
+        records.append(pickle.loads(data[position:position + length]))
+        position += length
+    return records
+
+class AutosaveService:
+    """
+    Saves an engine's session in the background.
+
+    Call tick() once per frame (MyWindow.on_update does when `autosave` is set);
+    it saves every `interval` seconds. Only the calling thread touches the engine.
+    """
+
+    DEFAULT_INTERVAL = 2.0
+    DEFAULT_COMPACT_EVERY = 50
+    FIRST_COPY_SQUARES = 4096 #squares of the first copy taken per tick(), so no frame copies the whole grid
+
+    def __init__(self, engine: PaintEngine, path: str, interval: float = DEFAULT_INTERVAL,
+                 compact_every: int = DEFAULT_COMPACT_EVERY, clock=time.monotonic) -> None:
+        """
+        Initialise the AutosaveService object and start its writer thread.
+        The first record is a full copy of the engine's grid. tick() takes it
+        a few columns per frame, keeping the columns already copied up to
+        date, and save() or close() finish it at once. Nothing is written
+        until it is complete.
+
+        Args:
+        - engine: the engine to save.
+        - path: the .paint file to save to. Deltas go to path + ".log".
+        - interval: seconds between saves made by tick().
+        - compact_every: records appended to the log before it is compacted into a snapshot.
+        - clock: returns the current time in seconds.
+
+        Raises:
+        - ValueError: if interval is negative or compact_every isn't positive.
+
+        Complexity:
+        -Worst Case: O(p), copying the p actions queued for replay
+        -Best Case: O(1), nothing queued
+        """
+        if interval < 0 or compact_every <= 0:
+            raise ValueError("Interval should be non-negative and compact_every positive.")
+        self.engine = engine
+        self.path = path
+        self.log_path = path + ".log"
+        self.interval = interval
+        self.compact_every = compact_every
+        self.clock = clock
+        self.known = {} #id(action) -> (action id, action), for actions still in a history
+        self.next_aid = 0
+        self.saves = 0
+        self.snapshot_time = 0.0 #seconds the last save spent on the calling thread
+        self.error = None
+        self.queue = queue.Queue()
+        self.resets = engine.resets
+        self.replays = engine.replays
+        self.recorded = engine.ReplayTracker.recorded
+        self.dropped = engine.ReplayTracker.dropped
+        self.pending = engine.ReplayTracker.pending() #the replay actions still to be played at the last save
+        self.first_copy = {} #non-empty squares of the first copy so far, None once it has been queued
+        self.copied = 0 #columns of the first copy taken
+        self.last_save = clock()
+        self.thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def _aid(self, action: PaintAction, new: dict[int, PaintAction], live: dict) -> int:
+        """The id of an action, adding it to `new` the first time it is seen."""
+        known = live.get(id(action)) or self.known.get(id(action))
+        if known is None:
+            known = (self.next_aid, action)
+            self.next_aid += 1
+            new[known[0]] = PaintAction(is_special=True) if action.is_special else action
+        live[id(action)] = known
+        return known[0]
+
+    def _record(self, reset: bool, cells: dict, specials: int) -> AutosaveRecord:
+        engine = self.engine
+        grid = engine.grid
+        new, live = {}, {}
+        undo, redo = engine.UndoTracker.history()
+        pending = self.pending
+        record = AutosaveRecord(
+            reset, grid.draw_style, grid.brush_size, grid.x, grid.y,
+            specials=specials, cells=cells, actions=new,
+            undo=[self._aid(action, new, live) for action in undo],
+            redo=[self._aid(action, new, live) for action in redo],
+            replay=[(self._aid(action, new, live), is_undo) for action, is_undo in pending],
+        )
+        self.known = live #forget actions that have left every history
+        return record
+
+    def _changes(self) -> tuple[bool, dict, int] | None:
+        """
+        What changed since the last look, as (whole, cells, specials), or None if nothing did.
+        If `whole`, the grid may have been cleared and `cells` holds every non-empty square,
+        otherwise `cells` holds the squares touched since, after `specials` specials.
+        Either way, cells map squares to their final stack_state().
+
+        Complexity:
+        -Worst Case: O(x*y*n), a replay started (or the replay queue overflowed), so the whole grid is copied
+        -Best Case: O(1), nothing changed
+        Otherwise O(c*n + p), c squares touched by new or played actions and p actions queued for replay.
+        """
+        engine = self.engine
+        tracker = engine.ReplayTracker
+        reset = engine.resets != self.resets
+        if reset:
+            self.resets = engine.resets
+            self.recorded = 0
+            self.dropped = 0
+            self.pending = []
+        replayed = engine.replays != self.replays #start_replay() cleared the grid
+        count = tracker.recorded - self.recorded
+        dropped = tracker.dropped - self.dropped
+        removed = len(self.pending) + count - len(tracker.action) #replay actions played or dropped since the last look
+        if not (reset or replayed or count or removed):
+            return None
+        self.replays = engine.replays
+        self.recorded = tracker.recorded
+        self.dropped = tracker.dropped
+        grid = engine.grid
+        if replayed or count > len(tracker.action) or (dropped and removed > dropped):
+            # The grid was cleared for a replay, or new actions were dropped unseen, or plays
+            # and drops are mixed, so what was applied can't be told: copy the final grid.
+            self.pending = tracker.pending()
+            return True, grid.snapshot()[1], 0
+        touched = {}
+        specials = 0
+        new = tracker.recent(count)
+        played = (self.pending + new)[:removed] if not dropped else [] #dropped actions weren't applied again
+        #each played action was applied again, and each new one when it was added
+        for action, _ in played + new:
+            if action.is_special:
+                specials += 1
+            else:
+                for step in action.steps:
+                    touched[step.affected_grid_square] = None
+        for x, y in touched:
+            touched[(x, y)] = grid[x][y].stack_state()
+        self.pending = tracker.pending()
+        return reset, touched, specials
+
+    def _copy(self, columns: int) -> bool:
+        """
+        Take up to `columns` more columns of the first copy, queueing it once complete.
+        Squares already copied are kept up to date; a special starts the copy again.
+
+        Returns:
+        - True if the copy is complete.
+
+        Complexity:
+        -Worst Case: O(columns*y*n + c*n + p), plus the cost of _changes()
+        -Best Case: O(columns*y), empty squares
+        """
+        start = self.clock()
+        grid = self.engine.grid
+        changes = self._changes()
+        if changes is not None:
+            whole, cells, specials = changes
+            if whole: #every non-empty square, final
+                self.first_copy, self.copied = dict(cells), grid.x
+            elif specials:
+                self.first_copy, self.copied = {}, 0
+            else:
+                for square, state in cells.items():
+                    if square[0] < self.copied: #later columns are copied as they are then
+                        self.first_copy[square] = state
+        first_copy = self.first_copy
+        for x in range(self.copied, min(self.copied + columns, grid.x)):
+            column = grid[x]
+            for y in range(grid.y):
+                state = column[y].stack_state()
+                if state != EMPTY:
+                    first_copy[(x, y)] = state
+        self.copied = min(self.copied + columns, grid.x)
+        done = self.copied == grid.x
+        if done:
+            # The copied states are final, so no specials need replaying on top of them.
+            self.queue.put(self._record(True, first_copy, 0))
+            self.first_copy = None
+        self.last_save = self.clock()
+        self.snapshot_time = self.last_save - start
+        return done
+
+    def save(self) -> bool:
+        """
+        Queue a record of everything changed since the last save,
+        or the rest of the first copy if it isn't complete yet.
+
+        Returns:
+        - False if nothing changed.
+
+        Complexity:
+        -Worst Case: O(x*y*n + h), the whole grid is copied (see _changes), and h actions
+                     in the undo, redo and replay histories
+        -Best Case: O(1), nothing changed
+        Otherwise O(c*n + h), c squares touched by new or played actions.
+        """
+        if self.first_copy is not None:
+            return self._copy(self.engine.grid.x)
+        start = self.clock()
+        changes = self._changes()
+        if changes is None:
+            return False
+        self.queue.put(self._record(*changes))
+        self.last_save = self.clock()
+        self.snapshot_time = self.last_save - start
+        return True
+
+    def tick(self) -> None:
+        """Save if `interval` seconds have passed since the last save, or take more of the first copy."""
+        if self.first_copy is not None:
+            self._copy(max(1, self.FIRST_COPY_SQUARES // max(1, self.engine.grid.y)))
+        elif self.clock() - self.last_save >= self.interval:
+            if not self.save():
+                self.last_save = self.clock()
+
+    def flush(self) -> None:
+        """
+        Wait until every queued record is written.
+
+        Raises:
+        - the writer's exception, if it failed.
+        """
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self) -> None:
+        """Save any remaining changes, compact them into the snapshot, and stop the writer."""
+        self.save()
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self) -> None:
+        mirror = None
+        generation = 0
+        log = None
+        pending = 0 #records appended since the last compaction
+        try:
+            while True:
+                record = self.queue.get()
+                try:
+                    if record is None:
+                        if mirror is not None and pending:
+                            log.close()
+                            generation += 1
+                            self._compact(mirror, generation)
+                        return
+                    if mirror is None:
+                        mirror = _Mirror(record)
+                    else:
+                        mirror.apply(record)
+                    if log is None or pending >= self.compact_every or record.reset:
+                        if log is not None:
+                            log.close()
+                        generation += 1
+                        self._compact(mirror, generation)
+                        log = open(self.log_path, "ab")
+                        pending = 0
+                    else:
+                        data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+                        log.write(RECORD_LENGTH.pack(len(data)) + data)
+                        log.flush()
+                        pending += 1
+                finally:
+                    self.queue.task_done()
+        except Exception as e:
+            self.error = e
+            while True: #keep draining so flush() and close() don't hang
+                if self.queue.get() is None:
+                    self.queue.task_done()
+                    return
+                self.queue.task_done()
+        finally:
+            if log is not None:
+                log.close()
+
+    def _compact(self, mirror: _Mirror, generation: int) -> None:
+        """
+        Write the mirror as a full snapshot, then start an empty log.
+        The snapshot is replaced first: if that is all that happens, the
+        old log's generation no longer matches and it is ignored.
+        """
+        paint_file.write_columns(self.path, mirror.draw_style, mirror.brush_size,
+                                 mirror.width, mirror.height, mirror.columns(generation))
+        _write_log_header(self.log_path, generation)
+
+def recover(path: str) -> PaintEngine:
+    """
+    Returns a new headless PaintEngine holding the session autosaved at `path`,
+    the last snapshot plus every complete record logged after it.
+
+    Raises:
+    - ValueError: if `path` isn't a .paint file written by AutosaveService.
+    """
+    with paint_file.PaintDocument.open(path) as doc:
+        if "AUTO" not in doc.sections:
+            raise ValueError("Not an autosave snapshot, use paint_file.load instead.")
+        generation = doc.column("AUTO")[0]
+        mirror = _Mirror.from_document(doc)
+    for record in _read_log(path + ".log", generation):
+        mirror.apply(record)
+    return mirror.to_engine()
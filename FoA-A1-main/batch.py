@@ -0,0 +1,173 @@
+"""
+Batched engine commands.
+
+A Batch packs any number of operations into one buffer of fixed size
+records, and run_batch() applies them to a PaintEngine in order, returning
+every result at once. The buffer is unpacked with a single
+struct.iter_unpack and each record dispatched through a table, so a batch
+of thousands of stamps costs one call rather than one call per stamp.
+The same buffer can be sent to a CollabServer (see CollabClient.run_batch),
+which runs it the same way and replies with the results.
+
+    batch = Batch()
+    for x in range(0, 64, 4):
+        batch.stamp(rainbow, x, 32, 3)
+    batch.undo().render(timestamp=1.5)
+    result = run_batch(engine, batch)
+    result.values    # squares painted per stamp, 1 for the undo, 0 for the render
+    result.frames[0] # RGB pixels of the render
+
+Each record is OP: operation, layer index, brush size, x, y, timestamp.
+"""
+
+from __future__ import annotations
+import struct
+from dataclasses import dataclass, field
+
+from engine import PaintEngine
+from grid import Grid
+from layer_util import Layer, get_layers
+
+OP = struct.Struct("<BBBxHHf")
+STAMP = 0
+ERASE = 1
+SPECIAL = 2
+UNDO = 3
+REDO = 4
+RENDER = 5
+
+class Batch:
+    """Builds the buffer of a batch. Every method returns the batch, so calls can be chained."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def _add(self, op: int, layer: int = 0, brush_size: int = 0, x: int = 0, y: int = 0, timestamp: float = 0) -> Batch:
+        self.data += OP.pack(op, layer, brush_size, x, y, timestamp)
+        return self
+
+    def stamp(self, layer: Layer, x: int, y: int, brush_size: int = Grid.DEFAULT_BRUSH_SIZE) -> Batch:
+        """Paint `layer` around (x, y), as on_paint with the given brush size."""
+        return self._add(STAMP, layer.index, brush_size, x, y)
+
+    def erase(self, layer: Layer, x: int, y: int, brush_size: int = Grid.DEFAULT_BRUSH_SIZE) -> Batch:
+        """Erase `layer` around (x, y), as on_erase with the given brush size."""
+        return self._add(ERASE, layer.index, brush_size, x, y)
+
+    def special(self) -> Batch:
+        return self._add(SPECIAL)
+
+    def undo(self) -> Batch:
+        return self._add(UNDO)
+
+    def redo(self) -> Batch:
+        return self._add(REDO)
+
+    def render(self, timestamp: float = 0) -> Batch:
+        """Render the grid at `timestamp` into the next of the result's frames."""
+        return self._add(RENDER, timestamp=timestamp)
+
+    def __len__(self) -> int:
+        return len(self.data) // OP.size
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.data)
+
+@dataclass
+class BatchResult:
+    """
+    - values: per operation, the squares changed by a stamp or erase, 1 if an undo,
+              redo or special did something and 0 if not, the frame index of a render.
+    - frames: the RGB pixels (row by row, see GridPixelBuffer) of each render.
+    - touched: the squares changed, or None if a special changed them all.
+    """
+    values: list[int] = field(default_factory=list)
+    frames: list[bytes] = field(default_factory=list)
+    touched: set[tuple[int, int]] | None = field(default_factory=set)
+
+def render_count(data) -> int:
+    """
+    The renders in a batch, each adding a frame to its results, counted without running it.
+
+    Raises:
+    - ValueError: if the data isn't a whole number of records.
+    """
+    data = bytes(data)
+    if len(data) % OP.size:
+        raise ValueError(f"Batch of {len(data)} bytes isn't a whole number of {OP.size} byte records.")
+    return data[::OP.size].count(RENDER) #the operation is each record's first byte
+
+def run_batch(engine: PaintEngine, data) -> BatchResult:
+    """
+    Apply a batch to the engine, in order.
+
+    The replay log drops its oldest action whenever it fills up rather than
+    failing part way through, so a long batch only loses the oldest actions
+    from the replay. The grid's brush size is left as it was.
+
+    Args:
+    - engine: the engine to paint on.
+    - data: a Batch, or its bytes.
+
+    Raises:
+    - ValueError: if the data isn't a whole number of records, or an operation or layer is unknown.
+                  Operations before the bad one have been applied.
+
+    Returns:
+    - the BatchResult.
+
+    Complexity:
+    -Worst Case: O(b*d*d*comp + r*x*y), b stamps or erases of brush size d, r renders
+                 (or O(x*y*n) per special)
+    -Best Case: O(b), nothing to change
+    """
+    data = bytes(data)
+    if len(data) % OP.size:
+        raise ValueError(f"Batch of {len(data)} bytes isn't a whole number of {OP.size} byte records.")
+    grid = engine.grid
+    tracker = engine.ReplayTracker
+    layers = get_layers()
+    result = BatchResult()
+    values = result.values
+    brush_size = grid.brush_size
+
+    def brush(op: int, layer: int, size: int, x: int, y: int, _) -> None:
+        if layer >= len(layers) or layers[layer] is None:
+            raise ValueError(f"No layer {layer}.")
+        grid.brush_size = min(max(size, Grid.MIN_BRUSH), Grid.MAX_BRUSH)
+        if op == STAMP:
+            engine.on_paint(layers[layer], x, y)
+        else:
+            engine.on_erase(layers[layer], x, y)
+
+    def render(*args) -> None:
+        values.append(len(result.frames))
+        result.frames.append(bytes(engine.render(args[5]).pixels))
+
+    dispatch = (brush, brush, lambda *_: engine.on_special(), lambda *_: engine.on_undo(),
+                lambda *_: engine.on_redo(), render)
+    try:
+        for record in OP.iter_unpack(data):
+            op = record[0]
+            if op >= len(dispatch):
+                raise ValueError(f"Unknown batch operation {op}.")
+            if tracker.action.is_full():
+                tracker.drop_oldest()
+            recorded = tracker.recorded
+            dispatch[op](*record)
+            if op == RENDER:
+                continue
+            if tracker.recorded == recorded: #undo or redo with nothing to do
+                values.append(0)
+                continue
+            action = tracker.recent(1)[0][0]
+            if action.is_special:
+                values.append(1)
+                result.touched = None
+            else:
+                values.append(len(action.steps) if op in (STAMP, ERASE) else 1)
+                if result.touched is not None:
+                    result.touched.update(step.affected_grid_square for step in action.steps)
+    finally:
+        grid.brush_size = brush_size
+    return result
@@ -0,0 +1,59 @@
+"""
+Autosave benchmark.
+
+Paints on a large grid while AutosaveService saves every few frames, and
+reports the time each save spends on the painting thread and the longest
+simulated frame while the writer thread appends and compacts.
+
+    python -m benchmarks.autosave [--size 1024] [--frames 300]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from autosave import AutosaveService
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--size", help="Grid width and height.", type=int, default=1024)
+    p.add_argument("--frames", help="Frames simulated, painting once per frame.", type=int, default=300)
+    p.add_argument("--save-every", help="Frames between saves.", type=int, default=10)
+    args = p.parse_args()
+    rng = random.Random(0)
+    layers = [layer for layer in get_layers() if layer is not None]
+    start = time.perf_counter()
+    engine = PaintEngine(Grid.DRAW_STYLE_SET, args.size, args.size)
+    print(f"{args.size}x{args.size} grid built in {time.perf_counter() - start:.1f} s")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.paint")
+        start = time.perf_counter()
+        service = AutosaveService(engine, path, compact_every=10)
+        print(f"  service start: {(time.perf_counter() - start) * 1000:8.2f} ms")
+        copies, saves, frames = [], [], []
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            engine.on_paint(rng.choice(layers), rng.randrange(args.size), rng.randrange(args.size))
+            if service.first_copy is not None: #taken a few columns per frame
+                service.tick()
+                copies.append(service.snapshot_time)
+            elif frame % args.save_every == 0:
+                service.save()
+                saves.append(service.snapshot_time)
+            frames.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        service.close()
+        print(f"  first copy: {len(copies)} frames, max {max(copies) * 1000:.3f} ms per frame")
+        if saves:
+            print(f"  save on painting thread: mean {sum(saves) / len(saves) * 1000:.3f} ms, max {max(saves) * 1000:.3f} ms")
+        print(f"  frame (paint + save): max {max(frames) * 1000:.2f} ms")
+        print(f"  close (final compaction): {(time.perf_counter() - start) * 1000:8.2f} ms")
+        print(f"  snapshot size: {os.path.getsize(path) / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Batch benchmark.
+
+Paints the same random stamps on a CollabServer three ways: one PAINT
+message per stamp with a round trip each, one PAINT message per stamp
+pipelined, and a single BATCH, then the batch again in process.
+
+    python -m benchmarks.batch [--stamps 5000] [--size 256]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import protocol
+from batch import Batch, run_batch
+from collab_server import CollabServer, CollabClient
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+
+async def _run(args, stamps):
+    server = CollabServer(PaintEngine(Grid.DRAW_STYLE_SET, args.size, args.size), tick=3600)
+    await server.start()
+    client = await CollabClient.connect(*server.address[:2])
+    batch = Batch()
+    for layer, x, y in stamps:
+        batch.stamp(layer, x, y, 1)
+
+    start = time.perf_counter()
+    for layer, x, y in stamps[:args.stamps // 10]: #wait for each stamp, via an empty batch
+        client.paint(layer, x, y, 1)
+        await client.run_batch(b"")
+    print(f"  round trip per stamp: {(time.perf_counter() - start) / (args.stamps // 10) * 1e6:8.1f} us/stamp")
+
+    start = time.perf_counter()
+    for layer, x, y in stamps:
+        client.paint(layer, x, y, 1)
+    await client.run_batch(b"")
+    print(f"  pipelined PAINTs:     {(time.perf_counter() - start) / args.stamps * 1e6:8.1f} us/stamp")
+
+    start = time.perf_counter()
+    await client.run_batch(batch)
+    print(f"  one BATCH:            {(time.perf_counter() - start) / args.stamps * 1e6:8.1f} us/stamp")
+    await client.close()
+    await server.close()
+    return batch
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--stamps", help="Stamps painted each way.", type=int, default=5000)
+    p.add_argument("--size", help="Grid width and height.", type=int, default=256)
+    args = p.parse_args()
+    rng = random.Random(0)
+    layers = [layer for layer in get_layers() if layer is not None]
+    stamps = [(rng.choice(layers), rng.randrange(args.size), rng.randrange(args.size)) for _ in range(args.stamps)]
+    print(f"{args.stamps} stamps on a {args.size}x{args.size} grid")
+    batch = asyncio.run(_run(args, stamps))
+    engine = PaintEngine(Grid.DRAW_STYLE_SET, args.size, args.size)
+    start = time.perf_counter()
+    run_batch(engine, batch)
+    print(f"  in process:           {(time.perf_counter() - start) / args.stamps * 1e6:8.1f} us/stamp")
+
+if __name__ == "__main__":
+    main()
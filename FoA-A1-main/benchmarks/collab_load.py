@@ -0,0 +1,100 @@
+"""
+Collaboration server load test.
+
+Starts a CollabServer in this process (or uses one already running with
+--port), connects many clients which each paint at a steady rate, and
+reports command throughput, the time from sending a paint to seeing its
+square in a broadcast, and the bytes each client received. --slow adds
+clients that connect but never read, to show they don't hold up the rest.
+
+    python -m benchmarks.collab_load [--clients 50] [--commands 200] [--rate 100]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from collab_server import CollabServer, CollabClient
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+
+async def _painter(client, rng, layers, args, latencies):
+    sent = {} #square -> [(send time, layer index)] of paints not seen yet
+
+    async def listen():
+        # A paint is seen when a broadcast after it lists its square holding its layer,
+        # so squares painted before, or by other clients, don't count.
+        while await client.receive() is not None:
+            now = time.perf_counter()
+            for square in client.changed:
+                waiting = sent.get(square)
+                if waiting is None:
+                    continue
+                layers = client.cells.get(square, ((), False))[0]
+                still = [(when, index) for when, index in waiting if index not in layers]
+                latencies.extend(now - when for when, index in waiting if index in layers)
+                if still:
+                    sent[square] = still
+                else:
+                    del sent[square]
+
+    listener = asyncio.create_task(listen())
+    for _ in range(args.commands):
+        x, y = rng.randrange(args.size), rng.randrange(args.size)
+        layer = rng.choice(layers)
+        client.paint(layer, x, y, 0)
+        sent.setdefault((x, y), []).append((time.perf_counter(), layer.index))
+        await client.drain()
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.sleep(args.tick * 4) #let the last broadcasts arrive
+    listener.cancel()
+    await client.close()
+
+async def _run(args):
+    server = None
+    port = args.port
+    if port is None:
+        server = CollabServer(PaintEngine(Grid.DRAW_STYLE_SET, args.size, args.size), args.tick)
+        await server.start()
+        port = server.address[1]
+    rng = random.Random(0)
+    layers = [layer for layer in get_layers() if layer is not None]
+    clients = [await CollabClient.connect(port=port) for _ in range(args.clients)]
+    slow = [await asyncio.open_connection("127.0.0.1", port) for _ in range(args.slow)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_painter(client, random.Random(rng.random()), layers, args, latencies) for client in clients))
+    elapsed = time.perf_counter() - start
+    total = args.clients * args.commands
+    print(f"{args.clients} clients x {args.commands} paints ({args.slow} slow) on a {args.size}x{args.size} grid")
+    print(f"  throughput: {total / elapsed:10.0f} commands/s over {elapsed:.2f} s")
+    if latencies:
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)]
+        print(f"  paint -> broadcast: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    print(f"  received per client: {sum(c.received for c in clients) / len(clients) / 1024:.1f} KiB")
+    if server is not None:
+        print(f"  server: {server.commands} commands, {server.ticks} broadcasts, "
+              f"{server.bytes_sent / 1024:.0f} KiB sent, {server.catch_ups} catch-ups")
+        print(f"  slow clients pending: {[len(c.pending) for c in server.clients if c.behind]}")
+    for _, writer in slow:
+        writer.close()
+    if server is not None:
+        await server.close()
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--clients", help="Painting clients.", type=int, default=50)
+    p.add_argument("--slow", help="Clients that never read.", type=int, default=2)
+    p.add_argument("--commands", help="Paints sent by each client.", type=int, default=200)
+    p.add_argument("--rate", help="Paints per second per client.", type=float, default=100)
+    p.add_argument("--size", help="Grid width and height.", type=int, default=256)
+    p.add_argument("--tick", help="Seconds between broadcasts.", type=float, default=CollabServer.DEFAULT_TICK)
+    p.add_argument("--port", help="Use the server already listening on this port.", type=int)
+    asyncio.run(_run(p.parse_args()))
+
+if __name__ == "__main__":
+    main()
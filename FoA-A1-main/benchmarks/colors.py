@@ -0,0 +1,81 @@
+"""
+Allocation benchmark for the tuple and packed colour paths.
+
+Renders a painted grid once per frame through each path and reports
+time per frame, objects left allocated per cell, and the peak memory
+allocated while rendering a frame.
+
+    python -m benchmarks.colors
+"""
+
+import sys
+import time
+import tracemalloc
+
+from grid import Grid
+from layer_util import pack_color
+from layers import black, lighten, rainbow, sparkle, invert
+
+BG = (255, 255, 255)
+FRAMES = 20
+
+def painted_grid(style, size):
+    """A grid with a mix of flat fills and animated layers."""
+    grid = Grid(style, size, size)
+    for x in range(size):
+        for y in range(size):
+            if x < size // 2:
+                grid[x][y].add(black)
+                grid[x][y].add(lighten)
+            elif y < size // 2:
+                grid[x][y].add(rainbow)
+            elif (x + y) % 3 == 0:
+                grid[x][y].add(sparkle)
+                grid[x][y].add(invert)
+    return grid
+
+def tuple_frame(grid, timestamp, out):
+    # The original per-square loop, as on_draw used to do it.
+    for x in range(grid.x):
+        for y in range(grid.y):
+            out.append(grid[x][y].get_color(list(BG), timestamp, x, y))
+    return out
+
+def packed_frame(grid, timestamp, out):
+    return grid.render_packed(pack_color(BG), timestamp, out)
+
+def measure(name, grid, frame, reuse):
+    cells = grid.x * grid.y
+    out = [] if not reuse else None
+    frame(grid, 0, [] if not reuse else None) # warm up caches
+    start = time.perf_counter()
+    for f in range(FRAMES):
+        out = frame(grid, f / 10, out if reuse else [])
+    elapsed = (time.perf_counter() - start) / FRAMES
+
+    tracemalloc.start()
+    held = frame(grid, 0.5, out if reuse else [])
+    tracemalloc.reset_peak()
+    before_blocks = sys.getallocatedblocks()
+    base, _ = tracemalloc.get_traced_memory()
+    frame_out = frame(grid, 0.7, held if reuse else [])
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks() - before_blocks
+    tracemalloc.stop()
+    del held, frame_out
+    print(
+        f"{name:>8}: {elapsed * 1000:8.2f} ms/frame, "
+        f"{blocks / cells:6.2f} objects/cell retained, "
+        f"{(peak - base) / cells:7.1f} peak bytes/cell"
+    )
+
+def main():
+    for style in Grid.DRAW_STYLE_OPTIONS:
+        for size in (32, 128):
+            grid = painted_grid(style, size)
+            print(f"{style} {size}x{size}")
+            measure("tuple", grid, tuple_frame, reuse=False)
+            measure("packed", grid, packed_frame, reuse=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Workload benchmark harness.
+
+Runs the workloads in benchmarks/workloads.py headlessly for every
+combination of draw style and grid size, timing each operation, and
+reports throughput and p50/p99 latency per operation type. With --out the
+results are also written as JSON, for comparing runs:
+
+    {"meta": {...}, "results": [{"workload", "style", "size", "operation", "count",
+                                 "total_s", "per_s", "mean_us", "p50_us", "p99_us", "max_us"}, ...]}
+
+    python -m benchmarks.harness [--sizes 32 128 256] [--ops 500] [--out results.json]
+    python -m benchmarks.harness --compare results.json   # also show the change in p50 and p99
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from benchmarks.workloads import WORKLOADS, run_operation
+from engine import PaintEngine
+from grid import Grid
+
+def percentile(ordered: list[float], q: float) -> float:
+    """The q-th percentile (0 to 100) of an ascending list, by nearest rank."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+def summarise(times: list[float]) -> dict:
+    """count, total_s, per_s, mean_us, p50_us, p99_us and max_us of a list of durations in seconds."""
+    ordered = sorted(times)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "total_s": total,
+        "per_s": len(ordered) / total if total else 0.0,
+        "mean_us": total / len(ordered) * 1e6 if ordered else 0.0,
+        "p50_us": percentile(ordered, 50) * 1e6,
+        "p99_us": percentile(ordered, 99) * 1e6,
+        "max_us": (ordered[-1] if ordered else 0.0) * 1e6,
+    }
+
+def _key(row: dict) -> tuple:
+    return row["workload"], row["style"], row["size"], row["operation"]
+
+def _change(old: float, new: float) -> str:
+    return f"{(new - old) / old:+.0%}" if old else "-"
+
+def run_workload(name: str, style: str, size: int, count: int, seed: int) -> dict[str, list[float]]:
+    """The durations of each operation type of one workload, run on a new engine."""
+    engine = PaintEngine(style, size, size)
+    times = {}
+    for operation in WORKLOADS[name](random.Random(seed), size, count):
+        if engine.ReplayTracker.action.is_full():
+            engine.ReplayTracker.clear()
+        for kind, seconds in run_operation(engine, operation, time.perf_counter):
+            times.setdefault(kind, []).append(seconds)
+    return times
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=list(WORKLOADS))
+    p.add_argument("--styles", nargs="+", choices=Grid.DRAW_STYLE_OPTIONS, default=list(Grid.DRAW_STYLE_OPTIONS))
+    p.add_argument("--sizes", help="Grid widths and heights.", type=int, nargs="+", default=[32, 128, 256])
+    p.add_argument("--ops", help="Operations per workload.", type=int, default=500)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="Write the results to this JSON file.")
+    p.add_argument("--compare", help="Results JSON of an earlier run to compare with.")
+    args = p.parse_args(argv)
+    earlier = {}
+    if args.compare:
+        with open(args.compare) as file:
+            earlier = {_key(row): row for row in json.load(file)["results"]}
+    results = []
+    print(f"{'workload':<14}{'style':<10}{'size':>6}  {'operation':<12}{'count':>7}{'per s':>11}{'p50 us':>10}{'p99 us':>10}"
+          + ("  change p50   p99" if earlier else ""))
+    for name in args.workloads:
+        for style in args.styles:
+            for size in args.sizes:
+                times = run_workload(name, style, size, args.ops, args.seed)
+                for kind, durations in sorted(times.items()):
+                    row = {"workload": name, "style": style, "size": size, "operation": kind, **summarise(durations)}
+                    results.append(row)
+                    line = (f"{name:<14}{style:<10}{size:>6}  {kind:<12}{row['count']:>7}{row['per_s']:>11.0f}"
+                            f"{row['p50_us']:>10.1f}{row['p99_us']:>10.1f}")
+                    old = earlier.get(_key(row))
+                    if old is not None:
+                        line += f"  {_change(old['p50_us'], row['p50_us']):>11}{_change(old['p99_us'], row['p99_us']):>6}"
+                    print(line)
+    if args.out:
+        meta = {
+            "python": sys.version.split()[0], "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "ops": args.ops, "seed": args.seed,
+        }
+        with open(args.out, "w") as file:
+            json.dump({"meta": meta, "results": results}, file, indent=1)
+
+if __name__ == "__main__":
+    main()
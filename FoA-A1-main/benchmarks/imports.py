@@ -0,0 +1,56 @@
+"""
+Import time benchmark for the headless engine and the window.
+
+Each module is imported in a fresh interpreter. Exits with an error if a
+headless module pulls in arcade or takes longer than the budget to import.
+
+    python -m benchmarks.imports [--budget-ms 150]
+"""
+
+import argparse
+import subprocess
+import sys
+
+HEADLESS = ["engine", "main", "grid_renderer"]
+WINDOWED = ["window"]
+REPEATS = 5
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, "arcade" in sys.modules)
+"""
+
+def import_time(module):
+    """Best of REPEATS import times in ms, and whether arcade was imported."""
+    best = None
+    for _ in range(REPEATS):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        elapsed = float(out[0]) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out[1] == "True"
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--budget-ms", help="Maximum import time for headless modules.", type=float, default=150)
+    args = p.parse_args()
+    failed = False
+    for module in HEADLESS + WINDOWED:
+        elapsed, has_arcade = import_time(module)
+        status = ""
+        if module in HEADLESS:
+            if has_arcade:
+                status = "FAIL: imports arcade"
+            elif elapsed > args.budget_ms:
+                status = f"FAIL: over {args.budget_ms:.0f} ms budget"
+            failed = failed or bool(status)
+        print(f"{module:>14}: {elapsed:8.2f} ms {status}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
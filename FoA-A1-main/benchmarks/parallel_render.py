@@ -0,0 +1,59 @@
+"""
+Parallel replay rendering benchmark.
+
+Records a long random session on a large grid, then renders its replay
+to PNG frames serially and with increasing numbers of worker processes,
+reporting frames per second and speedup over the serial renderer.
+
+    python -m benchmarks.parallel_render [--size 128] [--actions 400] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+from offline_render import render_replay
+from parallel_render import render_replay_parallel
+
+def recorded_engine(size, actions, seed=0):
+    rng = random.Random(seed)
+    layers = [layer for layer in get_layers() if layer is not None]
+    engine = PaintEngine(Grid.DRAW_STYLE_ADD, size, size)
+    for i in range(actions):
+        if i % 50 == 49:
+            engine.on_special()
+        elif i % 7 == 6:
+            engine.on_undo()
+        else:
+            engine.on_paint(rng.choice(layers), rng.randrange(size), rng.randrange(size))
+    return engine
+
+def timed(render, size, actions):
+    engine = recorded_engine(size, actions)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        frames = sum(1 for _ in render(engine, os.path.join(directory, "{:05d}.png")))
+        return frames / (time.perf_counter() - start)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--size", help="Grid width and height.", type=int, default=128)
+    p.add_argument("--actions", help="Actions recorded, one frame each.", type=int, default=400)
+    p.add_argument("--workers", help="Worker counts to try.", type=int, nargs="+",
+                   default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = p.parse_args()
+    print(f"{os.cpu_count()} CPUs, {args.size}x{args.size} grid, {args.actions} frames")
+    serial = timed(lambda engine, pattern: render_replay(engine, pattern, scale=2), args.size, args.actions)
+    print(f"  serial: {serial:8.1f} frames/s")
+    for workers in args.workers:
+        rate = timed(lambda engine, pattern: render_replay_parallel(engine, pattern, scale=2, workers=workers),
+                     args.size, args.actions)
+        print(f"  {workers:>2} workers: {rate:8.1f} frames/s ({rate / serial:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Primitive count benchmark for run-merged grid drawing.
+
+For a few representative canvases, compares the number of rectangles
+drawn one per square with the number after merge_runs, and the time
+the merge takes.
+
+    python -m benchmarks.rectangles
+"""
+
+import time
+
+from grid import Grid
+from grid_renderer import GridPixelBuffer, merge_runs
+from layers import black, lighten, rainbow, sparkle, red, blue
+
+REPEATS = 20
+
+def blank(grid):
+    pass
+
+def big_fills(grid):
+    for x in range(grid.x):
+        for y in range(grid.y):
+            if x < grid.x // 2:
+                grid[x][y].add(black)
+            elif y < grid.y // 3:
+                grid[x][y].add(blue)
+
+def brush_strokes(grid):
+    # A few diagonal strokes with the default brush size, like a user would drag.
+    d = Grid.DEFAULT_BRUSH_SIZE
+    for stroke, layer in enumerate([red, lighten, blue, black]):
+        for step in range(grid.x):
+            px = step
+            py = (step + stroke * grid.y // 4) % grid.y
+            for x in range(max(px - d, 0), min(px + d + 1, grid.x)):
+                for y in range(max(py - d, 0), min(py + d + 1, grid.y)):
+                    if abs(px - x) + abs(py - y) <= d:
+                        grid[x][y].add(layer)
+
+def rainbow_fill(grid):
+    for x in range(grid.x):
+        for y in range(grid.y):
+            grid[x][y].add(rainbow)
+
+def sparkle_fill(grid):
+    for x in range(grid.x):
+        for y in range(grid.y):
+            grid[x][y].add(sparkle)
+
+CANVASES = [blank, big_fills, brush_strokes, rainbow_fill, sparkle_fill]
+
+def main():
+    for size in (32, 128):
+        print(f"{size}x{size} ({size * size} squares)")
+        for canvas in CANVASES:
+            grid = Grid(Grid.DRAW_STYLE_SET, size, size)
+            canvas(grid)
+            buffer = GridPixelBuffer(size, size)
+            buffer.update(grid, 0xFFFFFF, 0)
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                rects = merge_runs(buffer.colors, size, size)
+            elapsed = (time.perf_counter() - start) / REPEATS
+            print(f"  {canvas.__name__:>14}: {len(rects):6d} rectangles, {elapsed * 1000:7.2f} ms to merge")
+
+if __name__ == "__main__":
+    main()
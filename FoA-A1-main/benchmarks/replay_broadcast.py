@@ -0,0 +1,57 @@
+"""
+Replay broadcast benchmark.
+
+Records random paints, decodes the replay once, then streams it at full
+speed to more and more viewers at once and reports the time per viewer.
+It should stay flat, since the server only copies prepared bytes. The
+viewers run in this process too, so most of that time is their decoding.
+
+    python -m benchmarks.replay_broadcast [--actions 5000] [--viewers 1 10 50]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+from replay_broadcast import ReplayBroadcast, ReplayServer, ReplayViewer
+
+async def _stream(broadcast, count):
+    server = ReplayServer(broadcast)
+    await server.start()
+    viewers = [await ReplayViewer.connect(*server.address[:2]) for _ in range(count)]
+    start = time.perf_counter()
+    for viewer in viewers:
+        viewer.subscribe(0, 0)
+    await asyncio.gather(*(viewer.watch() for viewer in viewers))
+    elapsed = time.perf_counter() - start
+    for viewer in viewers:
+        await viewer.close()
+    await server.close()
+    return elapsed
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--actions", help="Paints recorded.", type=int, default=5000)
+    p.add_argument("--size", help="Grid width and height.", type=int, default=128)
+    p.add_argument("--viewers", help="Viewer counts to try.", type=int, nargs="+", default=[1, 10, 50])
+    args = p.parse_args()
+    rng = random.Random(0)
+    layers = [layer for layer in get_layers() if layer is not None]
+    engine = PaintEngine(Grid.DRAW_STYLE_SET, args.size, args.size)
+    for _ in range(args.actions):
+        engine.on_paint(rng.choice(layers), rng.randrange(args.size), rng.randrange(args.size))
+    start = time.perf_counter()
+    broadcast = ReplayBroadcast(engine)
+    size = sum(map(len, broadcast.messages)) + sum(map(len, broadcast.keyframes))
+    print(f"{args.actions} actions on a {args.size}x{args.size} grid")
+    print(f"  decode once: {(time.perf_counter() - start) * 1000:8.1f} ms, {size / 1024:.0f} KiB of messages")
+    for count in args.viewers:
+        elapsed = asyncio.run(_stream(broadcast, count))
+        print(f"  {count:4d} viewers: {elapsed * 1000:8.1f} ms, {elapsed / count * 1000:6.2f} ms per viewer")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Startup and draw mode switch benchmark.
+
+Times building the grid and trackers from scratch against resetting them
+in place, which is what MyWindow.reset does on every draw mode change.
+With --window it also times creating the window and cycling draw modes
+(use --headless on machines without a display).
+
+    python -m benchmarks.startup [--window] [--headless]
+"""
+
+import argparse
+import time
+
+from grid import Grid
+from undo import UndoTracker
+from replay import ReplayTracker
+
+SIZE = 32
+REPEATS = 10
+
+def timed(func, repeats=REPEATS):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+def engine_benchmarks():
+    for style in Grid.DRAW_STYLE_OPTIONS:
+        print(f"  new Grid({style}): {timed(lambda: Grid(style, SIZE, SIZE)):8.2f} ms")
+    grid = Grid(Grid.DRAW_STYLE_SET, SIZE, SIZE)
+    styles = iter(Grid.DRAW_STYLE_OPTIONS * (REPEATS + 1))
+    print(f"  Grid.reset(next style): {timed(lambda: grid.reset(next(styles))):8.2f} ms")
+    print(f"  Grid.reset(): {timed(grid.reset):8.2f} ms")
+    print(f"  new trackers: {timed(lambda: (UndoTracker(), ReplayTracker())):8.2f} ms")
+    undo, replay = UndoTracker(), ReplayTracker()
+    print(f"  clear trackers: {timed(lambda: (undo.clear(), replay.clear())):8.2f} ms")
+
+def window_benchmarks(headless):
+    if headless:
+        import pyglet
+        pyglet.options["headless"] = True
+    start = time.perf_counter()
+    from main import MyWindow
+    print(f"  import main: {(time.perf_counter() - start) * 1000:8.2f} ms")
+    start = time.perf_counter()
+    window = MyWindow()
+    window.setup()
+    print(f"  MyWindow() + setup(): {(time.perf_counter() - start) * 1000:8.2f} ms")
+    for cycle in range(2):
+        for _ in Grid.DRAW_STYLE_OPTIONS:
+            style = window.draw_style
+            start = time.perf_counter()
+            window.change_draw_mode()
+            print(f"  cycle {cycle}: {style} -> {window.draw_style}: {(time.perf_counter() - start) * 1000:8.2f} ms")
+    window.close()
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--window", help="Also time the arcade window.", action="store_true")
+    p.add_argument("--headless", help="Create the window without a display.", action="store_true")
+    args = p.parse_args()
+    print("Engine")
+    engine_benchmarks()
+    if args.window:
+        print("Window")
+        window_benchmarks(args.headless)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Registered benchmark suite, run by `python run_tests.py --bench`.
+
+Each benchmark is a setup function registered with @benchmark(name). It
+builds whatever the benchmark needs and returns a function doing one unit
+of work, which is timed with timeit: the best of several repeats, in
+seconds per call. Work that uses up what it works on (a special that
+empties the grid) can return (work, prepare) instead, and prepare() is run
+before every call, outside the timing. Results are compared against a baseline file, and any
+benchmark slower than its baseline by more than the threshold counts as a
+regression.
+
+Baselines depend on the machine, so none is stored in the repository.
+Save one with `python run_tests.py --bench --update-baseline` before
+making a change, then run `python run_tests.py --bench` after it.
+"""
+
+from __future__ import annotations
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+from typing import Callable
+
+from data_structures.bset import BSet
+from data_structures.queue_adt import CircularQueue
+from data_structures.stack_adt import ArrayStack
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+from layer_store import SetLayerStore, AdditiveLayerStore, SequenceLayerStore
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object] | tuple[Callable[[], object], Callable[[], object]]]] = {}
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+def benchmark(name: str):
+    """Register a setup function returning the function to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def _layers() -> list:
+    return [layer for layer in get_layers() if layer is not None]
+
+def _painted(style: str, size: int, actions: int) -> PaintEngine:
+    rng = random.Random(0)
+    layers = _layers()
+    engine = PaintEngine(style, size, size)
+    for _ in range(actions):
+        engine.on_paint(rng.choice(layers), rng.randrange(size), rng.randrange(size))
+    return engine
+
+for _store in (SetLayerStore, AdditiveLayerStore, SequenceLayerStore):
+    def _get_color(store_class=_store):
+        store = store_class()
+        for layer in _layers()[:5]:
+            store.add(layer)
+        return lambda: store.get_color((255, 255, 255), 0, 3, 4)
+    benchmark(f"get_color.{_store.__name__}")(_get_color)
+
+for _style in Grid.DRAW_STYLE_OPTIONS:
+    def _on_paint(style=_style):
+        engine = PaintEngine(style, 32, 32)
+        rng = random.Random(0)
+        layers = _layers()
+        stamps = [(rng.choice(layers), rng.randrange(32), rng.randrange(32)) for _ in range(100)]
+        def paint():
+            for layer, x, y in stamps:
+                engine.on_paint(layer, x, y)
+            engine.reset()
+        return paint
+    benchmark(f"on_paint.{_style}")(_on_paint)
+
+    def _special(style=_style):
+        grid = _painted(style, 64, 200).grid
+        snapshot = grid.snapshot()
+        return grid.special, lambda: grid.restore(snapshot) #sequence specials empty the squares, start each from the painted grid
+    benchmark(f"special.{_style}")(_special)
+
+    def _undo_redo(style=_style):
+        engine = _painted(style, 32, 100)
+        def undo_redo():
+            for _ in range(100):
+                engine.on_undo()
+            for _ in range(100):
+                engine.on_redo()
+            engine.ReplayTracker.clear()
+        return undo_redo
+    benchmark(f"undo_redo.{_style}")(_undo_redo)
+
+    def _replay(style=_style):
+        engine = _painted(style, 32, 200)
+        pending = engine.ReplayTracker.pending()
+        def replay():
+            engine.ReplayTracker.restore(pending)
+            engine.start_replay()
+            while not engine.on_replay_next_step():
+                pass
+        return replay
+    benchmark(f"replay.{_style}")(_replay)
+
+@benchmark("bset.add_contains_remove")
+def _bset():
+    items = list(range(1, 64))
+    def run():
+        s = BSet()
+        for item in items:
+            s.add(item)
+        for item in items:
+            item in s
+        for item in items:
+            s.remove(item)
+    return run
+
+@benchmark("bset.union_intersection")
+def _bset_algebra():
+    a, b = BSet(), BSet()
+    for item in range(1, 64, 2):
+        a.add(item)
+    for item in range(1, 64, 3):
+        b.add(item)
+    return lambda: (a.union(b), a.intersection(b), a.difference(b))
+
+@benchmark("queue.append_serve")
+def _queue():
+    queue = CircularQueue(100)
+    def run():
+        for item in range(100):
+            queue.append(item)
+        while not queue.is_empty():
+            queue.serve()
+    return run
+
+@benchmark("stack.push_pop")
+def _stack():
+    stack = ArrayStack(100)
+    def run():
+        for item in range(100):
+            stack.push(item)
+        while not stack.is_empty():
+            stack.pop()
+    return run
+
+def run(names: list[str] | None = None, repeat: int = 5, report: Callable[[str, float], None] | None = None) -> dict[str, float]:
+    """
+    Time the benchmarks.
+
+    Args:
+    - names: the benchmarks to run, by default all of them.
+    - repeat: timed repeats per benchmark, the best is kept.
+    - report: called with (name, seconds per call) as each benchmark finishes.
+
+    Returns:
+    - seconds per call of each benchmark.
+    """
+    results = {}
+    for name in names if names is not None else BENCHMARKS:
+        work = BENCHMARKS[name]()
+        if isinstance(work, tuple):
+            results[name] = _run_prepared(*work, repeat)
+        else:
+            timer = timeit.Timer(work)
+            number, _ = timer.autorange() #enough calls for about 0.2 s
+            results[name] = min(timer.repeat(repeat, number)) / number
+        if report is not None:
+            report(name, results[name])
+    return results
+
+def _run_prepared(work: Callable[[], object], prepare: Callable[[], object], repeat: int) -> float:
+    """Seconds per call of work(), the best of `repeat` runs, timing each call on its own after an untimed prepare()."""
+    number, _ = timeit.Timer(lambda: (prepare(), work())).autorange()
+    perf_counter = time.perf_counter
+    best = None
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(number):
+            prepare()
+            start = perf_counter()
+            work()
+            total += perf_counter() - start
+        best = total if best is None else min(best, total)
+    return best / number
+
+def load_baseline(path: str) -> dict[str, float]:
+    """The seconds per call stored by save_baseline, or nothing if the file doesn't exist."""
+    try:
+        with open(path) as file:
+            return json.load(file)["benchmarks"]
+    except FileNotFoundError:
+        return {}
+
+def save_baseline(path: str, results: dict[str, float]) -> None:
+    meta = {"python": sys.version.split()[0], "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(path, "w") as file:
+        json.dump({"meta": meta, "benchmarks": results}, file, indent=1, sort_keys=True)
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[tuple[str, float | None, float, bool]]:
+    """
+    (name, baseline seconds or None, seconds, regressed) for each result, where
+    regressed means slower than the baseline by more than `threshold` (0.25 is 25%).
+    """
+    rows = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        rows.append((name, base, seconds, base is not None and seconds > base * (1 + threshold)))
+    return rows
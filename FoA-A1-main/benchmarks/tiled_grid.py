@@ -0,0 +1,55 @@
+"""
+Out-of-core grid benchmark.
+
+Paints random brush stamps, with undo and redo, across a huge TiledGrid
+and reports paint rate, tile traffic and peak memory, which should stay
+bounded by the tile cache however large the canvas is.
+
+    python -m benchmarks.tiled_grid [--size 16384] [--style SET] [--actions 2000]
+"""
+
+import argparse
+import random
+import resource
+import time
+
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+from tiled_grid import TiledGrid
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--size", help="Grid width and height.", type=int, default=16384)
+    p.add_argument("--style", help="Draw style.", choices=Grid.DRAW_STYLE_OPTIONS, default=Grid.DRAW_STYLE_SET)
+    p.add_argument("--actions", help="Brush stamps painted.", type=int, default=2000)
+    p.add_argument("--tile-size", type=int, default=TiledGrid.DEFAULT_TILE_SIZE)
+    p.add_argument("--cache-tiles", type=int, default=TiledGrid.DEFAULT_CACHE_TILES)
+    args = p.parse_args()
+    rng = random.Random(0)
+    layers = [layer for layer in get_layers() if layer is not None]
+    before = peak_mb()
+    grid = TiledGrid(args.style, args.size, args.size, tile_size=args.tile_size, cache_tiles=args.cache_tiles)
+    engine = PaintEngine(args.style, grid=grid)
+    print(f"{args.size}x{args.size} {args.style}, {args.tile_size}x{args.tile_size} tiles, "
+          f"{args.cache_tiles} cached, backing file {len(grid.map) / 1e9:.2f} GB (sparse)")
+    start = time.perf_counter()
+    for i in range(args.actions):
+        if i % 10 == 9:
+            engine.on_undo()
+        else:
+            # Mostly local strokes, with an occasional jump across the canvas.
+            if i % 50 == 0:
+                cx, cy = rng.randrange(args.size), rng.randrange(args.size)
+            engine.on_paint(rng.choice(layers), min(args.size - 1, cx + rng.randrange(64)),
+                            min(args.size - 1, cy + rng.randrange(64)))
+    elapsed = time.perf_counter() - start
+    print(f"  {args.actions / elapsed:8.1f} actions/s, {grid.loads} tile loads, {grid.writes} tile writes")
+    print(f"  peak memory: {peak_mb():.0f} MB ({peak_mb() - before:.0f} MB above startup)")
+    grid.close()
+
+if __name__ == "__main__":
+    main()
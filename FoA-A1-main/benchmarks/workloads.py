@@ -0,0 +1,150 @@
+"""
+Synthetic workloads.
+
+Each workload is a generator function taking a random generator, the grid
+size and an operation count, and yielding operations for run_operation():
+
+    ("paint", layer, x, y, brush_size)
+    ("erase", layer, x, y, brush_size)
+    ("special",), ("undo",), ("redo",)
+    ("replay",)        replay everything recorded, one timed step per action
+
+Workloads are deterministic for a given seed, so runs can be compared.
+"""
+
+from __future__ import annotations
+import random
+from typing import Callable, Iterator
+
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+
+Operation = tuple
+Workload = Callable[[random.Random, int, int], Iterator[Operation]]
+
+WORKLOADS: dict[str, Workload] = {}
+
+def workload(func: Workload) -> Workload:
+    """Register a workload under its function name."""
+    WORKLOADS[func.__name__] = func
+    return func
+
+def _layers() -> list:
+    return [layer for layer in get_layers() if layer is not None]
+
+def _walk(rng: random.Random, size: int, x: int, y: int) -> tuple[int, int]:
+    """One step of a drag: move to a neighbouring square, staying on the grid."""
+    dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1)))
+    return min(max(x + dx, 0), size - 1), min(max(y + dy, 0), size - 1)
+
+@workload
+def long_drag(rng: random.Random, size: int, count: int) -> Iterator[Operation]:
+    """One layer dragged along a random walk, like holding the mouse down."""
+    layer = rng.choice(_layers())
+    x = y = size // 2
+    for _ in range(count):
+        yield ("paint", layer, x, y, 1)
+        x, y = _walk(rng, size, x, y)
+
+@workload
+def big_brush(rng: random.Random, size: int, count: int) -> Iterator[Operation]:
+    """Random stamps with the largest brush."""
+    layers = _layers()
+    for _ in range(count):
+        yield ("paint", rng.choice(layers), rng.randrange(size), rng.randrange(size), Grid.MAX_BRUSH)
+
+@workload
+def special_spam(rng: random.Random, size: int, count: int) -> Iterator[Operation]:
+    """A few paints, then special after special."""
+    layers = _layers()
+    for i in range(count):
+        if i % 4 == 0:
+            yield ("paint", rng.choice(layers), rng.randrange(size), rng.randrange(size), 2)
+        else:
+            yield ("special",)
+
+@workload
+def deep_undo(rng: random.Random, size: int, count: int) -> Iterator[Operation]:
+    """Paint a third of the operations, undo all of them, then redo all of them."""
+    layers = _layers()
+    depth = max(1, count // 3)
+    for _ in range(depth):
+        yield ("paint", rng.choice(layers), rng.randrange(size), rng.randrange(size), 2)
+    for _ in range(depth):
+        yield ("undo",)
+    for _ in range(depth):
+        yield ("redo",)
+
+@workload
+def long_replay(rng: random.Random, size: int, count: int) -> Iterator[Operation]:
+    """Record a session of drags, undos and specials, then replay it."""
+    yield from mixed(rng, size, count)
+    yield ("replay",)
+
+@workload
+def mixed(rng: random.Random, size: int, count: int) -> Iterator[Operation]:
+    """
+    Something like a real session: short drags with one layer, some undo and
+    redo, an occasional erase or special, and changes of brush size.
+    """
+    layers = _layers()
+    done = 0
+    while done < count:
+        roll = rng.random()
+        if roll < 0.1:
+            yield ("undo",)
+            done += 1
+        elif roll < 0.15:
+            yield ("redo",)
+            done += 1
+        elif roll < 0.16:
+            yield ("special",)
+            done += 1
+        elif roll < 0.2:
+            yield ("erase", rng.choice(layers), rng.randrange(size), rng.randrange(size), rng.randint(0, 3))
+            done += 1
+        else:
+            layer, brush_size = rng.choice(layers), rng.randint(0, 3)
+            x, y = rng.randrange(size), rng.randrange(size)
+            for _ in range(min(rng.randint(5, 40), count - done)):
+                yield ("paint", layer, x, y, brush_size)
+                x, y = _walk(rng, size, x, y)
+                done += 1
+
+def run_operation(engine: PaintEngine, operation: Operation, timer: Callable[[], float]) -> list[tuple[str, float]]:
+    """
+    Apply one operation to the engine.
+
+    Returns:
+    - (operation type, seconds) for each timed part: one for most operations,
+      one "replay_step" per action for a replay.
+    """
+    kind = operation[0]
+    if kind == "replay":
+        engine.start_replay()
+        times = []
+        while True:
+            start = timer()
+            finished = engine.on_replay_next_step()
+            if finished:
+                return times
+            times.append(("replay_step", timer() - start))
+    if kind in ("paint", "erase"):
+        engine.grid.brush_size = operation[4]
+    start = timer()
+    if kind in ("paint", "erase"):
+        _, layer, x, y, _ = operation
+        if kind == "paint":
+            engine.on_paint(layer, x, y)
+        else:
+            engine.on_erase(layer, x, y)
+    elif kind == "special":
+        engine.on_special()
+    elif kind == "undo":
+        engine.on_undo()
+    elif kind == "redo":
+        engine.on_redo()
+    else:
+        raise ValueError(f"Unknown operation {kind}.")
+    return [(kind, timer() - start)]
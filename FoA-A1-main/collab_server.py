@@ -0,0 +1,423 @@
+"""
+Local collaboration server.
+
+CollabServer owns a headless PaintEngine and lets any number of clients
+paint on it together over TCP on localhost or a Unix socket, using the
+messages in protocol.py. Commands are applied as they arrive, in arrival
+order, and the squares they change are collected. Once per tick the
+changed squares are encoded into a single DELTA message which is written
+to every client, so the encoding cost doesn't grow with the number of
+clients and a square changed many times in a tick is only sent once.
+A special action changes every square, so that tick sends a SNAPSHOT.
+A BATCH (see batch.py) is run as a whole before anything else is read, and
+its results go back to the client that sent it.
+
+A client whose socket isn't keeping up (more than `high_water` bytes
+waiting to be sent) stops receiving the shared messages. Instead the
+squares it missed are remembered, and once its buffer has drained below
+half of `high_water` it gets a single catch-up message with their current
+states. A slow client therefore costs at most one pending entry per square
+rather than an ever growing buffer, and never holds up the others.
+
+    python -m collab_server --port 8765 --size 64 64
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import struct
+import time
+
+from batch import OP, render_count, run_batch
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layer
+import protocol
+
+class _Client:
+    """Server side state of one connection."""
+
+    __slots__ = ("writer", "pending", "full", "behind")
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.pending = {} #squares changed while the client was behind
+        self.full = False #a snapshot is owed instead of pending
+        self.behind = False
+
+    def buffered(self) -> int:
+        return self.writer.transport.get_write_buffer_size()
+
+class CollabServer:
+    DEFAULT_TICK = 1 / 30
+    DEFAULT_HIGH_WATER = 1 << 20
+    YIELD_EVERY = 64 #commands read from one client before letting the others run
+
+    def __init__(self, engine: PaintEngine | None = None, tick: float = DEFAULT_TICK,
+                 high_water: int = DEFAULT_HIGH_WATER) -> None:
+        """
+        Initialise the CollabServer object. Nothing is served until start().
+
+        Args:
+        - engine: the engine painted on, by default a new 32x32 SET engine.
+        - tick: seconds between broadcasts.
+        - high_water: bytes buffered for a client before it is treated as slow.
+
+        Raises:
+        - ValueError: if tick or high_water isn't positive, or the grid is too large for the protocol.
+
+        Complexity:
+        -Worst Case: O(1), constant
+        -Best Case: O(1), constant
+        """
+        if tick <= 0 or high_water <= 0:
+            raise ValueError("Tick and high water mark should be positive.")
+        self.engine = engine if engine is not None else PaintEngine()
+        if self.engine.grid.x > 0xFFFF or self.engine.grid.y > 0xFFFF:
+            raise ValueError("Grid is too large for the protocol.")
+        self.tick = tick
+        self.high_water = high_water
+        self.clients = []
+        self.dirty = {} #squares changed since the last broadcast
+        self.full = False #a special action since the last broadcast
+        self.recorded = self.engine.ReplayTracker.recorded
+        self.ticks = 0
+        self.commands = 0
+        self.catch_ups = 0
+        self.bytes_sent = 0
+        self.server = None
+        self.ticker = None
+        self.handlers = set() #connection tasks, cancelled by close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: str | None = None) -> None:
+        """
+        Start listening, on a Unix socket if `path` is given, otherwise on TCP (port 0 picks a free port).
+        """
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self.server = await asyncio.start_server(self._serve, host, port)
+        self.ticker = asyncio.create_task(self._run_ticks())
+
+    @property
+    def address(self):
+        """The address being listened on, (host, port) or a socket path."""
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        await self.server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening and disconnect every client."""
+        if self.ticker is not None:
+            self.ticker.cancel()
+            self.ticker = None
+        if self.server is not None:
+            self.server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        handlers = list(self.handlers)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+            self.server = None
+
+    def apply(self, kind: int, payload: bytes = b"") -> bytes | None:
+        """
+        Apply one client command to the engine and note the squares it changed.
+        Returns the reply to a BATCH, RESULTS or ERROR, and None for other commands.
+
+        The replay log drops its oldest action when full rather than refusing
+        commands, so a long session only keeps its most recent replay history.
+
+        Raises:
+        - ProtocolError: if the command is unknown or malformed.
+
+        Complexity:
+        -Worst Case: O(d*d*comp), painting with brush size d, or O(x*y*n) for a special
+        -Best Case: O(1), undo or redo with nothing to do
+        """
+        engine = self.engine
+        tracker = engine.ReplayTracker
+        if tracker.action.is_full():
+            tracker.drop_oldest()
+        if kind == protocol.BATCH:
+            return self._run_batch(payload)
+        if kind == protocol.PAINT:
+            try:
+                index, x, y, brush_size = protocol.PAINT_BODY.unpack(payload)
+                layer = get_layer(index)
+            except (struct.error, IndexError) as e:
+                raise protocol.ProtocolError(f"Bad paint command: {e}") from None
+            if layer is None:
+                raise protocol.ProtocolError(f"No layer {index}.")
+            engine.grid.brush_size = min(max(brush_size, Grid.MIN_BRUSH), Grid.MAX_BRUSH)
+            engine.on_paint(layer, x, y)
+        elif kind == protocol.UNDO:
+            engine.on_undo()
+        elif kind == protocol.REDO:
+            engine.on_redo()
+        elif kind == protocol.SPECIAL:
+            engine.on_special()
+        else:
+            raise protocol.ProtocolError(f"Unknown command {kind}.")
+        self.commands += 1
+        count = tracker.recorded - self.recorded
+        self.recorded = tracker.recorded
+        for action, _ in tracker.recent(count):
+            if action.is_special:
+                self.full = True
+                self.dirty.clear()
+            elif not self.full:
+                for step in action.steps:
+                    self.dirty[step.affected_grid_square] = None
+
+    def _run_batch(self, payload: bytes) -> bytes:
+        tracker = self.engine.ReplayTracker
+        grid = self.engine.grid
+        try:
+            size = protocol.results_size(len(payload) // OP.size, render_count(payload), grid.x * grid.y * 3)
+        except ValueError as e:
+            return protocol.encode(protocol.ERROR, str(e).encode())
+        if size > protocol.MAX_PAYLOAD: #the client couldn't read the reply, so don't run any of it
+            return protocol.encode(protocol.ERROR, f"Results of {size} bytes would be over the "
+                                                   f"{protocol.MAX_PAYLOAD} byte limit, split the batch.".encode())
+        try:
+            result = run_batch(self.engine, payload)
+        except ValueError as e:
+            result = None
+            reply = protocol.encode(protocol.ERROR, str(e).encode())
+        else:
+            self.commands += len(result.values)
+            reply = protocol.encode_results(result.values, result.frames)
+        self.recorded = tracker.recorded
+        if result is None or result.touched is None: #a failed batch may have changed anything
+            self.full = True
+            self.dirty.clear()
+        elif not self.full:
+            self.dirty.update(dict.fromkeys(result.touched))
+        return reply
+
+    def _snapshot(self) -> bytes:
+        return protocol.encode_cells(protocol.SNAPSHOT, self.ticks, self.engine.grid.snapshot()[1].items())
+
+    def _delta(self, squares) -> bytes:
+        grid = self.engine.grid
+        return protocol.encode_cells(protocol.DELTA, self.ticks,
+                                     (((x, y), grid[x][y].stack_state()) for x, y in squares))
+
+    def _write(self, client: _Client, message: bytes) -> None:
+        client.writer.write(message)
+        self.bytes_sent += len(message)
+
+    def broadcast(self) -> None:
+        """
+        Send the squares changed since the last broadcast, and catch up slow clients that have drained.
+
+        Complexity:
+        -Worst Case: O(c*n + k), c changed squares of n layers (the whole grid after a special), k clients
+        -Best Case: O(k), nothing changed
+        """
+        changed = self.full or self.dirty
+        message = None
+        if changed:
+            self.ticks += 1
+            message = self._snapshot() if self.full else self._delta(self.dirty)
+        for client in self.clients:
+            if client.writer.is_closing():
+                continue
+            buffered = client.buffered()
+            if not client.behind and buffered <= self.high_water:
+                if message is not None:
+                    self._write(client, message)
+                continue
+            client.behind = True
+            if self.full:
+                client.full = True
+                client.pending.clear()
+            elif not client.full:
+                client.pending.update(self.dirty)
+            if buffered <= self.high_water // 2: #drained enough, send everything it missed at once
+                self._write(client, self._snapshot() if client.full else self._delta(client.pending))
+                client.pending.clear()
+                client.full = client.behind = False
+                self.catch_ups += 1
+        self.dirty = {}
+        self.full = False
+
+    async def _run_ticks(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            self.broadcast()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _Client(writer)
+        handler = asyncio.current_task()
+        self.handlers.add(handler)
+        grid = self.engine.grid
+        self._write(client, protocol.encode_welcome(grid.draw_style, grid.x, grid.y))
+        self._write(client, self._snapshot())
+        self.clients.append(client)
+        try:
+            read = 0
+            while True:
+                message = await protocol.read_message(reader)
+                if message is None:
+                    break
+                reply = self.apply(*message)
+                if reply is not None:
+                    self._write(client, reply)
+                read += 1
+                if read % self.YIELD_EVERY == 0: #buffered commands don't suspend, let others in
+                    await asyncio.sleep(0)
+        except (protocol.ProtocolError, ConnectionError):
+            pass
+        except asyncio.CancelledError: #close(); ending normally keeps asyncio from logging it as an error
+            pass
+        finally:
+            self.clients.remove(client)
+            self.handlers.discard(handler)
+            writer.close()
+
+class CollabClient:
+    """
+    A client of CollabServer keeping a mirror of the server's grid as
+    {(x, y): (layers, inverted)} for every non-empty square.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.draw_style = None
+        self.width = self.height = 0
+        self.cells = {}
+        self.changed = [] #squares listed by the last SNAPSHOT or DELTA
+        self.tick = 0
+        self.received = 0
+        self.reply = None #results of the last batch
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 0, path: str | None = None) -> CollabClient:
+        """Connect and wait for the server's welcome and first snapshot."""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer)
+        await client.receive()
+        await client.receive()
+        return client
+
+    def paint(self, layer, x: int, y: int, brush_size: int = Grid.DEFAULT_BRUSH_SIZE) -> None:
+        self.writer.write(protocol.encode_paint(layer.index, x, y, brush_size))
+
+    def undo(self) -> None:
+        self.writer.write(protocol.encode(protocol.UNDO))
+
+    def redo(self) -> None:
+        self.writer.write(protocol.encode(protocol.REDO))
+
+    def special(self) -> None:
+        self.writer.write(protocol.encode(protocol.SPECIAL))
+
+    async def run_batch(self, batch) -> tuple[list[int], list[bytes]]:
+        """
+        Send a Batch (or its bytes) and wait for its results, applying broadcasts that arrive meanwhile.
+
+        Raises:
+        - ValueError: if the server couldn't run the whole batch.
+
+        Returns:
+        - the values and frames of the batch.BatchResult.
+        """
+        self.writer.write(protocol.encode(protocol.BATCH, bytes(batch)))
+        while True:
+            kind = await self.receive()
+            if kind is None:
+                raise ConnectionError("Server disconnected before replying.")
+            if kind in (protocol.RESULTS, protocol.ERROR):
+                reply, self.reply = self.reply, None
+                if kind == protocol.ERROR:
+                    raise ValueError(reply)
+                return reply
+
+    async def drain(self) -> None:
+        """Wait until the commands written so far have been handed to the socket."""
+        await self.writer.drain()
+
+    async def receive(self) -> int | None:
+        """
+        Apply the next message from the server to the mirror.
+
+        Returns:
+        - the message kind, or None once the server has disconnected.
+
+        Raises:
+        - ProtocolError: if the message is malformed or unexpected.
+        """
+        message = await protocol.read_message(self.reader)
+        if message is None:
+            return None
+        return self.apply(*message)
+
+    def apply(self, kind: int, payload: bytes) -> int:
+        """Apply a message from the server to the mirror, returning its kind. See receive()."""
+        self.received += len(payload) + protocol.HEADER.size
+        if kind == protocol.WELCOME:
+            self.draw_style, self.width, self.height = protocol.decode_welcome(payload)
+        elif kind in (protocol.SNAPSHOT, protocol.DELTA):
+            self.tick, cells = protocol.decode_cells(payload)
+            if kind == protocol.SNAPSHOT:
+                self.cells.clear()
+            self.changed = [square for square, _ in cells]
+            for square, state in cells:
+                if state[0] or state[1]:
+                    self.cells[square] = state
+                else:
+                    self.cells.pop(square, None)
+        elif kind == protocol.RESULTS:
+            self.reply = protocol.decode_results(payload, self.width * self.height * 3)
+        elif kind == protocol.ERROR:
+            self.reply = payload.decode()
+        else:
+            raise protocol.ProtocolError(f"Unexpected message {kind}.")
+        return kind
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def _main(args) -> None:
+    server = CollabServer(PaintEngine(args.style, *args.size), args.tick)
+    await server.start(args.host, args.port, args.unix)
+    print(f"Serving on {server.address}")
+    start = time.perf_counter()
+    try:
+        await server.serve_forever()
+    finally:
+        elapsed = time.perf_counter() - start
+        print(f"{server.commands} commands, {server.ticks} broadcasts, {server.bytes_sent} bytes "
+              f"in {elapsed:.1f}s")
+        await server.close()
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a shared canvas to local clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--style", choices=Grid.DRAW_STYLE_OPTIONS, default=Grid.DRAW_STYLE_SET)
+    parser.add_argument("--size", type=int, nargs=2, metavar=("X", "Y"), default=[32, 32])
+    parser.add_argument("--tick", type=float, default=CollabServer.DEFAULT_TICK, help="seconds between broadcasts")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Thread-safe command queue.
+
+Other threads must not call a window's (or engine's) methods directly,
+since they would race with on_update and on_draw. Instead they submit
+commands, and the owning thread applies everything queued so far in one
+batch with drain(), which MyWindow does at the start of every on_update.
+Rendering then always sees the state between whole batches.
+
+    proxy = CommandProxy(window.commands, window)
+    proxy.on_paint(rainbow, 8, 8)      # queued, returns a Future
+    proxy.on_undo().result()           # waits until the undo has been applied
+"""
+
+from __future__ import annotations
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+class CommandQueue:
+
+    def __init__(self, maxsize: int = 0) -> None:
+        """
+        Initialise the CommandQueue object.
+
+        Args:
+        - maxsize: queued commands before submit() blocks, 0 for no limit.
+
+        Raises:
+        - ValueError: if maxsize is negative.
+
+        Complexity:
+        -Worst Case: O(1), constant
+        -Best Case: O(1), constant
+        """
+        if maxsize < 0:
+            raise ValueError("Queue size should not be negative.")
+        self.maxsize = maxsize
+        self.commands = deque()
+        self.condition = threading.Condition()
+        self.applied = 0
+
+    def submit(self, name: str | None, *args, **kwargs) -> Future:
+        """
+        Queue a call of method `name`, blocking while the queue is full.
+        A name of None queues nothing but a marker, see CommandProxy.sync.
+
+        Returns:
+        - a Future for the method's result, set once the command has been applied.
+
+        Complexity:
+        -Worst Case: O(1), plus any time spent waiting for room
+        -Best Case: O(1), constant
+        """
+        future = Future()
+        with self.condition:
+            while self.maxsize and len(self.commands) >= self.maxsize:
+                self.condition.wait()
+            self.commands.append((name, args, kwargs, future))
+        return future
+
+    def drain(self, target) -> int:
+        """
+        Apply every command queued so far to `target`, in submission order.
+        Commands submitted while draining wait for the next drain.
+        A command that raises sets its Future's exception; the rest still run.
+
+        Returns:
+        - the number of commands applied.
+
+        Complexity:
+        -Worst Case: O(c*m), c commands each costing up to m
+        -Best Case: O(1), nothing queued
+        """
+        if not self.commands:
+            return 0
+        with self.condition:
+            batch, self.commands = self.commands, deque()
+            self.condition.notify_all()
+        for name, args, kwargs, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(None if name is None else getattr(target, name)(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        self.applied += len(batch)
+        return len(batch)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+class CommandProxy:
+    """
+    Stands in for `target` on another thread: method calls are queued on
+    `queue` and return Futures, other attributes are read from `target`.
+    """
+
+    def __init__(self, queue: CommandQueue, target) -> None:
+        self._queue = queue
+        self._target = target
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+        def submit(*args, **kwargs) -> Future:
+            return self._queue.submit(name, *args, **kwargs)
+        return submit
+
+    def sync(self) -> None:
+        """Wait until every command submitted so far has been applied."""
+        self._queue.submit(None).result()
@@ -1,4 +1,6 @@
 import abc
+import functools
+import time
 
 class InvalidValueException(Exception):
     pass
@@ -125,3 +127,34 @@ class advanced(Decorator):
         """
         if saved_value is not None:
             results["name"] = "[ADV] {}".format(results["name"])
+
+class time_budget(Decorator):
+    """
+    Fails the test if it takes longer than the given number of seconds,
+    whichever runner is used. The budget is also added to the JSON result.
+
+    Usage: @time_budget(0.5)
+    """
+
+    def validate(self, v):
+        if not isinstance(v, (float, int)):
+            return "Time budget should be a float/int."
+        if v <= 0:
+            return "Time budget should be positive."
+
+    def __call__(self, func):
+        budget = self.v
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            if elapsed > budget:
+                raise AssertionError("Took {:.3f}s, over its time budget of {}s.".format(elapsed, budget))
+            return value
+        return super().__call__(timed)
+
+    @classmethod
+    def change_result(cls, saved_value, results:dict, output:str, err):
+        if saved_value is not None:
+            results["time_budget"] = saved_value
@@ -4,8 +4,10 @@ from __future__ import print_function
 import sys
 import json
 import inspect
+import time
+import tracemalloc
 
-from unittest import result
+from unittest import result, runner
 from unittest.signals import registerResult
 import ed_utils.decorators as decorators
 
@@ -18,7 +20,67 @@ DECORATOR_CLASSES = [
     )
 ]
 
-class JSONTestResult(result.TestResult):
+class TimingMixin(object):
+    """Records each test's wall time and, while tracemalloc is tracing, its peak allocated memory.
+
+    Timings are kept in self.timings as {name: {"time": seconds, "peak_memory": bytes}}.
+    """
+    def __init__(self, *args, **kwargs):
+        super(TimingMixin, self).__init__(*args, **kwargs)
+        self.timings = {}
+        self._timed = None
+
+    def startTest(self, test):
+        super(TimingMixin, self).startTest(test)
+        self._timed = test
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        self._time_start = time.perf_counter()
+
+    def recordTiming(self, test):
+        """Measure the test that just finished, before its outcome is reported."""
+        if test is not self._timed: #e.g. a setUpClass error, which has no test of its own
+            return
+        self._timed = None
+        timing = {"time": time.perf_counter() - self._time_start}
+        if tracemalloc.is_tracing():
+            timing["peak_memory"] = max(0, tracemalloc.get_traced_memory()[1] - self._memory_start)
+        self.timings[test.id()] = timing
+
+    def addSuccess(self, test):
+        self.recordTiming(test)
+        super(TimingMixin, self).addSuccess(test)
+
+    def addError(self, test, err):
+        self.recordTiming(test)
+        super(TimingMixin, self).addError(test, err)
+
+    def addFailure(self, test, err):
+        self.recordTiming(test)
+        super(TimingMixin, self).addFailure(test, err)
+
+    def addSkip(self, test, reason):
+        self.recordTiming(test)
+        super(TimingMixin, self).addSkip(test, reason)
+
+    def slowest(self, count):
+        """The `count` slowest tests as (test id, timing), slowest first."""
+        return sorted(self.timings.items(), key=lambda item: item[1]["time"], reverse=True)[:count]
+
+def slowest_report(result, count):
+    """A text table of the `count` slowest tests of a TimingMixin result."""
+    lines = ["Slowest {} tests:".format(count)]
+    for name, timing in result.slowest(count):
+        memory = timing.get("peak_memory")
+        memory = "{:10.1f} KiB".format(memory / 1024) if memory is not None else ""
+        lines.append("{:9.3f}s {} {}".format(timing["time"], memory, name))
+    return "\n".join(lines)
+
+class TimedTextTestResult(TimingMixin, runner.TextTestResult):
+    """A TextTestResult that also records timings, for slowest_report."""
+
+class JSONTestResult(TimingMixin, result.TestResult):
     """A test result class that can print formatted text results to a stream.
 
     Used by JSONTestRunner.
@@ -51,6 +113,7 @@ class JSONTestResult(result.TestResult):
             "name": self.getDescription(test),
             "ok": True,
         }
+        result.update(self.timings.get(test.id(), {}))
         for dec in DECORATOR_CLASSES:
             method = getattr(test, test._testMethodName)
             val = getattr(method, dec.get_attr_name(), None)
@@ -83,15 +146,20 @@ class JSONTestRunner(object):
 
     def __init__(self, stream=sys.stdout, descriptions=True, verbosity=1,
                  failfast=False, buffer=True,
-                 stdout_visibility=None):
+                 stdout_visibility=None, track_memory=True, slowest=0):
         """
-        Set buffer to True to include test output in JSON
+        Set buffer to True to include test output in JSON.
+        Every test's result has its wall "time" in seconds and, with track_memory,
+        the "peak_memory" in bytes allocated while it ran (tracemalloc slows tests down).
+        With slowest=N the JSON also lists the N slowest tests under "slowest".
         """
         self.stream = stream
         self.descriptions = descriptions
         self.verbosity = verbosity
         self.failfast = failfast
         self.buffer = buffer
+        self.track_memory = track_memory
+        self.slowest = slowest
         self.json_data = {
             "testcases": [],
         }
@@ -108,6 +176,9 @@ class JSONTestRunner(object):
         registerResult(result)
         result.failfast = self.failfast
         result.buffer = self.buffer
+        tracing = self.track_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
         startTestRun = getattr(result, 'startTestRun', None)
         if startTestRun is not None:
             startTestRun()
@@ -117,8 +188,14 @@ class JSONTestRunner(object):
             stopTestRun = getattr(result, 'stopTestRun', None)
             if stopTestRun is not None:
                 stopTestRun()
+            if tracing:
+                tracemalloc.stop()
 
         self.json_data["testcases"].sort(key=lambda x: x["name"])
+        if self.slowest:
+            self.json_data["slowest"] = [
+                dict(name=name, **timing) for name, timing in result.slowest(self.slowest)
+            ]
         json.dump(self.json_data, self.stream, indent=4)
         self.stream.write('\n')
         return result
@@ -0,0 +1,162 @@
+"""Running tests across worker processes"""
+from __future__ import print_function
+
+import json
+import sys
+import time
+import tracemalloc
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+
+from ed_utils.json_test_runner import JSONTestRunner, TimingMixin, slowest_report
+
+LETTERS = {"success": ".", "failure": "F", "error": "E", "skip": "s",
+           "expected_failure": "x", "unexpected_success": "u"}
+
+def iter_tests(suite):
+    """Every test case in a (nested) suite, in run order."""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for inner in iter_tests(test):
+                yield inner
+        else:
+            yield test
+
+def shard(tests, workers):
+    """
+    Split the tests into at most `workers` lists of test ids. Tests of one
+    class stay together, so setUpClass runs once, and classes are dealt out
+    in order, so the split only depends on the tests and the worker count.
+    """
+    classes = []
+    for test in tests:
+        key = type(test)
+        if not classes or classes[-1][0] is not key:
+            classes.append((key, []))
+        classes[-1][1].append(test.id())
+    shards = [[] for _ in range(workers)]
+    for i, (_, ids) in enumerate(classes):
+        shards[i % workers].extend(ids)
+    return [ids for ids in shards if ids]
+
+class ShardResult(TimingMixin, unittest.TextTestResult):
+    """Keeps each test's outcome, description and traceback, to be merged by the parent."""
+
+    def __init__(self, *args, **kwargs):
+        super(ShardResult, self).__init__(*args, **kwargs)
+        self.outcomes = []
+
+    def _record(self, test, outcome, err=None):
+        self.outcomes.append((test.id(), outcome, self.getDescription(test),
+                              self._exc_info_to_string(err, test) if err is not None else None))
+
+    def addSuccess(self, test):
+        super(ShardResult, self).addSuccess(test)
+        self._record(test, "success")
+
+    def addError(self, test, err):
+        super(ShardResult, self).addError(test, err)
+        self._record(test, "error", err)
+
+    def addFailure(self, test, err):
+        super(ShardResult, self).addFailure(test, err)
+        self._record(test, "failure", err)
+
+    def addSkip(self, test, reason):
+        super(ShardResult, self).addSkip(test, reason)
+        self._record(test, "skip")
+
+    def addExpectedFailure(self, test, err):
+        super(ShardResult, self).addExpectedFailure(test, err)
+        self._record(test, "expected_failure")
+
+    def addUnexpectedSuccess(self, test):
+        super(ShardResult, self).addUnexpectedSuccess(test)
+        self._record(test, "unexpected_success")
+
+def _load(ids):
+    loader = unittest.defaultTestLoader
+    return unittest.TestSuite(loader.loadTestsFromName(test_id) for test_id in ids)
+
+def run_shard(ids, for_ed, track_memory):
+    """
+    Worker side: run the tests with these ids.
+
+    Returns (outcomes, timings) where outcomes are JSON test results when for_ed,
+    otherwise (id, outcome, description, traceback) tuples.
+    """
+    return _run(_load(ids), for_ed, track_memory)
+
+def _run(suite, for_ed, track_memory):
+    if for_ed:
+        runner = JSONTestRunner(stream=StringIO(), track_memory=track_memory)
+        result = runner.run(suite)
+        return runner.json_data["testcases"], result.timings
+    result = ShardResult(StringIO(), True, 0)
+    if track_memory:
+        tracemalloc.start()
+    try:
+        suite.run(result)
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+    return result.outcomes, result.timings
+
+def run_parallel(suite, workers, for_ed=False, slowest=0, stream=None):
+    """
+    Run a suite across `workers` processes, writing the same text (to stderr)
+    or JSON (to stdout) that TextTestRunner or JSONTestRunner would.
+    Output doesn't depend on the number of workers, except for the time taken.
+
+    Returns True if every test passed.
+    """
+    tests = list(iter_tests(suite))
+    order = {test.id(): i for i, test in enumerate(tests)}
+    # Tests that couldn't be imported can't be loaded again by id, run them here.
+    local = [test for test in tests if type(test).__module__ == "unittest.loader"]
+    remote = [test for test in tests if type(test).__module__ != "unittest.loader"]
+    start = time.perf_counter()
+    outcomes, merged = [], TimingMixin()
+    track_memory = for_ed or bool(slowest)
+    with ProcessPoolExecutor(max(1, workers)) as pool:
+        futures = [pool.submit(run_shard, ids, for_ed, track_memory) for ids in shard(remote, workers)]
+        if local:
+            found, timings = _run(unittest.TestSuite(local), for_ed, False)
+            outcomes.extend(found)
+            merged.timings.update(timings)
+        for future in futures:
+            found, timings = future.result()
+            outcomes.extend(found)
+            merged.timings.update(timings)
+    elapsed = time.perf_counter() - start
+
+    if for_ed:
+        stream = stream or sys.stdout
+        json_data = {"testcases": sorted(outcomes, key=lambda x: x["name"])}
+        if slowest:
+            json_data["slowest"] = [dict(name=name, **timing) for name, timing in merged.slowest(slowest)]
+        json.dump(json_data, stream, indent=4)
+        stream.write('\n')
+        return all(case["passed"] for case in outcomes)
+
+    stream = stream or sys.stderr
+    # Outcomes without a test of their own, e.g. setUpClass errors, go last.
+    outcomes.sort(key=lambda o: (order.get(o[0], len(order)), o[0]))
+    stream.write("".join(LETTERS[o[1]] for o in outcomes) + "\n")
+    for outcome, flavour in (("error", "ERROR"), ("failure", "FAIL")):
+        for _, kind, description, trace in outcomes:
+            if kind == outcome:
+                stream.write("=" * 70 + "\n%s: %s\n" % (flavour, description) + "-" * 70 + "\n%s\n" % trace)
+    counts = {kind: sum(1 for o in outcomes if o[1] == kind) for kind in LETTERS}
+    run = len(outcomes) - sum(1 for o in outcomes if o[0].startswith(("setUpClass", "tearDownClass", "setUpModule", "tearDownModule")))
+    stream.write("-" * 70 + "\nRan %d test%s in %.3fs\n\n" % (run, "" if run == 1 else "s", elapsed))
+    details = ["%s=%d" % (name, counts[kind]) for kind, name in (
+        ("failure", "failures"), ("error", "errors"), ("skip", "skipped"),
+        ("expected_failure", "expected failures"), ("unexpected_success", "unexpected successes")) if counts[kind]]
+    ok = not (counts["failure"] or counts["error"] or counts["unexpected_success"])
+    status = "OK" if ok else "FAILED"
+    stream.write(status + (" (%s)" % ", ".join(details) if details else "") + "\n")
+    if slowest:
+        stream.write(slowest_report(merged, slowest) + "\n")
+    return ok
@@ -0,0 +1,350 @@
+"""
+Headless paint engine.
+
+PaintEngine owns a grid plus its undo and replay history, and can render
+the grid into a pixel buffer. It never imports arcade, so batch jobs,
+servers and tests can use it without a display. MyWindow (window.py) is the
+interactive front end built on top of it.
+"""
+
+from __future__ import annotations
+from grid import Grid
+from grid_renderer import GridPixelBuffer
+from layer_util import Layer, pack_color
+from action import PaintAction, PaintStep, EraseStep
+from undo import UndoTracker
+from replay import ReplayTracker
+from animation_cache import AnimationCache
+from command_queue import CommandQueue
+
+class PaintEngine:
+    """ Headless painter """
+
+    GRID_SIZE_X = 32
+    GRID_SIZE_Y = 32
+
+    BG = [255, 255, 255]
+
+    # Set to True to also cache continuous layers like rainbow, to within ANIMATION_QUANTUM.
+    ANIMATION_APPROXIMATE = False
+    ANIMATION_QUANTUM = 0.05
+
+    REPLAY_TIMER_DELTA = 0.05 #seconds between replay steps played by on_update
+
+    def __init__(self, draw_style: str = Grid.DRAW_STYLE_SET, x: int = GRID_SIZE_X, y: int = GRID_SIZE_Y,
+                 grid: Grid | None = None) -> None:
+        """Initialise the grid (unless one, such as a TiledGrid, is given), history and renderer."""
+        self.draw_style = draw_style
+        self.grid = grid if grid is not None else Grid(draw_style, x, y)
+        self.timestamp = 0
+        self.bg_packed = pack_color(self.BG)
+        self.animation_cache = AnimationCache(self.ANIMATION_QUANTUM, approximate=self.ANIMATION_APPROXIMATE)
+        self.grid_pixels = None #created by the first render(), a huge canvas may never need one
+        self.resets = 0 #number of reset() calls, so observers like AutosaveService can tell
+        self.replays = 0 #number of start_replay() calls, which clear the grid but keep the history
+        self.autosave = None #AutosaveService ticked by the front end, if any
+        self.commands = CommandQueue() #calls from other threads, applied by apply_commands()
+        self.enable_ui = True #False while on_update is playing a replay
+        self.replay_timer = 0
+        self.on_init()
+
+    def reset(self, draw_style: str = None) -> None:
+        """Clear the grid and history, optionally switching draw style."""
+        if draw_style is not None:
+            self.draw_style = draw_style
+        self.grid.reset(self.draw_style)
+        self.timestamp = 0
+        self.resets += 1
+        self.on_reset()
+
+    def start_replay(self) -> None:
+        """
+        Clear the grid so the recorded actions can be played back onto it,
+        either by calling on_replay_next_step() or, one step every
+        REPLAY_TIMER_DELTA seconds, by on_update().
+        """
+        self.enable_ui = False
+        self.replay_timer = self.REPLAY_TIMER_DELTA
+        self.grid.reset()
+        self.replays += 1
+        self.on_replay_start()
+
+    def on_update(self, delta_time) -> None:
+        """
+        Advance the session by one frame of `delta_time` seconds: apply queued
+        commands, move the clock on, and play the replay (if one is running).
+        MyWindow calls this every frame; VirtualClock calls it with fixed deltas.
+        """
+        self.apply_commands() #one batch per frame, so on_draw sees every queued command or none
+        self.timestamp += delta_time
+        self.update_input(delta_time)
+        if not self.enable_ui:
+            self.replay_timer -= delta_time
+            if self.replay_timer <= 0:
+                self.replay_timer += self.REPLAY_TIMER_DELTA
+                finished = self.on_replay_next_step()
+                if finished:
+                    self.enable_ui = True
+        if self.autosave is not None:
+            self.autosave.tick()
+
+    def update_input(self, delta_time) -> None:
+        """
+        Called by on_update after the clock moves on and before the replay step,
+        for input that acts every frame (MyWindow repeats held undo and redo).
+        Headless, there is none.
+        """
+
+    def change_draw_mode(self) -> None:
+        """Switch to the next draw style (set, additive, sequence, set...), resetting the session."""
+        if self.draw_style == Grid.DRAW_STYLE_SET:
+            self.draw_style = Grid.DRAW_STYLE_ADD
+        elif self.draw_style == Grid.DRAW_STYLE_ADD:
+            self.draw_style = Grid.DRAW_STYLE_SEQUENCE
+        elif self.draw_style == Grid.DRAW_STYLE_SEQUENCE:
+            self.draw_style = Grid.DRAW_STYLE_SET
+        self.reset()
+
+    def apply_commands(self) -> int:
+        """Apply every command other threads have queued on self.commands, returning how many."""
+        return self.commands.drain(self)
+
+    def render(self, timestamp=None) -> GridPixelBuffer:
+        """Render the grid at `timestamp` (default: the current time) into self.grid_pixels."""
+        if timestamp is None:
+            timestamp = self.timestamp
+        if self.grid_pixels is None:
+            self.grid_pixels = GridPixelBuffer(self.grid.x, self.grid.y)
+        self.grid_pixels.update(self.grid, self.bg_packed, timestamp, self.animation_cache)
+        return self.grid_pixels
+
+    # STUDENT PART
+
+    def on_init(self):
+        """
+        Initialisation that occurs after the system initialisation.
+
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(1), constant
+
+        -Best Case: O(1), constant
+
+        """
+        self.UndoTracker = UndoTracker()
+        self.ReplayTracker = ReplayTracker()
+
+    def on_reset(self):
+        """
+        Called when a window reset is requested.
+
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(1), constant
+
+        -Best Case: O(1), constant
+        """
+        self.UndoTracker.clear() #reuse the trackers rather than allocating new stacks and queue
+        self.ReplayTracker.clear()
+
+    def on_paint(self, layer: Layer, px, py):
+        """
+        Called when a grid square is clicked on, which should trigger painting in the vicinity.
+        Vicinity squares outside of the range [0, GRID_SIZE_X) or [0, GRID_SIZE_Y) can be safely ignored.
+
+        Args:
+        -layer: The layer being applied.
+        -px: x position of the brush.
+        -py: y position of the brush.
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        Let i be max(px - d, 0), min(px + d + 1, self.grid.x)
+        Let j be max(py - d, 0), min(py + d + 1, self.grid.y)
+        Where d is the brush size and px and py are the coordinate
+
+        -Worst Case: O(log(i)*(log(j)*(comp))), O(comp) is the worst case of add function when layer_Store is SetLayerStore
+                     and the rest of the code is O(1). Hence, the overall complexity for worst case is O(log(i)*(log(j)*(comp)))
+
+        -Best Case: O(log(i)*log(j)), O(1) is the best case of add function when layer_store is Addtive and sequence
+                    and the rest of the code is O(1). Hence, the overall complexity for best case is O(log(i)*log(j))
+        """
+
+        d = self.grid.brush_size
+        action_steps = PaintAction()
+        for x in range(max(px - d, 0), min(px + d + 1, self.grid.x)):#output the horizontal based on the brush size
+            for y in range(max(py - d, 0), min(py + d + 1, self.grid.y)): #output vertical based on the brush size
+                if abs(px - x) + abs(py - y) <= d:  #if the grid is within the manhanttan distance
+                    check = self.grid[x][y].add(layer) #if doesn't exist then add
+                    if check:
+                        All_Step = PaintStep((x, y), layer) #create all the steps for each grid
+                        action_steps.add_step(All_Step) #then add steps to PaintAction list
+        self.UndoTracker.add_action(action_steps) #push the PaintAction to the Undo_stack
+        self.ReplayTracker.add_action(action_steps)#append PaintAction to replay
+
+    def on_erase(self, layer: Layer, px, py):
+        """
+        Erase `layer` from the squares a paint at (px, py) would cover, as one undoable action.
+        Squares not holding the layer are left alone. The newest copy of the layer goes,
+        whatever the store's own erase() would remove, see EraseStep.
+
+        Args:
+        -layer: The layer being erased.
+        -px: x position of the brush.
+        -py: y position of the brush.
+
+        Complexity:
+        -Worst Case: O(d*d*n*add), d the brush size and n the layers per square, rebuilt after the erase
+        -Best Case: O(d*d*n), nothing to erase
+        """
+        d = self.grid.brush_size
+        action = PaintAction()
+        for x in range(max(px - d, 0), min(px + d + 1, self.grid.x)):
+            for y in range(max(py - d, 0), min(py + d + 1, self.grid.y)):
+                if abs(px - x) + abs(py - y) <= d:
+                    step = EraseStep.erase(self.grid, (x, y), layer)
+                    if step is not None:
+                        action.add_step(step)
+        self.UndoTracker.add_action(action)
+        self.ReplayTracker.add_action(action)
+
+    def on_undo(self):
+        """
+        Called when an undo is requested.
+
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(comp), as the undo function's worst case is O(comp) and cost comparison is also O(comp).
+                    The add_action's complexity is O(1). Hence, the overall code's worst case is O(comp)
+
+        -Best Case: O(comp), as the undo function's best case is O(1) and comp is the cost of complexity. The add_action's
+                    complexity is O(1). Hence, the overall code's best case is O(1)
+        """
+        undo_action = self.UndoTracker.undo(self.grid) #do undo when on_undo is called
+        if undo_action is not None: #if undo_action is not None
+            self.ReplayTracker.add_action(undo_action, True) #then add to replayTracker
+
+
+    def on_redo(self):
+        """Called when a redo is requested.
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(comp), as the redo function's worst case is O(n) and the cost of comparison is comp.
+                    The add_action's complexity is O(1). Hence, the overall code's worst case is O(comp)
+
+        -Best Case: O(comp), as the redo function's best case is O(1) and the cost of comparison is comp. The add_action's
+                    complexity is O(1). Hence, the overall code's best case is O(1)
+        """
+        redo_action = self.UndoTracker.redo(self.grid) #do redo when on_redo is called
+        if redo_action is not None: #if redo_action is not None
+            self.ReplayTracker.add_action(redo_action) #then add action to replayTracker
+
+    def on_special(self):
+        """
+        Called when the special action is requested.
+
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(k*z*(n)), the worst case of grid.special(), and the rest are all O(1)
+
+        -Best Case: O(k*z), the best case of grid.special(), and the rest are all O(1)
+        """
+        special_action = PaintAction(is_special= True) #create a PaintAction obj for special
+        self.grid.special() #turn on special for every grid square, in whatever order suits the grid
+        # No steps are recorded: undo_apply/redo_apply of a special action
+        # only call grid.special(), and per-square steps would hold every store.
+        self.ReplayTracker.add_action(special_action) #add the PaintAction to ReplayTracker
+
+
+    def on_replay_start(self):
+        """Called when the replay starting is requested.
+
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: None
+
+        -Best Case: None
+        """
+        pass
+
+    def on_replay_next_step(self) -> bool:
+        """
+        Called when the next step of the replay is requested.
+        Returns whether the replay is finished.
+
+        Args:
+        -None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(comp), as the play_next_action()'s worst case is O(comp)
+
+        -Best Case: O(1), as the play_next_action()'s best case is O(1)
+        """
+        return self.ReplayTracker.play_next_action(self.grid)
+
+    def on_increase_brush_size(self):
+        """Called when an increase to the brush size is requested."""
+        self.grid.increase_brush_size()
+
+    def on_decrease_brush_size(self):
+        """Called when a decrease to the brush size is requested."""
+        self.grid.decrease_brush_size()
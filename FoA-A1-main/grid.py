@@ -51,6 +51,7 @@ class Grid:
         #assign x and y
         self.x = x
         self.y = y
+        self.store_pool = {} #draw style -> stores kept by reset() for when that style comes back
         self.identify_draw_style() #identify which draw_style to use for that grid
         self.create_layer_grid() #create layer_Store for every grid
 
@@ -113,6 +114,113 @@ class Grid:
                 self.grid[row][column] = chosen_draw_style() #create a layer_store for every column of that row
 
 
+    def reset(self, draw_style=None):
+        """
+        Return the grid to its initial state without reallocating it.
+        Stores of a draw style that is switched away from are kept, so
+        switching back to it only has to clear them.
+
+        Args:
+            - draw_style: the new draw style, or None to keep the current one.
+
+        Raises:
+            -None
+
+        Returns:
+            -None
+
+        Complexity:
+            -Worst Case: O(x*y*n), the draw style was never used by this grid so every store is created,
+                         where n is the cost of creating a store
+            -Best Case: O(x*y), every store is cleared in O(1)
+        """
+        self.brush_size = self.DEFAULT_BRUSH_SIZE
+        if draw_style is not None and draw_style != self.draw_style:
+            self.store_pool[self.draw_style] = self.grid #keep the current stores for later
+            self.draw_style = draw_style
+            pooled = self.store_pool.pop(draw_style, None)
+            if pooled is None: #first time using this draw style
+                self.grid = ArrayR(self.x)
+                self.create_layer_grid()
+                return
+            self.grid = pooled
+        for x in range(self.x):
+            column = self.grid[x]
+            for y in range(self.y):
+                column[y].clear()
+
+    def snapshot(self) -> tuple[str, dict[tuple[int, int], tuple[tuple[int, ...], bool]]]:
+        """
+        Capture the layers of every square, in a form that can be pickled
+        and handed to restore() on another grid, even in another process.
+
+        Args:
+            - None
+
+        Raises:
+            -None
+
+        Returns:
+            -(draw style, {(x, y): stack_state()}), squares with no layers and special off are left out
+
+        Complexity:
+            -Worst Case: O(x*y*n), where n is the cost of stack_state()
+            -Best Case: O(x*y), every store is empty
+        """
+        states = {}
+        for x in range(self.x):
+            column = self.grid[x]
+            for y in range(self.y):
+                state = column[y].stack_state()
+                if state[0] or state[1]: #skip empty squares, reset() already gives those
+                    states[(x, y)] = state
+        return self.draw_style, states
+
+    def restore(self, snapshot: tuple[str, dict[tuple[int, int], tuple[tuple[int, ...], bool]]]) -> None:
+        """
+        Replace the grid's layers with a snapshot taken by snapshot().
+        The brush size is reset, as with reset().
+
+        Args:
+            - snapshot: the value returned by snapshot(), from a grid of the same dimensions.
+
+        Raises:
+            -None
+
+        Returns:
+            -None
+
+        Complexity:
+            -Worst Case: O(x*y*n), same as reset() plus restoring every square
+            -Best Case: O(x*y), same as reset(), the snapshot is empty
+        """
+        draw_style, states = snapshot
+        self.reset(draw_style)
+        for (x, y), (layers, inverted) in states.items():
+            self.grid[x][y].restore_state(layers, inverted)
+
+    def regions(self):
+        """
+        The grid as blocks of squares, for loops over the whole grid.
+        Square (x0 + lx, y0 + ly) is columns[lx][ly] for lx in xs and ly in ys.
+        A Grid is one block; grids that page their squares in and out
+        (see TiledGrid) yield one block per page so each is loaded once.
+
+        Args:
+            - None
+
+        Raises:
+            -None
+
+        Returns:
+            -generator of (x0, y0, columns, xs, ys)
+
+        Complexity:
+            -Worst Case: O(1), one block
+            -Best Case: O(1), one block
+        """
+        yield 0, 0, self.grid, range(self.x), range(self.y)
+
     def __getitem__(self, item):
         """
         magic method to get the grid based on the coordinate
@@ -203,7 +311,89 @@ class Grid:
             for j in range(self.y):
                 self.grid[i][j].special() #turn on special for the grids
 
+    def render(self, start, timestamp) -> ArrayR:
+        """
+        Compute the colour of every grid square for one frame.
+        Squares share interned LayerStacks, so a uniform stack
+        (one whose layers ignore position and time) is only evaluated once
+        per frame no matter how many squares reference it.
+
+        Args:
+            - start: the background colour every square starts from.
+            - timestamp: the time of the frame.
 
+        Raises:
+            -None
 
+        Returns:
+            -ArrayR of columns, where colors[x][y] is the colour of square (x, y)
 
+        Complexity:
+            -Worst Case: O(x*y*n), where n is the longest stack and every square holds
+                         a different or non-uniform stack
+            -Best Case: O(x*y), every square shares one uniform stack so it is applied once
+        """
+        colors = ArrayR(self.x)
+        for x in range(self.x):
+            colors[x] = ArrayR(self.y)
+        shared = {} #uniform stack -> colour, only valid for this frame
+        for x0, y0, columns, xs, ys in self.regions():
+            for lx in xs:
+                x = x0 + lx
+                stores = columns[lx]
+                column = colors[x]
+                for ly in ys:
+                    y = y0 + ly
+                    stack = stores[ly].get_stack()
+                    if stack.uniform:
+                        color = shared.get(stack)
+                        if color is None: #first square with this stack this frame
+                            color = shared[stack] = stack.get_color(start, timestamp, x, y)
+                    else:
+                        color = stack.get_color(start, timestamp, x, y)
+                    column[y] = color
+        return colors
+
+    def render_packed(self, start: int, timestamp, out: list[int] | None = None, cache=None) -> list[int]:
+        """
+        Packed colour version of render.
+        Colours are 0xRRGGBB integers written into a flat list where
+        square (x, y) lives at out[x * self.y + y]. Passing the previous
+        frame's list as `out` reuses its slots instead of allocating.
 
+        Args:
+            - start: the packed background colour.
+            - timestamp: the time of the frame.
+            - out: optional list of length x*y to write into.
+            - cache: optional AnimationCache for animated layers.
+
+        Raises:
+            -None
+
+        Returns:
+            -the list of packed colours
+
+        Complexity:
+            -Worst Case: O(x*y*n), same as render
+            -Best Case: O(x*y), same as render
+        """
+        if out is None:
+            out = [start] * (self.x * self.y)
+        shared = {}
+        height = self.y
+        for x0, y0, columns, xs, ys in self.regions():
+            for lx in xs:
+                x = x0 + lx
+                column = columns[lx]
+                i = x * height + y0
+                for ly in ys:
+                    stack = column[ly].get_stack()
+                    if stack.uniform:
+                        color = shared.get(stack)
+                        if color is None:
+                            color = shared[stack] = stack.get_color_packed(start, timestamp, x, y0 + ly)
+                    else:
+                        color = stack.get_color_packed(start, timestamp, x, y0 + ly, cache)
+                    out[i] = color
+                    i += 1
+        return out
@@ -0,0 +1,192 @@
+"""
+Renderer-agnostic grid output.
+
+The grid is written into a single RGB pixel buffer, one pixel per square,
+which a front end can upload as one texture (see MyWindow.draw_grid) or
+write straight to an image file. Nothing here depends on arcade.
+
+When textures aren't an option, merge_runs turns the buffer into a few
+solid rectangles instead of one rectangle per square.
+"""
+
+from __future__ import annotations
+from grid import Grid
+
+
+class GridPixelBuffer:
+    """
+    RGB pixel buffer for a grid, with dirty region tracking.
+
+    Pixel (x, y) is stored at pixels[(y * width + x) * 3], so the first row
+    is the bottom of the grid, which is what OpenGL expects for texture data.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """
+        Initialise the GridPixelBuffer object.
+
+        Args:
+        - width, height: the dimensions of the grid being rendered.
+
+        Raises:
+        - ValueError: if either dimension is not positive.
+
+        Complexity:
+        -Worst Case: O(w*h), allocating the buffer
+        -Best Case: O(w*h), allocating the buffer
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError("Pixel buffer dimensions should be positive.")
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height * 3)
+        self.colors = [-1] * (width * height) #packed colour currently in the buffer, -1 for never drawn
+        self.stacks = [None] * (width * height) #stack each pixel was last computed from
+        self.start = None
+        self.dirty = None
+
+    def update(self, grid: Grid, start: int, timestamp, cache=None) -> bool:
+        """
+        Bring the buffer up to date with the grid for one frame.
+        Squares whose uniform stack hasn't changed since the last frame
+        keep their colour and are skipped entirely.
+
+        Args:
+        - grid: the grid to render, with the same dimensions as the buffer.
+        - start: packed background colour.
+        - timestamp: the time of the frame.
+        - cache: optional AnimationCache for animated layers.
+
+        Raises:
+        - ValueError: if the grid and buffer dimensions differ.
+
+        Returns:
+        - True if any pixel changed.
+
+        Complexity:
+        -Worst Case: O(w*h*n), every square holds an animated stack of n layers
+        -Best Case: O(w*h), nothing changed since the last frame
+        """
+        if grid.x != self.width or grid.y != self.height:
+            raise ValueError("Grid and pixel buffer dimensions differ.")
+        width = self.width
+        pixels = self.pixels
+        colors = self.colors
+        stacks = self.stacks
+        same_start = start == self.start
+        self.start = start
+        shared = {}
+        x0, y0, x1, y1 = width, self.height, -1, -1
+        for bx, by, columns, xs, ys in grid.regions(): #a tile at a time on a TiledGrid
+            for lx in xs:
+                x = bx + lx
+                column = columns[lx]
+                for ly in ys:
+                    y = by + ly
+                    i = y * width + x
+                    stack = column[ly].get_stack()
+                    if stack.uniform:
+                        if same_start and stack is stacks[i]:
+                            continue #same uniform stack, same colour as last frame
+                        color = shared.get(stack)
+                        if color is None:
+                            color = shared[stack] = stack.get_color_packed(start, timestamp, x, y)
+                    else:
+                        color = stack.get_color_packed(start, timestamp, x, y, cache)
+                    stacks[i] = stack
+                    if color == colors[i]:
+                        continue
+                    colors[i] = color
+                    p = i * 3
+                    pixels[p] = color >> 16
+                    pixels[p + 1] = (color >> 8) & 255
+                    pixels[p + 2] = color & 255
+                    if x < x0: x0 = x
+                    if x > x1: x1 = x
+                    if y < y0: y0 = y
+                    if y > y1: y1 = y
+        if x1 < 0:
+            return False
+        x1, y1 = x1 + 1, y1 + 1
+        if self.dirty is not None: #merge with the region not yet taken
+            dx0, dy0, dx1, dy1 = self.dirty
+            x0, y0, x1, y1 = min(x0, dx0), min(y0, dy0), max(x1, dx1), max(y1, dy1)
+        self.dirty = (x0, y0, x1, y1)
+        return True
+
+    def take_dirty(self) -> tuple[int, int, int, int] | None:
+        """
+        Returns the (x0, y0, x1, y1) region (end exclusive) changed since
+        the last call, or None if nothing changed, and resets it.
+        """
+        dirty, self.dirty = self.dirty, None
+        return dirty
+
+    def region(self, rect: tuple[int, int, int, int]) -> bytes:
+        """
+        Returns the pixels of an (x0, y0, x1, y1) region, bottom row first,
+        ready for a texture sub-image upload.
+
+        Complexity:
+        -Worst Case: O(w*h), the region is the whole buffer
+        -Best Case: O(1), a single pixel
+        """
+        x0, y0, x1, y1 = rect
+        if x0 == 0 and x1 == self.width:
+            return bytes(self.pixels[y0 * self.width * 3:y1 * self.width * 3])
+        row = self.width * 3
+        return b"".join(
+            self.pixels[y * row + x0 * 3:y * row + x1 * 3]
+            for y in range(y0, y1)
+        )
+
+    def get_pixel(self, x: int, y: int) -> tuple[int, int, int]:
+        """Returns the (r, g, b) colour of pixel (x, y)."""
+        p = (y * self.width + x) * 3
+        return tuple(self.pixels[p:p + 3])
+
+
+def merge_runs(colors: list[int], width: int, height: int) -> list[tuple[int, int, int, int, int]]:
+    """
+    Merge squares of identical colour into rectangles.
+    Each row is split into horizontal runs of one colour, and a run is
+    merged into the rectangle above it when both cover the same columns
+    with the same colour.
+
+    Args:
+    - colors: packed colours, square (x, y) at colors[y * width + x] (see GridPixelBuffer.colors).
+    - width, height: the grid dimensions.
+
+    Raises:
+    -None
+
+    Returns:
+    - list of (x0, y0, x1, y1, color) rectangles, end exclusive, covering every square exactly once.
+
+    Complexity:
+    -Worst Case: O(w*h), every square is visited once
+    -Best Case: O(w*h), every square is visited once
+    """
+    rects = []
+    above = {} #(x0, x1, color) -> rectangle that reached the previous row
+    for y in range(height):
+        current = {}
+        base = y * width
+        x = 0
+        while x < width:
+            color = colors[base + x]
+            end = x + 1
+            while end < width and colors[base + end] == color:
+                end += 1
+            key = (x, end, color)
+            rect = above.pop(key, None)
+            if rect is None: #nothing to extend, start a new rectangle
+                rect = [x, y, end, y + 1, color]
+            else:
+                rect[3] = y + 1
+            current[key] = rect
+            x = end
+        rects.extend(above.values()) #rectangles that stopped at the previous row
+        above = current
+    rects.extend(above.values())
+    return [tuple(rect) for rect in rects]
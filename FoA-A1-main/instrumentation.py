@@ -0,0 +1,234 @@
+"""
+Hot path instrumentation.
+
+enable() wraps the hot paths with timing and counting versions, and
+disable() puts the originals back, so while instrumentation is off the
+code that runs is exactly the uninstrumented code and costs nothing.
+
+Timings (seconds, summed over the frame):
+- update: PaintEngine.on_update, including the commands and replay step it runs.
+- render: PaintEngine.render, iterating over the grid's cells.
+- draw: MyWindow.on_draw, if window.py has been imported.
+- paint, erase, special, undo, redo, replay_step: the engine's on_ handlers.
+
+Counters (per frame):
+- cells: squares whose colour was computed (LayerStack.get_color_packed).
+- apply.<layer name>: calls of each layer's apply or apply_packed.
+- draw_calls: GPU draw calls made by MyWindow.on_draw.
+- history: actions added to the undo and replay trackers.
+- and one per timing, counting the calls.
+
+A frame ends when the next one starts, at the start of on_update.
+
+    stats = instrumentation.enable()
+    ...
+    print(stats.report())
+    instrumentation.disable()
+"""
+
+from __future__ import annotations
+import functools
+import sys
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+import layer_util
+from engine import PaintEngine
+from layer_store import LayerStack
+from replay import ReplayTracker
+from undo import UndoTracker
+
+@dataclass
+class FrameStats:
+    """What one frame spent, see the module docstring for the keys."""
+    timings: Counter = field(default_factory=Counter)
+    counters: Counter = field(default_factory=Counter)
+
+class HotPathStats:
+    HISTORY = 300 #frames kept, 5 seconds at 60 frames per second
+
+    def __init__(self, history: int = HISTORY) -> None:
+        """
+        Args:
+        - history: completed frames kept in self.frames.
+
+        Raises:
+        - ValueError: if history isn't positive.
+        """
+        if history <= 0:
+            raise ValueError("Keep at least one frame.")
+        self.frames = deque(maxlen=history) #completed frames, oldest first
+        self.current = FrameStats()
+        self.frame_count = 0
+
+    def next_frame(self) -> FrameStats:
+        """End the current frame, keeping it in self.frames, and start another. Returns the ended frame."""
+        ended, self.current = self.current, FrameStats()
+        self.frames.append(ended)
+        self.frame_count += 1
+        return ended
+
+    def add_time(self, name: str, seconds: float) -> None:
+        current = self.current
+        current.timings[name] += seconds
+        current.counters[name] += 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.current.counters[name] += amount
+
+    def summary(self, frames: int | None = None) -> dict[str, dict[str, float]]:
+        """
+        Statistics over the last `frames` completed frames (all kept frames by default).
+
+        Returns:
+        - {"timings": {name: {"mean": s, "max": s}}, "counters": {name: {"mean": n, "max": n}}},
+          means being per frame.
+
+        Complexity:
+        -Worst Case: O(f*k), f frames with k keys each
+        -Best Case: O(1), no frames yet
+        """
+        recent = list(self.frames)[-frames:] if frames else list(self.frames)
+        result = {}
+        for kind in ("timings", "counters"):
+            totals, peaks = Counter(), {}
+            for frame in recent:
+                for name, value in getattr(frame, kind).items():
+                    totals[name] += value
+                    peaks[name] = max(peaks.get(name, value), value)
+            result[kind] = {name: {"mean": totals[name] / len(recent), "max": peaks[name]} for name in sorted(totals)}
+        return result
+
+    def report(self, frames: int = 60) -> str:
+        """A few lines of text for the overlay: mean and worst per frame over the last `frames` frames."""
+        summary = self.summary(frames)
+        lines = ["{:<14}{:>9}{:>9}".format("ms/frame", "mean", "max")]
+        for name, value in summary["timings"].items():
+            lines.append("{:<14}{:9.2f}{:9.2f}".format(name, value["mean"] * 1000, value["max"] * 1000))
+        lines.append("{:<14}{:>9}{:>9}".format("per frame", "mean", "max"))
+        for name, value in summary["counters"].items():
+            if name not in summary["timings"]:
+                lines.append("{:<14}{:9.1f}{:9d}".format(name, value["mean"], value["max"]))
+        return "\n".join(lines)
+
+class Patches:
+    """
+    Attributes wrapped by one or more users (instrumentation and tracing, say),
+    so each user's wrappers can be taken off in any order. Wrappers are given
+    as functions from the code they wrap to the wrapper, and when one user's
+    are removed, the attribute is rebuilt from the original with everyone
+    else's wrapped back on top, in the order they were added.
+    """
+
+    def __init__(self) -> None:
+        self.wrapped = {} #(id(target), attribute name) -> [target, original value, [(user, wrap)]]
+
+    def patch(self, user: str, target, name: str, wrap) -> None:
+        """Replace target.name with wrap(target.name), on behalf of `user`."""
+        entry = self.wrapped.setdefault((id(target), name), [target, getattr(target, name), []])
+        entry[2].append((user, wrap))
+        setattr(target, name, wrap(getattr(target, name)))
+
+    def restore(self, user: str) -> None:
+        """
+        Take off every wrapper `user` added.
+
+        Complexity:
+        -Worst Case: O(a*w), a wrapped attributes with w wrappers each
+        -Best Case: O(a), the user wrapped nothing
+        """
+        for key, (target, original, wraps) in list(self.wrapped.items()):
+            kept = [(owner, wrap) for owner, wrap in wraps if owner != user]
+            if len(kept) == len(wraps):
+                continue
+            value = original
+            for _, wrap in kept:
+                value = wrap(value)
+            setattr(target, key[1], value)
+            if kept:
+                self.wrapped[key][2] = kept
+            else:
+                del self.wrapped[key]
+
+patches = Patches() #shared by everything that wraps the hot paths, see tracing.py
+_USER = "instrumentation"
+_active: HotPathStats | None = None
+
+def _timed(stats: HotPathStats, name: str, func):
+    perf_counter = time.perf_counter
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.add_time(name, perf_counter() - start)
+    return timed
+
+def _counted(stats: HotPathStats, name: str, func):
+    @functools.wraps(func)
+    def counted(*args, **kwargs):
+        stats.current.counters[name] += 1
+        return func(*args, **kwargs)
+    return counted
+
+def _frame_start(stats: HotPathStats, func):
+    @functools.wraps(func)
+    def on_update(*args, **kwargs):
+        stats.next_frame()
+        return func(*args, **kwargs)
+    return on_update
+
+def _draw(stats: HotPathStats, func):
+    @functools.wraps(func)
+    def on_draw(window, *args, **kwargs):
+        result = func(window, *args, **kwargs)
+        stats.count("draw_calls", window.draw_calls)
+        return result
+    return on_draw
+
+def enabled() -> HotPathStats | None:
+    """The stats being recorded, or None when instrumentation is off."""
+    return _active
+
+def enable(history: int = HotPathStats.HISTORY) -> HotPathStats:
+    """
+    Start instrumenting, returning the stats being recorded.
+    Already enabled, the stats being recorded are returned as they are.
+
+    Complexity:
+    -Worst Case: O(l), wrapping the l registered layers
+    -Best Case: O(1), already enabled
+    """
+    global _active
+    if _active is not None:
+        return _active
+    stats = HotPathStats(history)
+    patches.patch(_USER, PaintEngine, "on_update", functools.partial(_timed, stats, "update"))
+    patches.patch(_USER, PaintEngine, "on_update", functools.partial(_frame_start, stats))
+    for method, name in (("render", "render"), ("on_paint", "paint"), ("on_erase", "erase"),
+                         ("on_special", "special"), ("on_undo", "undo"), ("on_redo", "redo"),
+                         ("on_replay_next_step", "replay_step")):
+        patches.patch(_USER, PaintEngine, method, functools.partial(_timed, stats, name))
+    patches.patch(_USER, LayerStack, "get_color_packed", functools.partial(_counted, stats, "cells"))
+    patches.patch(_USER, UndoTracker, "add_action", functools.partial(_counted, stats, "history"))
+    patches.patch(_USER, ReplayTracker, "add_action", functools.partial(_counted, stats, "history"))
+    for layer in layer_util.get_layers():
+        if layer is None:
+            break
+        patches.patch(_USER, layer, "apply", functools.partial(_counted, stats, f"apply.{layer.name}"))
+        patches.patch(_USER, layer, "apply_packed", functools.partial(_counted, stats, f"apply.{layer.name}"))
+    window = sys.modules.get("window") #only instrument the window if it's in use, importing it imports arcade
+    if window is not None:
+        patches.patch(_USER, window.MyWindow, "on_draw", functools.partial(_timed, stats, "draw"))
+        patches.patch(_USER, window.MyWindow, "on_draw", functools.partial(_draw, stats))
+    _active = stats
+    return stats
+
+def disable() -> HotPathStats | None:
+    """Stop instrumenting, restoring the original code. Returns the stats recorded, if any."""
+    global _active
+    patches.restore(_USER)
+    stats, _active = _active, None
+    return stats
@@ -9,11 +9,144 @@ from data_structures.stack_adt import Stack, ArrayStack
 from data_structures.array_sorted_list import ArraySortedList
 from data_structures.sorted_list_adt import ListItem
 from data_structures.bset import BSet
+from weakref import WeakValueDictionary
+
+class LayerStack:
+    """
+    Immutable, interned description of what a LayerStore applies.
+    Every store with the same state references the same LayerStack (hash-consing),
+    so grid squares painted by the same brush share one object.
+    - layers: indices into LAYERS, in the order they are applied.
+    - inverted: whether the output is inverted after all layers are applied.
+    - uniform: True if every layer only depends on the input colour.
+    """
+    __slots__ = ("layers", "inverted", "uniform", "__weakref__")
+
+    _interned: WeakValueDictionary = WeakValueDictionary()
+
+    def __init__(self, layers: tuple[int, ...], inverted: bool) -> None:
+        """
+        Create a stack. Use LayerStack.intern rather than calling this directly.
+
+        Complexity:
+        -Worst Case: O(n), where n is len(layers)
+        -Best Case: O(n), where n is len(layers)
+        """
+        self.layers = layers
+        self.inverted = inverted
+        self.uniform = all(LAYERS[i].uniform for i in layers)
+
+    @classmethod
+    def intern(cls, layers: tuple[int, ...], inverted: bool = False) -> LayerStack:
+        """
+        Return the shared LayerStack for this state, creating it if needed.
+
+        Args:
+        -layers representing the layer indices in apply order
+        -inverted representing whether invert is applied last
+
+        Raises:
+        -None
+
+        Returns:
+        -the single LayerStack object for (layers, inverted)
+
+        Complexity:
+        -Worst Case: O(n), hashing the key is O(n) where n is len(layers)
+        -Best Case: O(n), same as worst case
+        """
+        key = (layers, inverted)
+        stack = cls._interned.get(key)
+        if stack is None: #first time this stack is seen
+            stack = cls(layers, inverted)
+            cls._interned[key] = stack
+        return stack
+
+    def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
+        """
+        Returns the colour a square with this stack should show.
+        Matches LayerStore.get_color of any store that interned this stack.
+
+        Complexity:
+        -Worst Case: O(n), where n is len(self.layers)
+        -Best Case: O(n), where n is len(self.layers)
+        """
+        color = start
+        for i in self.layers:
+            color = LAYERS[i].apply(color, timestamp, x, y)
+        if self.inverted:
+            color = invert.apply(color, timestamp, x, y)
+        return color
+
+    def get_color_packed(self, start: int, timestamp, x, y, cache=None) -> int:
+        """
+        Packed colour version of get_color, colours are 0xRRGGBB integers.
+        No tuples are built along the way. Animated layers go through
+        `cache` (an AnimationCache) when one is given.
+
+        Complexity:
+        -Worst Case: O(n), where n is len(self.layers)
+        -Best Case: O(n), where n is len(self.layers)
+        """
+        color = start
+        for i in self.layers:
+            layer = LAYERS[i]
+            if cache is not None and not layer.uniform:
+                color = cache.apply(layer, color, timestamp, x, y)
+            else:
+                color = layer.apply_packed(color, timestamp, x, y)
+        if self.inverted:
+            color ^= 0xFFFFFF
+        return color
+
+    def __repr__(self) -> str:
+        names = ", ".join(LAYERS[i].name for i in self.layers)
+        return f"LayerStack([{names}], inverted={self.inverted})"
+
 class LayerStore(ABC):
 
     def __init__(self) -> None:
+        self.stack = None #interned LayerStack, None when it needs to be recomputed
+
+    def get_stack(self) -> LayerStack:
+        """
+        Returns the interned LayerStack describing this store.
+        Mutations drop the cached stack, so the store swaps to another
+        shared stack the next time it is asked for (copy-on-write).
+        """
+        if self.stack is None:
+            self.stack = LayerStack.intern(*self.stack_state())
+        return self.stack
+
+    def get_color_packed(self, start: int, timestamp, x, y) -> int:
+        """
+        Returns the colour this square should show as a 0xRRGGBB integer,
+        given a packed starting colour. See layer_util.pack_color.
+        """
+        return self.get_stack().get_color_packed(start, timestamp, x, y)
+
+    @abstractmethod
+    def stack_state(self) -> tuple[tuple[int, ...], bool]:
+        """
+        Returns (layer indices in apply order, inverted) for the current layers.
+        """
         pass
 
+    def restore_state(self, layers: tuple[int, ...], inverted: bool) -> None:
+        """
+        Rebuild the store from a previous stack_state(), so that
+        stack_state() returns the same value again.
+
+        Complexity:
+        -Worst Case: O(n*add), where n is len(layers)
+        -Best Case: O(1), an empty state
+        """
+        self.clear()
+        for index in layers:
+            self.add(LAYERS[index])
+        if inverted:
+            self.special()
+
     @abstractmethod
     def add(self, layer: Layer) -> bool:
         """
@@ -44,6 +177,13 @@ class LayerStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove every layer and turn special off, reusing the store's storage.
+        """
+        pass
+
 class SetLayerStore(LayerStore):
     """
     Set layer store. A single layer can be stored at a time (or nothing at all)
@@ -100,6 +240,7 @@ class SetLayerStore(LayerStore):
         else: #if not then
             self.layer = layer #set layer to self.layer
             self.count = 0 #count set to 0 to use special
+            self.stack = None
         return self.layer == layer #then return true if it changed
     def erase(self, layer: Layer) -> bool:
         """
@@ -123,6 +264,7 @@ class SetLayerStore(LayerStore):
         """
         self.layer = None #erase set self.layer to None
         self.count = 0    #count set to 0 to use special
+        self.stack = None
         return self.layer == None #return True if it erased
 
     def special(self):
@@ -145,6 +287,7 @@ class SetLayerStore(LayerStore):
         Explanation: all is constant thus O(1), best case = worst Case
         """
         self.count += 1
+        self.stack = None
 
     def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
         """
@@ -178,6 +321,29 @@ class SetLayerStore(LayerStore):
                 color = invert.apply(start, timestamp, x,y) #apply invert
 
         return color #return color
+
+    def clear(self) -> None:
+        """
+        Remove the layer and turn special off.
+
+        Complexity:
+        -Worst Case: O(1), constant
+        -Best Case: O(1), constant
+        """
+        self.layer = None
+        self.count = 0
+        self.stack = None
+
+    def stack_state(self) -> tuple[tuple[int, ...], bool]:
+        """
+        The single layer (if any), inverted when special is on.
+
+        Complexity:
+        -Worst Case: O(1), constant
+        -Best Case: O(1), constant
+        """
+        layers = (self.layer.index,) if self.layer else ()
+        return layers, self.count % 2 != 0
 class AdditiveLayerStore(LayerStore):
     """
     Additive layer store. Each added layer applies after all previous ones.
@@ -235,6 +401,7 @@ class AdditiveLayerStore(LayerStore):
             self.layer.serve() #serve
 
         self.layer.append(layer) #then append another layer
+        self.stack = None
         return self.check_item(layer) #and return true if it actually changed
 
     def erase(self, layer: Layer) -> bool:
@@ -258,6 +425,7 @@ class AdditiveLayerStore(LayerStore):
         if self.layer.is_empty(): #if the layer is empty then return False
             return False
         item = self.layer.serve() #erase the oldest item
+        self.stack = None
         return not self.check_item(item) #return True if it is erased
 
     def special(self):
@@ -280,13 +448,12 @@ class AdditiveLayerStore(LayerStore):
                      as it needs to reverse the list anyway
         """
         temp_stack = ArrayStack(len(self.layer)) #create an arrayStack with self.layer
-        temp_queue = CircularQueue(len(self.layer.array)) #create circularQueue with self.layer.array
-        for i in range(self.layer.front, self.layer.rear): #loop through the self.layer
-            temp_stack.push(self.layer.array[i]) #and push into the stack
-
-        for i in range(len(temp_stack)): #loop through the stack that pushed in
-            temp_queue.append(temp_stack.pop()) #and append it back to queue to get reverse order
-        self.layer = temp_queue #assign to self.layer
+        while not self.layer.is_empty(): #serve every layer, oldest first
+            temp_stack.push(self.layer.serve()) #and push into the stack
+        self.layer.clear() #reuse the queue rather than allocating a new one
+        while not temp_stack.is_empty(): #loop through the stack that pushed in
+            self.layer.append(temp_stack.pop()) #and append it back to queue to get reverse order
+        self.stack = None
 
     def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
         """
@@ -341,6 +508,28 @@ class AdditiveLayerStore(LayerStore):
                 return True #if exist then return true
         return False # if not return false
 
+    def clear(self) -> None:
+        """
+        Remove every layer, keeping the existing queue.
+
+        Complexity:
+        -Worst Case: O(1), clear() on CircularQueue only resets the indices
+        -Best Case: O(1), clear() on CircularQueue only resets the indices
+        """
+        self.layer.clear()
+        self.stack = None
+
+    def stack_state(self) -> tuple[tuple[int, ...], bool]:
+        """
+        Every queued layer, oldest first.
+
+        Complexity:
+        -Worst Case: O(n), where n is len(self.layer)
+        -Best Case: O(n), where n is len(self.layer)
+        """
+        layers = tuple(self.layer.array[i].index for i in range(self.layer.front, self.layer.rear))
+        return layers, False
+
 class SequenceLayerStore(LayerStore):
     """
     Sequential layer store. Each layer type is either applied / not applied, and is applied in order of index.
@@ -423,6 +612,7 @@ class SequenceLayerStore(LayerStore):
             return False
         else:
             self.layer.add(layer.index + 1)# then add to the list
+            self.stack = None
             return layer.index + 1 in self.layer #and return True
 
     def erase(self, layer: Layer) -> bool:
@@ -447,6 +637,7 @@ class SequenceLayerStore(LayerStore):
         check = layer.index + 1 in self.layer #check the layer exist or not
         if check: #if exist
             self.layer.remove(layer.index + 1)#if exist, delete the layer according to the index
+            self.stack = None
             return layer.index + 1 not in self.layer #return True if it removes
         else:
             return False #the layer doesn't exist thus return false
@@ -543,3 +734,24 @@ class SequenceLayerStore(LayerStore):
             color = start #if self.layer is none then return the starting color
         return color  #return color
 
+    def clear(self) -> None:
+        """
+        Stop applying every layer.
+
+        Complexity:
+        -Worst Case: O(1), constant
+        -Best Case: O(1), constant
+        """
+        self.layer.clear()
+        self.stack = None
+
+    def stack_state(self) -> tuple[tuple[int, ...], bool]:
+        """
+        Every applied layer, in order of index.
+
+        Complexity:
+        -Worst Case: O(n), where n is len(LAYERS)
+        -Best Case: O(n), where n is len(LAYERS)
+        """
+        layers = tuple(i - 1 for i in range(1, len(LAYERS) + 1) if i in self.layer)
+        return layers, False
@@ -19,12 +19,52 @@ class Layer:
     apply: function
     name: str = field(init=False)
     bg: tuple[int, int, int] | None = None
+    uniform: bool = False
+    apply_packed: function | None = field(default=None, repr=False, compare=False)
+    time_step: function | None = field(default=None, repr=False, compare=False)
+    period: float | None = None
 
     def __post_init__(self):
         if hasattr(self.apply, "__bg__"):
             self.bg = self.apply.__bg__
+        if hasattr(self.apply, "__uniform__"):
+            self.uniform = self.apply.__uniform__
+        if hasattr(self.apply, "__packed__"):
+            self.apply_packed = self.apply.__packed__
+        if hasattr(self.apply, "__time_step__"):
+            self.time_step = self.apply.__time_step__
+        if hasattr(self.apply, "__period__"):
+            self.period = self.apply.__period__
+        if self.apply_packed is None:
+            apply = self.apply
+            def apply_packed(color, timestamp, x, y):
+                return pack_color(apply(unpack_color(color), timestamp, x, y))
+            self.apply_packed = apply_packed
         self.name = self.apply.__name__
 
+    def __reduce__(self):
+        # Layers hold functions, so pickle them by registry index instead.
+        return get_layer, (self.index,)
+
+def pack_color(color) -> int:
+    """Pack an (r, g, b) colour into a 24-bit 0xRRGGBB integer."""
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+_UNPACKED: dict[int, tuple[int, int, int]] = {}
+_UNPACKED_LIMIT = 1 << 16
+
+def unpack_color(value: int) -> tuple[int, int, int]:
+    """
+    Unpack a 0xRRGGBB integer into an (r, g, b) tuple.
+    Results are cached, so the tuple for a colour is only built once.
+    """
+    color = _UNPACKED.get(value)
+    if color is None:
+        if len(_UNPACKED) >= _UNPACKED_LIMIT:
+            _UNPACKED.clear()
+        color = _UNPACKED[value] = ((value >> 16) & 255, (value >> 8) & 255, value & 255)
+    return color
+
 class background(object):
     """Simple decorator to add a __bg__ property to a layer
 
@@ -44,6 +84,90 @@ class background(object):
         func.__bg__ = self.val
         return layer
 
+def uniform(layer: function|Layer):
+    """Simple decorator to mark a layer as uniform.
+
+    A uniform layer's output depends only on the input colour,
+    never on the timestamp or the grid position, so it can be
+    evaluated once per frame for every square sharing a stack.
+
+    Usage:  @register
+            @uniform
+            def my_flat_layer(...):
+    """
+    if isinstance(layer, Layer):
+        layer.uniform = True
+        func = layer.apply
+    else:
+        func = layer
+    func.__uniform__ = True
+    return layer
+
+class packed(object):
+    """Simple decorator to give a layer a packed colour implementation
+
+    The packed function has the same arguments as the layer,
+    but takes and returns colours as 0xRRGGBB integers (see pack_color).
+    Layers without one fall back to converting around `apply`.
+
+    Usage:  @register
+            @packed(my_special_layer_packed)
+            def my_special_layer(...):
+    """
+    def __init__(self, func):
+        self.val = func
+
+    def __call__(self, layer: function|Layer):
+        if isinstance(layer, Layer):
+            layer.apply_packed = self.val
+            func = layer.apply
+        else:
+            func = layer
+        func.__packed__ = self.val
+        return layer
+
+class stepwise(object):
+    """Simple decorator to mark a layer as changing in discrete steps
+
+    `step(timestamp, x, y)` must return a value such that the layer's
+    output only depends on (color, x, y, step). Animation caches can
+    then reuse results exactly until the step changes.
+
+    Usage:  @register
+            @stepwise(lambda timestamp, x, y: int(timestamp * 3))
+            def my_flashing_layer(...):
+    """
+    def __init__(self, step):
+        self.val = step
+
+    def __call__(self, layer: function|Layer):
+        if isinstance(layer, Layer):
+            layer.time_step = self.val
+            func = layer.apply
+        else:
+            func = layer
+        func.__time_step__ = self.val
+        return layer
+
+class periodic(object):
+    """Simple decorator to mark a layer as repeating every `period` time units
+
+    Usage:  @register
+            @periodic(20)
+            def my_cycling_layer(...):
+    """
+    def __init__(self, period):
+        self.val = period
+
+    def __call__(self, layer: function|Layer):
+        if isinstance(layer, Layer):
+            layer.period = self.val
+            func = layer.apply
+        else:
+            func = layer
+        func.__period__ = self.val
+        return layer
+
 def register(func):
     """
     Layer register function.
@@ -63,3 +187,7 @@ def get_layers():
     import layers # Force all registrations to occur.
     return LAYERS
 
+def get_layer(index: int) -> Layer:
+    """Returns the registered layer with this index, see Layer.__reduce__."""
+    return get_layers()[index]
+
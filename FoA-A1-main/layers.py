@@ -3,10 +3,49 @@ All layers are defined here.
 """
 
 import colorsys
-from layer_util import background, register
+from layer_util import background, packed, periodic, register, stepwise, uniform
+
+# Packed (0xRRGGBB) implementations, see layer_util.packed.
+# Per-channel tables let lighten/darken work without unpacking.
+_LIGHTEN_TABLE = tuple(min(255, c + 40) for c in range(256))
+_DARKEN_TABLE = tuple(max(0, c - 40) for c in range(256))
+
+def _rainbow_packed(color, timestamp, x, y):
+    r, g, b = colorsys.hls_to_rgb((timestamp/20 + x/20 + y/20)%1, 0.6, 0.6)
+    return (int(255*r) << 16) | (int(255*g) << 8) | int(255*b)
+
+def _black_packed(color, timestamp, x, y):
+    return 0x000000
+
+def _lighten_packed(color, timestamp, x, y):
+    t = _LIGHTEN_TABLE
+    return (t[color >> 16] << 16) | (t[(color >> 8) & 255] << 8) | t[color & 255]
+
+def _invert_packed(color, timestamp, x, y):
+    return color ^ 0xFFFFFF
+
+def _red_packed(color, timestamp, x, y):
+    return 0xFF0000
+
+def _green_packed(color, timestamp, x, y):
+    return 0x00FF00
+
+def _blue_packed(color, timestamp, x, y):
+    return 0x0000FF
+
+def _sparkle_packed(color, timestamp, x, y):
+    if _sparkle_lit(timestamp, x, y):
+        return _lighten_packed(color, timestamp, x, y)
+    return _darken_packed(color, timestamp, x, y)
+
+def _darken_packed(color, timestamp, x, y):
+    t = _DARKEN_TABLE
+    return (t[color >> 16] << 16) | (t[(color >> 8) & 255] << 8) | t[color & 255]
 
 @register
 @background(200, 0, 120)
+@periodic(20)
+@packed(_rainbow_packed)
 def rainbow(color, timestamp, x, y):
     return tuple(
         int(255*x)
@@ -15,11 +54,15 @@ def rainbow(color, timestamp, x, y):
 
 @register
 @background(170, 170, 170)
+@uniform
+@packed(_black_packed)
 def black(color, timestamp, x, y):
     return (0, 0, 0)
 
 @register
 @background(240, 240, 240)
+@uniform
+@packed(_lighten_packed)
 def lighten(color, timestamp, x, y):
     return tuple(
         min(255, x + 40)
@@ -28,6 +71,8 @@ def lighten(color, timestamp, x, y):
 
 @register
 @background(0, 255, 255)
+@uniform
+@packed(_invert_packed)
 def invert(color, timestamp, x, y):
     return tuple(
         255 - c
@@ -36,37 +81,52 @@ def invert(color, timestamp, x, y):
 
 @register
 @background(255, 0, 0)
+@uniform
+@packed(_red_packed)
 def red(color, timestamp, x, y):
     return (255, 0, 0)
 
 @register
 @background(0, 255, 0)
+@uniform
+@packed(_green_packed)
 def green(color, timestamp, x, y):
     return (0, 255, 0)
 
 @register
 @background(0, 0, 255)
+@uniform
+@packed(_blue_packed)
 def blue(color, timestamp, x, y):
     return (0, 0, 255)
 
-@register
-@background(100, 170, 255)
-def sparkle(color, timestamp, x, y):
-    ts = int((timestamp + x/3 + y/5) * 3)
+def _sparkle_step(timestamp, x, y):
+    return int((timestamp + x/3 + y/5) * 3)
+
+def _sparkle_lit(timestamp, x, y):
+    ts = _sparkle_step(timestamp, x, y)
     other = x
     for _ in range(10 + (ts * 31 % 17)):
         other = (1103515245 * other + 12345) % (1 << 31)
     other += y
     for _ in range(10 + (ts * 31 % 17)):
         other = (1103515245 * other + 12345) % (1 << 31)
-    ts = int((timestamp + x/10 + y/20) * 3)
     other = (other & ((1 << 31)-1)) >> 16
-    if other/(1 << 15) < 0.1:
+    return other/(1 << 15) < 0.1
+
+@register
+@background(100, 170, 255)
+@stepwise(_sparkle_step)
+@packed(_sparkle_packed)
+def sparkle(color, timestamp, x, y):
+    if _sparkle_lit(timestamp, x, y):
         return lighten.apply(color, timestamp, x, y)
     return darken.apply(color, timestamp, x, y)
 
 @register
 @background(30, 30, 30)
+@uniform
+@packed(_darken_packed)
 def darken(color, timestamp, x, y):
     return tuple(
         max(0, x - 40)
@@ -0,0 +1,208 @@
+"""
+Headless rendering to image files.
+
+Renders a grid, or a replay played back on a PaintEngine, into PPM or PNG
+frames without opening a window. Frames are encoded and written one at a
+time, so a timelapse of thousands of frames only ever holds one in memory.
+PNG encoding uses zlib and struct only; no imaging library is needed.
+
+    for path in render_frames(grid, [0, 0.5, 1], "out/frame_{:04d}.png"):
+        ...
+
+Saved sessions (see paint_file) can be rendered from the command line:
+
+    python -m offline_render sessions/*.paint --out frames [--thumbnail] [--every 10] [--scale 8]
+"""
+
+from __future__ import annotations
+import argparse
+import itertools
+import os
+import struct
+import zlib
+from typing import Iterable, Iterator
+
+from animation_cache import AnimationCache
+from engine import PaintEngine
+from grid import Grid
+from grid_renderer import GridPixelBuffer
+from layer_util import pack_color
+from paint_file import load
+
+FORMATS = ("ppm", "png")
+
+def _rows(buffer: GridPixelBuffer, scale: int) -> Iterator[bytes]:
+    """
+    Yields the image rows of the buffer, top row first, each pixel
+    repeated `scale` times in both directions.
+
+    Complexity:
+    -Worst Case: O(w*h*scale^2), every output byte is produced once
+    -Best Case: O(w*h*scale^2), every output byte is produced once
+    """
+    row = buffer.width * 3
+    pixels = buffer.pixels
+    for y in range(buffer.height - 1, -1, -1): #the buffer stores the bottom row first
+        line = pixels[y * row:(y + 1) * row]
+        if scale > 1:
+            line = b"".join(line[p:p + 3] * scale for p in range(0, row, 3))
+        else:
+            line = bytes(line)
+        for _ in range(scale):
+            yield line
+
+def write_ppm(file, buffer: GridPixelBuffer, scale: int = 1) -> None:
+    """Write the buffer to a binary file object as a binary (P6) PPM image."""
+    file.write(b"P6\n%d %d\n255\n" % (buffer.width * scale, buffer.height * scale))
+    for line in _rows(buffer, scale):
+        file.write(line)
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def write_png(file, buffer: GridPixelBuffer, scale: int = 1) -> None:
+    """Write the buffer to a binary file object as an 8-bit RGB PNG image."""
+    file.write(b"\x89PNG\r\n\x1a\n")
+    file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", buffer.width * scale, buffer.height * scale, 8, 2, 0, 0, 0)))
+    compressor = zlib.compressobj()
+    data = [compressor.compress(b"\x00" + line) for line in _rows(buffer, scale)] #filter type 0 on every row
+    data.append(compressor.flush())
+    file.write(_png_chunk(b"IDAT", b"".join(data)))
+    file.write(_png_chunk(b"IEND", b""))
+
+def write_frame(path: str, buffer: GridPixelBuffer, scale: int = 1) -> None:
+    """
+    Write the buffer to `path`, choosing PPM or PNG from the extension.
+
+    Args:
+    - path: file to write, ending in .ppm or .png. Missing directories are created.
+    - buffer: the rendered frame.
+    - scale: how many image pixels wide each grid square is.
+
+    Raises:
+    - ValueError: if the extension isn't a supported format, or scale isn't positive.
+
+    Returns:
+    -None
+
+    Complexity:
+    -Worst Case: O(w*h*scale^2), encoding the image
+    -Best Case: O(w*h*scale^2), encoding the image
+    """
+    fmt = os.path.splitext(path)[1][1:].lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported image format {fmt!r}, expected one of {FORMATS}.")
+    if scale <= 0:
+        raise ValueError("Scale should be positive.")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as file:
+        if fmt == "ppm":
+            write_ppm(file, buffer, scale)
+        else:
+            write_png(file, buffer, scale)
+
+def render_frames(grid: Grid, timestamps: Iterable, pattern: str, scale: int = 1, background=PaintEngine.BG) -> Iterator[str]:
+    """
+    Render the grid once per timestamp, writing each frame before rendering the next.
+
+    Args:
+    - grid: the grid to render.
+    - timestamps: the time of each frame.
+    - pattern: output path, formatted with the frame number, e.g. "out/{:04d}.png".
+    - scale: how many image pixels wide each grid square is.
+    - background: the colour under every layer.
+
+    Raises:
+    - ValueError: see write_frame.
+
+    Returns:
+    - a generator of the written paths, one per frame. Nothing is rendered until it is iterated.
+
+    Complexity:
+    -Worst Case: O(f*w*h*n), f frames of animated stacks of n layers
+    -Best Case: O(f*w*h), f frames of an unchanging grid
+    """
+    buffer = GridPixelBuffer(grid.x, grid.y)
+    cache = AnimationCache()
+    start = pack_color(background)
+    for frame, timestamp in enumerate(timestamps):
+        buffer.update(grid, start, timestamp, cache)
+        path = pattern.format(frame)
+        write_frame(path, buffer, scale)
+        yield path
+
+def render_replay(engine: PaintEngine, pattern: str, timestamps: Iterable = None, every: int = 1, scale: int = 1) -> Iterator[str]:
+    """
+    Play back the engine's replay from the start, writing a frame after
+    every `every` actions and one of the finished drawing.
+
+    Args:
+    - engine: the engine whose recorded actions are replayed. Its grid is cleared first.
+    - pattern: output path, formatted with the frame number, e.g. "out/{:04d}.png".
+    - timestamps: the time of each frame, by default the engine's timestamp for every frame.
+                  If it runs out, the remaining frames reuse the last timestamp.
+    - every: actions played between frames.
+    - scale: how many image pixels wide each grid square is.
+
+    Raises:
+    - ValueError: if every isn't positive, or see write_frame.
+
+    Returns:
+    - a generator of the written paths, one per frame.
+
+    Complexity:
+    -Worst Case: O(a*comp + f*w*h*n), a actions played and f frames rendered
+    -Best Case: O(w*h), nothing recorded, only the final frame is written
+    """
+    if every <= 0:
+        raise ValueError("Frames should be at least one action apart.")
+    if timestamps is None:
+        timestamps = itertools.repeat(engine.timestamp)
+    timestamps = iter(timestamps)
+    timestamp = engine.timestamp
+    engine.start_replay()
+    for frame in itertools.count():
+        finished = False
+        played = 0
+        while played < every:
+            finished = engine.on_replay_next_step()
+            if finished:
+                break
+            played += 1
+        if finished and played == 0 and frame > 0:
+            return #the previous frame already showed the finished drawing
+        timestamp = next(timestamps, timestamp)
+        path = pattern.format(frame)
+        write_frame(path, engine.render(timestamp), scale)
+        yield path
+        if finished:
+            return
+
+def main():
+    p = argparse.ArgumentParser(description="Render saved .paint sessions to image files.")
+    p.add_argument("sessions", help=".paint files to render.", nargs="+")
+    p.add_argument("--out", help="Output directory.", default="frames")
+    p.add_argument("--format", help="Image format.", choices=FORMATS, default="png")
+    p.add_argument("--thumbnail", help="Only write the finished drawing, as OUT/<session>.<format>.", action="store_true")
+    p.add_argument("--every", help="Actions played between replay frames.", type=int, default=1)
+    p.add_argument("--scale", help="Image pixels per grid square.", type=int, default=1)
+    p.add_argument("--workers", help="Render replays with this many processes.", type=int, default=1)
+    args = p.parse_args()
+    for session in args.sessions:
+        engine = load(session)
+        name = os.path.splitext(os.path.basename(session))[0]
+        if args.thumbnail:
+            write_frame(os.path.join(args.out, f"{name}.{args.format}"), engine.render(), args.scale)
+            continue
+        pattern = os.path.join(args.out, name, "{:05d}." + args.format)
+        if args.workers > 1:
+            from parallel_render import render_replay_parallel
+            frames = render_replay_parallel(engine, pattern, every=args.every, scale=args.scale, workers=args.workers)
+        else:
+            frames = render_replay(engine, pattern, every=args.every, scale=args.scale)
+        print(f"{session}: {sum(1 for _ in frames)} frames")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Binary session files (.paint).
+
+A .paint file holds a grid's layers together with its undo, redo and
+replay history. Numbers are little-endian and every column is a flat
+array starting on an 8-byte boundary, so an opened file is memory mapped
+and read in place rather than parsed. NumPy can wrap a column without
+copying it:
+
+    with PaintDocument.open("drawing.paint") as doc:
+        kind, offset, count = doc.sections["CELL"]
+        layers = numpy.frombuffer(doc.buffer, DTYPES[kind], count, offset)
+        ... # drop such arrays before the document is closed
+
+Layout, version 2:
+- header: magic, version, draw style, brush size, section count, width, height
+- section table: (name, item type, offset, count) per column
+- columns:
+    CELO  u32[w*h+1]  start of square (x, y)'s layers in CELL, at index x*h + y
+    CELL  u8[]        layer indices of every square, in stack_state() order
+    CINV  u8[w*h]     1 where the square is inverted, see stack_state()
+    ACTO  u32[a+1]    start of each action's steps in STPX/STPY/STPL
+    ACTF  u8[a]       1 for a special action
+    STPX  u32[]       x of each paint step
+    STPY  u32[]       y of each paint step
+    STPL  u8[]        layer index of each paint step
+    STPE  u8[]        1 where the step erases its layer (see EraseStep)
+    STPP  u32[]       position of the erased copy in its square's layers, 0 for paint steps
+    UNDO  u32[]       actions on the undo stack, bottom first
+    REDO  u32[]       actions on the redo stack, bottom first
+    RPLY  u32[]       actions still queued for replay, in play order
+    RPLU  u8[]        1 where the replayed action is an undo
+Actions that appear in several histories are stored once.
+
+Version 1 files, written before erasing existed, have no STPE or STPP and
+are still read, every step being a paint.
+"""
+
+from __future__ import annotations
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from action import PaintAction, PaintStep, EraseStep
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+
+MAGIC = b"PAINT\x00"
+VERSION = 2
+READABLE_VERSIONS = (1, 2)
+HEADER = struct.Struct("<6sHBBHII")
+SECTION = struct.Struct("<4scxxxQQ")
+ALIGN = 8
+DTYPES = {"B": "<u1", "I": "<u4"} #section item type -> NumPy dtype
+
+def cell_columns(width: int, height: int, state) -> list[tuple[str, array]]:
+    """
+    The CELO, CELL and CINV columns for a grid.
+
+    Args:
+    - width, height: the grid dimensions.
+    - state: function returning square (x, y) in the form of LayerStore.stack_state().
+
+    Complexity:
+    -Worst Case: O(x*y*n), n layers per square
+    -Best Case: O(x*y), an empty grid
+    """
+    cell_offsets, cell_layers, inverted = array("I", [0]), array("B"), array("B")
+    for x in range(width):
+        for y in range(height):
+            layers, flag = state(x, y)
+            cell_layers.extend(layers)
+            cell_offsets.append(len(cell_layers))
+            inverted.append(flag)
+    return [("CELO", cell_offsets), ("CELL", cell_layers), ("CINV", inverted)]
+
+def history_columns(actions: list[PaintAction], undo: list[int], redo: list[int],
+                    replay: list[tuple[int, bool]]) -> list[tuple[str, array]]:
+    """
+    The action table and history columns.
+
+    Args:
+    - actions: every action the histories refer to.
+    - undo, redo: indices into actions, bottom of the stack first.
+    - replay: (index into actions, is_undo) pairs, in play order.
+
+    Complexity:
+    -Worst Case: O(a + s), a actions with s steps in total
+    -Best Case: O(a + s), a actions with s steps in total
+    """
+    action_offsets, special = array("I", [0]), array("B")
+    step_x, step_y, step_layer, step_erase, step_position = array("I"), array("I"), array("B"), array("B"), array("I")
+    for action in actions:
+        special.append(action.is_special)
+        if not action.is_special: #special steps hold stores, and replaying a special doesn't use them
+            for step in action.steps:
+                step_x.append(step.affected_grid_square[0])
+                step_y.append(step.affected_grid_square[1])
+                step_layer.append(step.affected_layer.index)
+                erase = isinstance(step, EraseStep)
+                step_erase.append(erase)
+                step_position.append(step.position if erase else 0)
+        action_offsets.append(len(step_x))
+    return [
+        ("ACTO", action_offsets), ("ACTF", special),
+        ("STPX", step_x), ("STPY", step_y), ("STPL", step_layer), ("STPE", step_erase), ("STPP", step_position),
+        ("UNDO", array("I", undo)), ("REDO", array("I", redo)),
+        ("RPLY", array("I", (i for i, _ in replay))), ("RPLU", array("B", (u for _, u in replay))),
+    ]
+
+def _columns(engine: PaintEngine) -> list[tuple[str, array]]:
+    """
+    Flatten the engine's grid and history into named columns.
+
+    Complexity:
+    -Worst Case: O(x*y*n + s), n layers per square and s paint steps in the history
+    -Best Case: O(x*y), an empty grid with no history
+    """
+    grid = engine.grid
+    actions = []
+    indices = {} #id(action) -> index, so shared actions are written once
+    def index(action: PaintAction) -> int:
+        i = indices.get(id(action))
+        if i is None:
+            i = indices[id(action)] = len(actions)
+            actions.append(action)
+        return i
+    undo, redo = engine.UndoTracker.history()
+    undo, redo = [index(action) for action in undo], [index(action) for action in redo]
+    replay = [(index(action), is_undo) for action, is_undo in engine.ReplayTracker.pending()]
+    return (cell_columns(grid.x, grid.y, lambda x, y: grid[x][y].stack_state())
+            + history_columns(actions, undo, redo, replay))
+
+def write_columns(path: str, draw_style: str, brush_size: int, width: int, height: int,
+                  columns: list[tuple[str, array]]) -> None:
+    """
+    Write a .paint file from its columns. Extra named columns may follow
+    the standard ones; readers ignore sections they don't know.
+    The file is written next to `path` and renamed over it, so readers
+    never see a half written file.
+
+    Complexity:
+    -Worst Case: O(b), where b is the size of the file
+    -Best Case: O(b), where b is the size of the file
+    """
+    table = []
+    offset = HEADER.size + SECTION.size * len(columns)
+    for name, column in columns:
+        offset += -offset % ALIGN
+        table.append(SECTION.pack(name.encode(), column.typecode.encode(), offset, len(column)))
+        offset += len(column) * column.itemsize
+    header = HEADER.pack(MAGIC, VERSION, Grid.DRAW_STYLE_OPTIONS.index(draw_style),
+                         brush_size, len(columns), width, height)
+    temp = path + ".tmp"
+    with open(temp, "wb") as file:
+        file.write(header)
+        file.write(b"".join(table))
+        position = HEADER.size + SECTION.size * len(columns)
+        for _, column in columns:
+            file.write(bytes(-position % ALIGN))
+            position += -position % ALIGN
+            if sys.byteorder == "big" and column.itemsize > 1:
+                column = array(column.typecode, column) #swap a copy, the caller's columns stay as they are
+                column.byteswap()
+            column.tofile(file)
+            position += len(column) * column.itemsize
+    os.replace(temp, path)
+
+def save(path: str, engine: PaintEngine) -> None:
+    """
+    Write the engine's grid and history to a .paint file.
+
+    Args:
+    - path: the file to write.
+    - engine: the engine to save.
+
+    Raises:
+    -None
+
+    Returns:
+    -None
+
+    Complexity:
+    -Worst Case: O(x*y*n + s), see _columns
+    -Best Case: O(x*y), an empty grid with no history
+    """
+    grid = engine.grid
+    write_columns(path, grid.draw_style, grid.brush_size, grid.x, grid.y, _columns(engine))
+
+class PaintDocument:
+    """
+    A read-only view of a .paint file.
+    Opening only reads the header; columns are memory views straight
+    into the mapped file and squares are decoded when asked for.
+    """
+
+    def __init__(self, buffer) -> None:
+        """
+        Initialise the PaintDocument object.
+
+        Args:
+        - buffer: the file contents, e.g. an mmap or bytes.
+
+        Raises:
+        - ValueError: if the buffer isn't a .paint file of a supported version.
+
+        Complexity:
+        -Worst Case: O(s), where s is the number of sections
+        -Best Case: O(s), where s is the number of sections
+        """
+        if len(buffer) < HEADER.size:
+            raise ValueError("Not a .paint file: too short.")
+        magic, version, style, brush, count, width, height = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Not a .paint file: bad magic number.")
+        if version not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported .paint version {version}, expected one of {READABLE_VERSIONS}.")
+        self.version = version
+        self.buffer = buffer
+        self.draw_style = Grid.DRAW_STYLE_OPTIONS[style]
+        self.brush_size = brush
+        self.width = width
+        self.height = height
+        self.sections = {}
+        for i in range(count):
+            name, kind, offset, length = SECTION.unpack_from(buffer, HEADER.size + i * SECTION.size)
+            self.sections[name.decode()] = (kind.decode(), offset, length)
+        if version == 1 and "STPE" in self.sections:
+            raise ValueError("Version 1 .paint file with erase steps but no erase positions, it can't be read.")
+        self._view = memoryview(buffer)
+        self._columns = {}
+
+    @classmethod
+    def open(cls, path: str) -> PaintDocument:
+        """Memory map a .paint file. Close the document (or use `with`) when done."""
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(mapped)
+        except ValueError:
+            mapped.close()
+            raise
+
+    def column(self, name: str):
+        """
+        Returns a section as a sequence of ints, a view into the buffer
+        (or, on big-endian machines, a byte swapped copy).
+
+        Raises:
+        - KeyError: if the file has no such section.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            kind, offset, length = self.sections[name]
+            size = array(kind).itemsize
+            data = self._view[offset:offset + length * size]
+            if sys.byteorder == "big" and size > 1:
+                column = array(kind, data.tobytes())
+                column.byteswap()
+            else:
+                column = data.cast(kind)
+            self._columns[name] = column
+        return column
+
+    def cell(self, x: int, y: int) -> tuple[tuple[int, ...], bool]:
+        """Returns square (x, y) in the form of LayerStore.stack_state()."""
+        i = x * self.height + y
+        offsets = self.column("CELO")
+        return tuple(self.column("CELL")[offsets[i]:offsets[i + 1]]), bool(self.column("CINV")[i])
+
+    def snapshot(self) -> tuple[str, dict[tuple[int, int], tuple[tuple[int, ...], bool]]]:
+        """
+        Returns the grid in the form of Grid.snapshot(), ready for Grid.restore().
+
+        Complexity:
+        -Worst Case: O(x*y*n), n layers per square
+        -Best Case: O(x*y), an empty grid
+        """
+        offsets, layers, inverted = self.column("CELO"), self.column("CELL"), self.column("CINV")
+        states = {}
+        i = 0
+        for x in range(self.width):
+            for y in range(self.height):
+                start, end = offsets[i], offsets[i + 1]
+                if start != end or inverted[i]:
+                    states[(x, y)] = (tuple(layers[start:end]), bool(inverted[i]))
+                i += 1
+        return self.draw_style, states
+
+    def actions(self) -> list[PaintAction]:
+        """
+        Rebuild every stored action, in the order the history columns index them.
+
+        Complexity:
+        -Worst Case: O(a + s), a actions with s steps in total
+        -Best Case: O(a + s), a actions with s steps in total
+        """
+        registered = get_layers()
+        offsets, special = self.column("ACTO"), self.column("ACTF")
+        xs, ys, layers = self.column("STPX"), self.column("STPY"), self.column("STPL")
+        if self.version == 1: #no erases
+            erase = positions = bytes(len(xs))
+        else:
+            erase, positions = self.column("STPE"), self.column("STPP")
+        def step(s: int) -> PaintStep:
+            if erase[s]:
+                return EraseStep((xs[s], ys[s]), registered[layers[s]], positions[s])
+            return PaintStep((xs[s], ys[s]), registered[layers[s]])
+        return [
+            PaintAction([step(s) for s in range(offsets[a], offsets[a + 1])], bool(special[a]))
+            for a in range(len(special))
+        ]
+
+    def load_into(self, engine: PaintEngine) -> None:
+        """
+        Replace the engine's grid and history with the document's.
+
+        Args:
+        - engine: an engine with the same grid dimensions as the document.
+
+        Raises:
+        - ValueError: if the dimensions differ.
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(x*y*n + a + s), restoring every square and action
+        -Best Case: O(x*y), an empty grid with no history
+        """
+        if (engine.grid.x, engine.grid.y) != (self.width, self.height):
+            raise ValueError(f"Document is {self.width}x{self.height}, grid is {engine.grid.x}x{engine.grid.y}.")
+        actions = self.actions()
+        engine.draw_style = self.draw_style
+        engine.grid.restore(self.snapshot())
+        engine.grid.brush_size = self.brush_size
+        engine.UndoTracker.restore([actions[i] for i in self.column("UNDO")],
+                                   [actions[i] for i in self.column("REDO")])
+        engine.ReplayTracker.restore([(actions[i], bool(u)) for i, u in zip(self.column("RPLY"), self.column("RPLU"))])
+
+    def close(self) -> None:
+        """Release the column views and unmap the file."""
+        for column in self._columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        self._columns.clear()
+        self._view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __enter__(self) -> PaintDocument:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def load(path: str) -> PaintEngine:
+    """Returns a new headless PaintEngine holding the grid and history saved in `path`."""
+    with PaintDocument.open(path) as doc:
+        engine = PaintEngine(doc.draw_style, doc.width, doc.height)
+        doc.load_into(engine)
+    return engine
@@ -0,0 +1,129 @@
+"""
+CPU and memory profiling of a whole session.
+
+profiled() wraps a session (the window's event loop, or a headless run)
+in cProfile and/or tracemalloc. On exit it writes the pstats file or the
+tracemalloc snapshot, and prints where the time or memory went by
+subsystem:
+
+- grid stores: grid.py, layer_store.py, tiled_grid.py
+- history: undo.py, action.py
+- replay: replay.py
+- engine: engine.py, batch.py, command_queue.py
+- persistence: autosave.py, paint_file.py
+- rendering: grid_renderer.py, animation_cache.py, layers.py, layer_util.py, window.py
+
+Memory is charged to the innermost subsystem frame of each allocation's
+traceback, looking through data_structures/, so the CircularQueue each
+additive square allocates counts as grid stores. CPU time has no
+tracebacks, so time spent in data_structures/ is listed on its own.
+
+    python main.py --profile session.prof --memprofile session.snapshot
+    python -m visuals.complex --profile complex.prof
+    python -m virtual_clock visuals/complex.py --memprofile complex.snapshot
+"""
+
+from __future__ import annotations
+import contextlib
+import cProfile
+import os
+import pstats
+import tracemalloc
+from collections import Counter
+from typing import Iterator
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_STRUCTURES = os.path.join(ROOT, "data_structures")
+SUBSYSTEMS = {
+    "grid stores": ("grid.py", "layer_store.py", "tiled_grid.py"),
+    "history": ("undo.py", "action.py"),
+    "replay": ("replay.py",),
+    "engine": ("engine.py", "batch.py", "command_queue.py"),
+    "persistence": ("autosave.py", "paint_file.py"),
+    "rendering": ("grid_renderer.py", "animation_cache.py", "layers.py", "layer_util.py", "window.py"),
+}
+_OWNERS = {os.path.join(ROOT, name): subsystem for subsystem, names in SUBSYSTEMS.items() for name in names}
+FRAMES = 32 #traceback depth kept by tracemalloc, enough to reach the owning subsystem
+
+def subsystem(filename: str) -> str | None:
+    """The subsystem a source file belongs to, "data structures", or None."""
+    filename = os.path.abspath(filename)
+    if filename.startswith(DATA_STRUCTURES + os.sep):
+        return "data structures"
+    return _OWNERS.get(filename)
+
+def memory_by_subsystem(snapshot: tracemalloc.Snapshot) -> Counter:
+    """
+    Bytes still allocated, by the innermost subsystem in each allocation's
+    traceback ("data structures" if only data_structures/ is, "other" if none).
+
+    Complexity:
+    -Worst Case: O(t*f), t tracebacks of f frames
+    -Best Case: O(t), every allocation is made in a subsystem
+    """
+    totals = Counter()
+    for stat in snapshot.statistics("traceback"):
+        owner = "other"
+        for frame in reversed(stat.traceback): #tracemalloc keeps the innermost frame last
+            found = subsystem(frame.filename)
+            if found == "data structures":
+                owner = found #unless a subsystem further out made the structure
+            elif found is not None:
+                owner = found
+                break
+        totals[owner] += stat.size
+    return totals
+
+def time_by_subsystem(stats: pstats.Stats) -> Counter:
+    """Seconds spent in each subsystem's own code (pstats total time, "other" for the rest)."""
+    totals = Counter()
+    for (filename, _, _), (_, _, total, _, _) in stats.stats.items():
+        totals[subsystem(filename) or "other"] += total
+    return totals
+
+def report(totals: Counter, unit: str) -> str:
+    """A text table of totals, largest first, with each one's share."""
+    whole = sum(totals.values()) or 1
+    scale, suffix = (1024, "KiB") if unit == "bytes" else (1, "s")
+    lines = []
+    for name, value in totals.most_common():
+        lines.append(f"  {name:<16}{value / scale:12.3f} {suffix} {value / whole:7.1%}")
+    return "\n".join(lines)
+
+@contextlib.contextmanager
+def profiled(profile: str | None = None, memprofile: str | None = None) -> Iterator[None]:
+    """
+    Profile the block. With neither path given, nothing is done.
+
+    Args:
+    - profile: where to write the cProfile pstats file, readable with pstats or snakeviz.
+    - memprofile: where to write the tracemalloc snapshot (tracemalloc.Snapshot.load reads it),
+                  taken as the block ends, so it holds what the session still had allocated.
+    """
+    profiler = cProfile.Profile() if profile else None
+    tracing = memprofile and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start(FRAMES)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            print(f"CPU profile written to {profile}, own time by subsystem:")
+            print(report(time_by_subsystem(pstats.Stats(profiler)), "seconds"))
+        if memprofile:
+            snapshot = tracemalloc.take_snapshot()
+            if tracing:
+                tracemalloc.stop()
+            snapshot.dump(memprofile)
+            print(f"Memory snapshot written to {memprofile}, memory allocated by subsystem:")
+            print(report(memory_by_subsystem(snapshot), "bytes"))
+
+def add_arguments(parser) -> None:
+    """Add the --profile and --memprofile options to an argparse parser."""
+    parser.add_argument("--profile", metavar="PATH", help="Profile the session with cProfile, writing pstats here.")
+    parser.add_argument("--memprofile", metavar="PATH",
+                        help="Trace allocations with tracemalloc, writing the final snapshot here.")
@@ -0,0 +1,176 @@
+"""
+Binary protocol for the collaboration server (collab_server.py).
+
+Every message is a HEADER (payload length, message kind) followed by the
+payload. Numbers are little-endian.
+
+Client to server:
+    PAINT    layer index u8, x u16, y u16, brush size u8
+    UNDO, REDO, SPECIAL    no payload
+    BATCH    records of batch.OP, answered by RESULTS or ERROR
+    SUBSCRIBE  replay_broadcast.SUBSCRIBE, asking a ReplayServer for its replay
+
+Server to client:
+    WELCOME  draw style u8, width u16, height u16, sent once on connecting
+    SNAPSHOT tick u32, cell count u32, then cells. Replaces every square:
+             squares not listed are empty.
+    DELTA    same layout as SNAPSHOT, but only the listed squares changed.
+    RESULTS  value count u32, frame count u32, the values as u32, then the
+             frames' RGB pixels, width*height*3 bytes each (see batch.BatchResult).
+    ERROR    UTF-8 description of why a BATCH failed part way.
+    END      no payload, the replay being streamed has finished.
+
+A cell is x u16, y u16, a head byte holding the layer count and the
+INVERTED flag, then that many layer indices in stack_state() order, so a
+client can mirror the server's grid with LayerStore.restore_state().
+"""
+
+from __future__ import annotations
+import asyncio
+import struct
+
+from grid import Grid
+
+HEADER = struct.Struct("<IB")
+PAINT = 1
+UNDO = 2
+REDO = 3
+SPECIAL = 4
+BATCH = 5
+SUBSCRIBE = 6
+WELCOME = 16
+SNAPSHOT = 17
+DELTA = 18
+RESULTS = 19
+ERROR = 20
+END = 21
+
+PAINT_BODY = struct.Struct("<BHHB")
+WELCOME_BODY = struct.Struct("<BHH")
+CELLS_BODY = struct.Struct("<II")
+RESULTS_BODY = struct.Struct("<II")
+CELL = struct.Struct("<HHB")
+INVERTED = 0x80
+MAX_LAYERS = 0x7F
+MAX_PAYLOAD = 1 << 26 #larger lengths mean the stream is corrupt
+
+class ProtocolError(Exception):
+    """A malformed message was received."""
+
+def encode(kind: int, payload: bytes = b"") -> bytes:
+    """A whole message of the given kind."""
+    return HEADER.pack(len(payload), kind) + payload
+
+def encode_paint(layer: int, x: int, y: int, brush_size: int) -> bytes:
+    return encode(PAINT, PAINT_BODY.pack(layer, x, y, brush_size))
+
+def encode_welcome(draw_style: str, width: int, height: int) -> bytes:
+    return encode(WELCOME, WELCOME_BODY.pack(Grid.DRAW_STYLE_OPTIONS.index(draw_style), width, height))
+
+def decode_welcome(payload: bytes) -> tuple[str, int, int]:
+    style, width, height = WELCOME_BODY.unpack(payload)
+    return Grid.DRAW_STYLE_OPTIONS[style], width, height
+
+def encode_cells(kind: int, tick: int, cells) -> bytes:
+    """
+    A SNAPSHOT or DELTA message.
+
+    Args:
+    - kind: SNAPSHOT or DELTA.
+    - tick: the server tick the cells belong to.
+    - cells: iterable of ((x, y), (layers, inverted)), see LayerStore.stack_state().
+
+    Raises:
+    - ProtocolError: if a square holds more than MAX_LAYERS layers.
+
+    Complexity:
+    -Worst Case: O(c*n), c cells of n layers
+    -Best Case: O(1), no cells
+    """
+    parts = [b""]
+    pack = CELL.pack
+    count = 0
+    for (x, y), (layers, inverted) in cells:
+        if len(layers) > MAX_LAYERS:
+            raise ProtocolError(f"Square ({x}, {y}) has too many layers to send.")
+        parts.append(pack(x, y, len(layers) | (INVERTED if inverted else 0)))
+        if layers:
+            parts.append(bytes(layers))
+        count += 1
+    parts[0] = CELLS_BODY.pack(tick, count)
+    return encode(kind, b"".join(parts))
+
+def decode_cells(payload: bytes) -> tuple[int, list[tuple[tuple[int, int], tuple[tuple[int, ...], bool]]]]:
+    """
+    The tick and cells of a SNAPSHOT or DELTA payload, as given to encode_cells.
+
+    Raises:
+    - ProtocolError: if the payload is truncated.
+
+    Complexity:
+    -Worst Case: O(c*n), c cells of n layers
+    -Best Case: O(1), no cells
+    """
+    try:
+        tick, count = CELLS_BODY.unpack_from(payload)
+        cells = []
+        unpack = CELL.unpack_from
+        p = CELLS_BODY.size
+        for _ in range(count):
+            x, y, head = unpack(payload, p)
+            p += CELL.size
+            end = p + (head & MAX_LAYERS)
+            if end > len(payload):
+                raise ProtocolError("Truncated cell.")
+            cells.append(((x, y), (tuple(payload[p:end]), bool(head & INVERTED))))
+            p = end
+    except struct.error as e:
+        raise ProtocolError(str(e)) from None
+    return tick, cells
+
+def encode_results(values: list[int], frames: list[bytes]) -> bytes:
+    return encode(RESULTS, RESULTS_BODY.pack(len(values), len(frames))
+                  + struct.pack(f"<{len(values)}I", *values) + b"".join(frames))
+
+def results_size(values: int, frames: int, frame_size: int) -> int:
+    """The payload length of RESULTS with this many values and frames, to check against MAX_PAYLOAD."""
+    return RESULTS_BODY.size + 4 * values + frames * frame_size
+
+def decode_results(payload: bytes, frame_size: int) -> tuple[list[int], list[bytes]]:
+    """
+    The values and frames of a RESULTS payload, as given to encode_results.
+
+    Raises:
+    - ProtocolError: if the payload is the wrong length.
+    """
+    try:
+        count, frames = RESULTS_BODY.unpack_from(payload)
+        values = list(struct.unpack_from(f"<{count}I", payload, RESULTS_BODY.size))
+    except struct.error as e:
+        raise ProtocolError(str(e)) from None
+    start = RESULTS_BODY.size + 4 * count
+    if len(payload) != start + frames * frame_size:
+        raise ProtocolError("Results are the wrong length for their frames.")
+    return values, [payload[start + i * frame_size:start + (i + 1) * frame_size] for i in range(frames)]
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, bytes] | None:
+    """
+    The next (kind, payload) from the stream, or None once it has ended.
+
+    Raises:
+    - ProtocolError: if the stream ends inside a message, or a length is implausible.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ProtocolError("Stream ended inside a message header.") from None
+        return None
+    length, kind = HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Message of {length} bytes is too long.")
+    try:
+        payload = await reader.readexactly(length) if length else b""
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Stream ended inside a message.") from None
+    return kind, payload
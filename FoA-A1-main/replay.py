@@ -33,6 +33,8 @@ class ReplayTracker:
                                                        #it allows to pop the first layer that add to the Queue and this is
                                                        #benefial to replay as replay is to restart the whole drawing animation
                                                        #so we can just pop and apply
+        self.recorded = 0 #actions ever added since the last clear, playing them back doesn't lower it
+        self.dropped = 0 #actions forgotten by drop_oldest() since the last clear
 
     def start_replay(self) -> None:
         """
@@ -75,6 +77,7 @@ class ReplayTracker:
         Explanation: append function's complexity is O(1)
         """
         self.action.append((action,is_undo)) #append the action and is_undo to self.action queue for replay
+        self.recorded += 1
 
     def play_next_action(self, grid: Grid) -> bool:
         """
@@ -108,6 +111,104 @@ class ReplayTracker:
         else: #if self.action is empty then return true to indicate nthg happened
            return True
 
+    def pending(self) -> list[tuple[PaintAction, bool]]:
+        """
+        The (action, is_undo) pairs still to be played, in order,
+        without removing them from the queue.
+
+        Args:
+        - None
+
+        Raises:
+        -None
+
+        Returns:
+        -list of (PaintAction, is_undo)
+
+        Complexity:
+        -Worst Case: O(n), where n is the number of queued actions
+        -Best Case: O(1), the queue is empty
+        """
+        queue = self.action
+        return [queue.array[(queue.front + i) % len(queue.array)] for i in range(len(queue))]
+
+    def recent(self, count: int) -> list[tuple[PaintAction, bool]]:
+        """
+        The last `count` (action, is_undo) pairs added, in order, without
+        removing them from the queue. Observers that remember `recorded`
+        use this to see only what was added since they last looked.
+
+        Args:
+        - count: how many pairs, at most len(self.action)
+
+        Raises:
+        -None
+
+        Returns:
+        -list of (PaintAction, is_undo)
+
+        Complexity:
+        -Worst Case: O(count), constant work per pair
+        -Best Case: O(1), count is 0
+        """
+        queue = self.action
+        size = len(queue.array)
+        return [queue.array[(queue.rear - count + i) % size] for i in range(count)]
+
+    def restore(self, pending: list[tuple[PaintAction, bool]]) -> None:
+        """
+        Replace the queued actions with the (action, is_undo) pairs from pending().
+
+        Args:
+        - pending: the pairs to queue, in play order
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(n), where n is len(pending)
+        -Best Case: O(1), nothing to queue
+        """
+        self.clear()
+        for action, is_undo in pending:
+            self.add_action(action, is_undo)
+
+    def drop_oldest(self) -> None:
+        """
+        Forget the oldest action without playing it, to make room for another
+        when the queue is full, so only the most recent history is lost.
+
+        Complexity:
+        -Worst Case: O(1), serve() on CircularQueue
+        -Best Case: O(1), serve() on CircularQueue
+        """
+        self.action.serve()
+        self.dropped += 1
+
+    def clear(self) -> None:
+        """
+        Forget every recorded action, keeping the existing queue.
+
+        Args:
+        - None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(1), clear() on CircularQueue only resets the indices
+        -Best Case: O(1), clear() on CircularQueue only resets the indices
+        """
+        self.action.clear()
+        self.recorded = 0
+        self.dropped = 0
+
 if __name__ == "__main__":
     action1 = PaintAction([], is_special=True)
     action2 = PaintAction([])
@@ -0,0 +1,233 @@
+"""
+Replay streaming to many viewers.
+
+ReplayBroadcast plays a replay log once, on a scratch grid, and encodes
+what each action changed as a protocol.py message: a DELTA of the squares
+it touched, or a SNAPSHOT for a special. Every KEYFRAME_EVERY actions it
+also keeps a SNAPSHOT of the whole grid, so a viewer can start anywhere
+by taking the keyframe before its start and the few deltas after it.
+
+ReplayServer streams those prepared messages over asyncio. Each viewer
+subscribes with its own speed and start position and is paced by its own
+task, but all a viewer costs is writing bytes that already exist, so the
+decoding work is done once however many are watching. A slow viewer
+only holds up its own task, which waits for its socket to drain.
+
+    python -m replay_broadcast session.paint --port 8766
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import struct
+
+from collab_server import CollabClient
+from engine import PaintEngine
+from grid import Grid
+import paint_file
+import protocol
+
+SUBSCRIBE = struct.Struct("<fI") #actions per second (0 for as fast as possible), start position
+
+class ReplayBroadcast:
+    KEYFRAME_EVERY = 256
+
+    def __init__(self, engine: PaintEngine, keyframe_every: int = KEYFRAME_EVERY) -> None:
+        """
+        Decode the engine's replay log into messages. The engine itself isn't changed.
+
+        Args:
+        - engine: the engine whose recorded actions are streamed, played from an empty grid
+                  as with start_replay().
+        - keyframe_every: actions between keyframes.
+
+        Raises:
+        - ValueError: if keyframe_every isn't positive.
+
+        Complexity:
+        -Worst Case: O(a*comp + s*n + (a/k)*x*y*n), a actions with s steps in total, a keyframe every k actions,
+                     or O(x*y*n) more per special
+        -Best Case: O(x*y), nothing recorded
+        """
+        if keyframe_every <= 0:
+            raise ValueError("Keyframes should be at least one action apart.")
+        grid = engine.grid
+        self.draw_style = engine.draw_style
+        self.width = grid.x
+        self.height = grid.y
+        self.keyframe_every = keyframe_every
+        self.messages = [] #messages[i] brings a viewer from i actions played to i + 1
+        self.keyframes = [] #keyframes[k] is the grid after k * keyframe_every actions
+        scratch = Grid(grid.draw_style, grid.x, grid.y)
+        def snapshot(played: int) -> bytes:
+            return protocol.encode_cells(protocol.SNAPSHOT, played, scratch.snapshot()[1].items())
+        for played, (action, undo) in enumerate(engine.ReplayTracker.pending()):
+            if played % keyframe_every == 0:
+                self.keyframes.append(snapshot(played))
+            if undo:
+                action.undo_apply(scratch)
+            else:
+                action.redo_apply(scratch)
+            if action.is_special:
+                self.messages.append(snapshot(played + 1))
+            else:
+                squares = dict.fromkeys(step.affected_grid_square for step in action.steps)
+                self.messages.append(protocol.encode_cells(
+                    protocol.DELTA, played + 1, (((x, y), scratch[x][y].stack_state()) for x, y in squares)))
+        if len(self.messages) % keyframe_every == 0:
+            self.keyframes.append(snapshot(len(self.messages)))
+
+    @classmethod
+    def from_file(cls, path: str, keyframe_every: int = KEYFRAME_EVERY) -> ReplayBroadcast:
+        """Decode the replay log saved in a .paint file."""
+        return cls(paint_file.load(path), keyframe_every)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def seek(self, position: int) -> bytes:
+        """
+        The messages bringing a viewer from nothing to `position` actions played:
+        the keyframe before it and the deltas after the keyframe.
+
+        Raises:
+        - IndexError: if position is outside [0, len(self)].
+
+        Complexity:
+        -Worst Case: O(k), joining up to k = keyframe_every deltas
+        -Best Case: O(1), position is a keyframe
+        """
+        if not 0 <= position <= len(self):
+            raise IndexError(f"Position {position} is outside the replay.")
+        keyframe = position // self.keyframe_every
+        return self.keyframes[keyframe] + b"".join(self.messages[keyframe * self.keyframe_every:position])
+
+class ReplayServer:
+    FRAME = 1 / 60 #seconds between writes to a paced viewer
+    CHUNK = 256 #messages per write to an unpaced viewer
+
+    def __init__(self, broadcast: ReplayBroadcast) -> None:
+        self.broadcast = broadcast
+        self.server = None
+        self.viewers = 0
+        self.handlers = set() #viewer tasks, cancelled by close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: str | None = None) -> None:
+        """Start listening, on a Unix socket if `path` is given, otherwise on TCP (port 0 picks a free port)."""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self.server = await asyncio.start_server(self._serve, host, port)
+
+    @property
+    def address(self):
+        """The address being listened on, (host, port) or a socket path."""
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        await self.server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening and disconnect every viewer."""
+        if self.server is not None:
+            self.server.close()
+        handlers = list(self.handlers)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        handler = asyncio.current_task()
+        self.handlers.add(handler)
+        self.viewers += 1
+        broadcast = self.broadcast
+        try:
+            writer.write(protocol.encode_welcome(broadcast.draw_style, broadcast.width, broadcast.height))
+            writer.write(broadcast.seek(0))
+            message = await protocol.read_message(reader)
+            if message is None:
+                return
+            kind, payload = message
+            if kind != protocol.SUBSCRIBE or len(payload) != SUBSCRIBE.size:
+                raise protocol.ProtocolError("Expected a subscription.")
+            rate, start = SUBSCRIBE.unpack(payload)
+            await self._stream(writer, rate, min(start, len(broadcast)))
+            writer.write(protocol.encode(protocol.END))
+            await writer.drain()
+        except (protocol.ProtocolError, ConnectionError):
+            pass
+        except asyncio.CancelledError: #close(); ending normally keeps asyncio from logging it as an error
+            pass
+        finally:
+            self.viewers -= 1
+            self.handlers.discard(handler)
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter, rate: float, start: int) -> None:
+        """Send the replay from `start` on, `rate` actions per second, waiting for the socket to drain after each write."""
+        messages = self.broadcast.messages
+        writer.write(self.broadcast.seek(start))
+        await writer.drain()
+        sent = start
+        if rate <= 0:
+            while sent < len(messages):
+                writer.write(b"".join(messages[sent:sent + self.CHUNK]))
+                sent += self.CHUNK
+                await writer.drain()
+            return
+        loop = asyncio.get_running_loop()
+        began = loop.time()
+        while sent < len(messages):
+            due = min(len(messages), start + int((loop.time() - began) * rate))
+            if due > sent:
+                writer.write(b"".join(messages[sent:due]))
+                sent = due
+                await writer.drain()
+            else: #sleep until the next action is due, but no more often than once a frame
+                await asyncio.sleep(max(self.FRAME, began + (sent + 1 - start) / rate - loop.time()))
+
+class ReplayViewer(CollabClient):
+    """A CollabClient for ReplayServer: `tick` is the number of actions played so far."""
+
+    def subscribe(self, rate: float = 0, start: int = 0) -> None:
+        """Ask for the replay from action `start`, `rate` actions per second (0 for as fast as possible)."""
+        self.writer.write(protocol.encode(protocol.SUBSCRIBE, SUBSCRIBE.pack(rate, start)))
+
+    def apply(self, kind: int, payload: bytes) -> int:
+        """As CollabClient.apply, also accepting the END of the replay."""
+        if kind == protocol.END:
+            return kind
+        return super().apply(kind, payload)
+
+    async def watch(self) -> None:
+        """Apply messages until the replay ends or the server disconnects."""
+        while await self.receive() not in (protocol.END, None):
+            pass
+
+async def _main(args) -> None:
+    broadcast = ReplayBroadcast.from_file(args.session)
+    server = ReplayServer(broadcast)
+    await server.start(args.host, args.port, args.unix)
+    print(f"Streaming {len(broadcast)} actions on {server.address}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Stream a saved session's replay to local viewers.")
+    parser.add_argument("session", help=".paint file whose replay log is streamed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import argparse
 import re
+import sys
+import tracemalloc
 import unittest
 from io import StringIO
 
-from ed_utils.json_test_runner import JSONTestRunner
+from benchmarks.suite import DEFAULT_BASELINE, DEFAULT_THRESHOLD
+from ed_utils.json_test_runner import JSONTestRunner, TimedTextTestResult, slowest_report
+from ed_utils.parallel_runner import run_parallel
 
 if __name__ == "__main__":
 
@@ -31,8 +35,58 @@ if __name__ == "__main__":
         help="Use if running on Ed.",
         action="store_true",
     )
+    p.add_argument(
+        "--slowest",
+        help="Report the N slowest tests, with the peak memory each allocated.",
+        type=int,
+        default=0,
+        metavar="N",
+    )
+    p.add_argument(
+        "-j",
+        "--jobs",
+        help="Run the tests in N worker processes. Results are the same for any N.",
+        type=int,
+        default=1,
+        metavar="N",
+    )
+    p.add_argument(
+        "--bench",
+        help=(
+            "Run the benchmark suite (benchmarks/suite.py) instead of the tests, "
+            "failing if any benchmark is slower than the baseline by more than the threshold. "
+            "A task given with --bench selects benchmarks whose name starts with it."
+        ),
+        action="store_true",
+    )
+    p.add_argument("--baseline", help="Baseline file for --bench.", default=DEFAULT_BASELINE)
+    p.add_argument("--threshold", help="Allowed slowdown for --bench, 0.25 is 25%%.", type=float, default=DEFAULT_THRESHOLD)
+    p.add_argument("--update-baseline", help="With --bench, save the results as the new baseline.", action="store_true")
     args = p.parse_args()
 
+    if args.bench:
+        from benchmarks import suite
+        names = [name for name in suite.BENCHMARKS if name.startswith(args.task)]
+        baseline = suite.load_baseline(args.baseline)
+        def report(name, seconds):
+            base = baseline.get(name)
+            change = f"{(seconds - base) / base:+7.1%}" if base else "    new"
+            print(f"{name:<36}{seconds * 1e6:12.2f} us  {change}", flush=True)
+        results = suite.run(names, report=report)
+        if args.update_baseline:
+            suite.save_baseline(args.baseline, {**baseline, **results})
+            print(f"Saved baseline to {args.baseline}")
+            sys.exit(0)
+        if not baseline:
+            print(f"No baseline at {args.baseline}, save one with --update-baseline.")
+        regressed = [name for name, _, _, slower in suite.compare(results, baseline, args.threshold) if slower]
+        if regressed:
+            print(f"FAILED: {len(regressed)} benchmark(s) more than {args.threshold:.0%} slower than the baseline: "
+                  + ", ".join(regressed))
+            sys.exit(1)
+        print("OK")
+        sys.exit(0)
+
     suite = unittest.defaultTestLoader.discover('.')
     for s in suite:
         for t in s:
@@ -47,12 +101,23 @@ if __name__ == "__main__":
                     marked_remove.add(t2)
             for t2 in marked_remove:
                 t._tests.remove(t2)
-    if args.for_ed:
+    if args.jobs > 1:
+        f = StringIO("")
+        run_parallel(suite, args.jobs, args.for_ed, args.slowest, stream=f if args.for_ed else None)
+        if args.for_ed:
+            print(f.getvalue())
+    elif args.for_ed:
         f = StringIO("")
-        runner = JSONTestRunner(stream=f)
+        runner = JSONTestRunner(stream=f, slowest=args.slowest)
         runner.run(suite)
 
         print(f.getvalue())
+    elif args.slowest:
+        runner = unittest.runner.TextTestRunner(resultclass=TimedTextTestResult)
+        tracemalloc.start()
+        result = runner.run(suite)
+        tracemalloc.stop()
+        print(slowest_report(result, args.slowest))
     else:
         runner = unittest.runner.TextTestRunner()
         runner.run(suite)
@@ -0,0 +1,76 @@
+import unittest
+from ed_utils.decorators import number
+
+from grid import Grid
+from layer_store import SetLayerStore, AdditiveLayerStore, SequenceLayerStore
+from layer_util import get_layers, pack_color, unpack_color
+from layers import black, lighten, rainbow, sparkle
+
+class TestLayerStack(unittest.TestCase):
+
+    @number("7.1")
+    def test_shared(self):
+        s1 = SetLayerStore()
+        s2 = SetLayerStore()
+        s1.add(black)
+        s2.add(black)
+        self.assertIs(s1.get_stack(), s2.get_stack())
+        # Copy on write: changing one square doesn't touch the other.
+        old = s1.get_stack()
+        s1.special()
+        self.assertIsNot(s1.get_stack(), old)
+        self.assertIs(s2.get_stack(), old)
+        s1.special()
+        self.assertIs(s1.get_stack(), old)
+
+    @number("7.2")
+    def test_matches_store(self):
+        for store_type in [SetLayerStore, AdditiveLayerStore, SequenceLayerStore]:
+            s = store_type()
+            for layer in [rainbow, lighten, black, sparkle, lighten]:
+                s.add(layer)
+                for args in [((100, 100, 100), 7, 3, 4), ((0, 50, 200), 2.5, 10, 1)]:
+                    self.assertEqual(s.get_stack().get_color(*args), s.get_color(*args))
+            s.special()
+            self.assertEqual(s.get_stack().get_color((100, 100, 100), 7, 3, 4), s.get_color((100, 100, 100), 7, 3, 4))
+
+    @number("7.3")
+    def test_render(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            grid = Grid(style, 6, 6)
+            for x in range(6):
+                for y in range(3):
+                    grid[x][y].add(lighten)
+                    grid[x][y].add(rainbow if x % 2 else black)
+            grid.special()
+            colors = grid.render((255, 255, 255), 3)
+            for x in range(6):
+                for y in range(6):
+                    self.assertEqual(colors[x][y], grid[x][y].get_color((255, 255, 255), 3, x, y))
+
+    @number("7.4")
+    def test_packed_layers(self):
+        for layer in get_layers():
+            if layer is None: break
+            for color in [(255, 255, 255), (0, 0, 0), (100, 20, 250)]:
+                for args in [(7, 3, 4), (2.5, 10, 1), (0.4, 0, 31)]:
+                    self.assertEqual(
+                        unpack_color(layer.apply_packed(pack_color(color), *args)),
+                        tuple(layer.apply(color, *args)),
+                        layer.name,
+                    )
+
+    @number("7.5")
+    def test_render_packed(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            grid = Grid(style, 5, 4)
+            for x in range(5):
+                grid[x][x % 4].add(sparkle)
+                grid[x][(x + 1) % 4].add(lighten)
+            grid.special()
+            colors = grid.render((20, 30, 40), 1.5)
+            out = grid.render_packed(pack_color((20, 30, 40)), 1.5)
+            self.assertIs(grid.render_packed(pack_color((20, 30, 40)), 1.5, out), out)
+            for x in range(5):
+                for y in range(4):
+                    self.assertEqual(unpack_color(out[x * 4 + y]), colors[x][y])
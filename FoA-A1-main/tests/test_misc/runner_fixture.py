@@ -0,0 +1,32 @@
+"""
+Tests for test_test_runner to run. The name doesn't start with test_, so
+discovery doesn't pick them up, and they only change when it needs them to.
+"""
+import unittest
+from ed_utils.decorators import number
+
+class First(unittest.TestCase):
+
+    @number("0.1")
+    def test_a(self):
+        self.assertEqual(1 + 1, 2)
+
+    @number("0.2")
+    def test_b(self):
+        self.assertTrue([0])
+
+class Second(unittest.TestCase):
+
+    @number("0.3")
+    def test_c(self):
+        self.assertIn("a", "abc")
+
+    @number("0.4")
+    def test_d(self):
+        self.assertEqual(sorted([3, 1, 2]), [1, 2, 3])
+
+class Third(unittest.TestCase):
+
+    @number("0.5")
+    def test_e(self):
+        self.assertIsNone(None)
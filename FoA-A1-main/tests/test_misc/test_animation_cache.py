@@ -0,0 +1,68 @@
+import unittest
+from ed_utils.decorators import number
+
+from animation_cache import AnimationCache
+from grid import Grid
+from layer_util import pack_color
+from layers import rainbow, sparkle, lighten
+
+class TestAnimationCache(unittest.TestCase):
+
+    @number("8.1")
+    def test_stepwise_exact(self):
+        cache = AnimationCache()
+        color = pack_color((100, 150, 200))
+        for frame in range(200):
+            timestamp = frame / 60
+            for x in range(4):
+                for y in range(4):
+                    self.assertEqual(
+                        cache.apply(sparkle, color, timestamp, x, y),
+                        sparkle.apply_packed(color, timestamp, x, y),
+                    )
+        self.assertGreater(cache.hits, cache.misses)
+
+    @number("8.2")
+    def test_continuous_exact_mode(self):
+        cache = AnimationCache()
+        color = pack_color((0, 0, 0))
+        for frame in range(10):
+            self.assertEqual(cache.apply(rainbow, color, frame / 7, 1, 2), rainbow.apply_packed(color, frame / 7, 1, 2))
+        self.assertEqual(len(cache), 0)
+
+    @number("8.3")
+    def test_approximate(self):
+        cache = AnimationCache(quantum=0.1, approximate=True)
+        color = pack_color((0, 0, 0))
+        cache.apply(rainbow, color, 3.01, 1, 2)
+        self.assertEqual(cache.apply(rainbow, color, 23.02, 1, 2), rainbow.apply_packed(color, 3.0, 1, 2))
+        self.assertEqual(cache.hits, 1)
+
+    @number("8.4")
+    def test_lru(self):
+        cache = AnimationCache(max_entries=3)
+        color = pack_color((0, 0, 0))
+        for x in range(3):
+            cache.apply(sparkle, color, 0, x, 0)
+        cache.apply(sparkle, color, 0, 0, 0) # (0, 0) is now the most recent
+        cache.apply(sparkle, color, 0, 5, 0) # evicts (1, 0)
+        self.assertEqual(len(cache), 3)
+        hits = cache.hits
+        cache.apply(sparkle, color, 0, 0, 0)
+        self.assertEqual(cache.hits, hits + 1)
+        cache.apply(sparkle, color, 0, 1, 0)
+        self.assertEqual(cache.hits, hits + 1)
+
+    @number("8.5")
+    def test_render(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 6, 6)
+        for x in range(6):
+            for y in range(6):
+                grid[x][y].add(sparkle)
+                grid[x][y].add(lighten)
+        cache = AnimationCache()
+        for frame in range(30):
+            self.assertEqual(
+                grid.render_packed(0xFFFFFF, frame / 30, cache=cache),
+                grid.render_packed(0xFFFFFF, frame / 30),
+            )
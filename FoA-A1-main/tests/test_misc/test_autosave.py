@@ -0,0 +1,191 @@
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from autosave import AutosaveService, recover, _read_log
+from batch import Batch, run_batch
+from data_structures.queue_adt import CircularQueue
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue, rainbow, invert
+
+def history(engine):
+    undo, redo = engine.UndoTracker.history()
+    pending = engine.ReplayTracker.pending()
+    return ([len(a.steps) for a in undo], [len(a.steps) for a in redo],
+            [(a.is_special, len(a.steps) if not a.is_special else 0, u) for a, u in pending])
+
+class TestAutosave(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "session.paint")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @number("15.1")
+    def test_recover(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 7, 6)
+            engine.on_paint(blue, 0, 0)
+            service = AutosaveService(engine, self.path, compact_every=2)
+            engine.on_paint(red, 1, 1)
+            service.save()
+            engine.on_special()
+            engine.on_paint(rainbow, 4, 3)
+            service.save()
+            engine.on_undo()
+            engine.on_undo()
+            engine.on_redo()
+            service.save()
+            engine.on_special()
+            engine.on_paint(invert, 6, 5)
+            service.save()
+            service.flush()
+            recovered = recover(self.path)
+            self.assertEqual(recovered.grid.snapshot(), engine.grid.snapshot())
+            self.assertEqual(history(recovered), history(engine))
+            service.close()
+            self.assertEqual(recover(self.path).grid.snapshot(), engine.grid.snapshot())
+
+    @number("15.2")
+    def test_delta(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 20, 20)
+        service = AutosaveService(engine, self.path, compact_every=100)
+        self.assertTrue(service.save()) #finishes the first copy
+        self.assertFalse(service.save())
+        engine.grid.brush_size = 0
+        engine.on_paint(red, 3, 4)
+        engine.on_paint(blue, 5, 6)
+        self.assertTrue(service.save())
+        service.flush()
+        records = _read_log(self.path + ".log", 1)
+        self.assertEqual(len(records), 1)
+        # Only the touched squares are copied, and only new actions sent.
+        self.assertEqual(set(records[0].cells), {(3, 4), (5, 6)})
+        self.assertEqual(len(records[0].actions), 2)
+        engine.on_undo()
+        service.save()
+        service.flush()
+        records = _read_log(self.path + ".log", 1)
+        self.assertEqual(records[1].actions, {})
+        self.assertEqual(records[1].replay, records[0].replay + [(records[0].replay[1][0], True)])
+        service.close()
+
+    @number("15.3")
+    def test_reset(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 5, 5)
+        service = AutosaveService(engine, self.path)
+        engine.on_paint(red, 2, 2)
+        service.save()
+        engine.reset(Grid.DRAW_STYLE_ADD)
+        engine.on_paint(blue, 0, 0)
+        service.close()
+        recovered = recover(self.path)
+        self.assertEqual(recovered.grid.draw_style, Grid.DRAW_STYLE_ADD)
+        self.assertEqual(recovered.grid.snapshot(), engine.grid.snapshot())
+        self.assertEqual(len(recovered.ReplayTracker.pending()), 1)
+
+    @number("15.4")
+    def test_torn_log(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 5, 5)
+        service = AutosaveService(engine, self.path, compact_every=100)
+        engine.on_paint(red, 2, 2)
+        service.save()
+        service.flush()
+        expected = engine.grid.snapshot()
+        engine.on_paint(blue, 0, 0)
+        service.save()
+        service.flush()
+        with open(self.path + ".log", "r+b") as f:
+            f.truncate(os.path.getsize(self.path + ".log") - 3)
+        self.assertEqual(recover(self.path).grid.snapshot(), expected)
+        service.close()
+
+    @number("15.5")
+    def test_replay(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 6, 6)
+            engine.grid.brush_size = 1
+            service = AutosaveService(engine, self.path, compact_every=100)
+            engine.on_paint(red, 1, 1)
+            engine.on_paint(blue, 4, 4)
+            engine.on_special()
+            engine.on_paint(rainbow, 2, 3)
+            engine.on_undo()
+            service.save()
+            engine.start_replay()
+            for _ in range(4):
+                engine.on_update(engine.REPLAY_TIMER_DELTA)
+            service.save()
+            service.flush()
+            recovered = recover(self.path)
+            self.assertEqual(len(recovered.ReplayTracker.pending()), len(engine.ReplayTracker.pending()))
+            self.assertEqual(history(recovered), history(engine))
+            self.assertEqual(recovered.grid.snapshot(), engine.grid.snapshot())
+            self.assertEqual(recovered.grid.brush_size, engine.grid.brush_size)
+            # Steps played after the replay started are deltas again.
+            engine.on_update(engine.REPLAY_TIMER_DELTA)
+            self.assertTrue(service.save())
+            service.close()
+            recovered = recover(self.path)
+            self.assertEqual(history(recovered), history(engine))
+            self.assertEqual(recovered.grid.snapshot(), engine.grid.snapshot())
+
+    @number("15.6")
+    def test_full_replay_queue(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 6, 6)
+            engine.ReplayTracker.action = CircularQueue(5)
+            service = AutosaveService(engine, self.path, compact_every=100)
+            layers = [red, blue, rainbow]
+            for i in range(4):
+                batch = Batch()
+                for j in range(3):
+                    batch.stamp(layers[(i + j) % 3], i + j, j, 1)
+                batch.special().undo()
+                run_batch(engine, batch)
+                self.assertTrue(service.save())
+            # Only the oldest actions were dropped, the counters kept counting.
+            self.assertEqual(len(engine.ReplayTracker.action), 5)
+            self.assertEqual(engine.ReplayTracker.recorded, 20)
+            self.assertEqual(engine.ReplayTracker.dropped, 15)
+            service.flush()
+            recovered = recover(self.path)
+            self.assertEqual(recovered.grid.snapshot(), engine.grid.snapshot())
+            self.assertEqual(history(recovered), history(engine))
+            service.close()
+
+    @number("15.7")
+    def test_first_copy(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 12, 10)
+            engine.grid.brush_size = 1
+            for x in range(0, 12, 2):
+                engine.on_paint(blue, x, 5)
+            path = os.path.join(self.directory.name, style + ".paint")
+            service = AutosaveService(engine, path)
+            service.FIRST_COPY_SQUARES = 20 #two columns a tick
+            service.tick()
+            self.assertEqual(service.copied, 2)
+            self.assertFalse(os.path.exists(path)) #nothing is written until the copy is complete
+            engine.on_paint(red, 1, 1) #a copied column
+            engine.on_paint(rainbow, 9, 9) #a column not copied yet
+            for _ in range(2):
+                service.tick()
+            if style != Grid.DRAW_STYLE_SEQUENCE: #a sequence special would empty most squares
+                engine.on_special() #starts the copy again
+                service.tick()
+                self.assertEqual(service.copied, 2)
+            engine.on_erase(blue, 0, 5)
+            while service.first_copy is not None:
+                service.tick()
+            service.flush()
+            recovered = recover(path)
+            self.assertEqual(recovered.grid.snapshot(), engine.grid.snapshot())
+            self.assertEqual(history(recovered), history(engine))
+            engine.on_paint(red, 6, 6)
+            service.close()
+            self.assertEqual(recover(path).grid.snapshot(), engine.grid.snapshot())
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from ed_utils.decorators import number
+
+import protocol
+from batch import Batch, OP, render_count, run_batch
+from collab_server import CollabServer, CollabClient
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue, black, rainbow
+
+def sample_batch():
+    return (Batch().stamp(red, 1, 1, 1).stamp(blue, 1, 2, 0).erase(red, 1, 1, 0)
+            .undo().undo().redo().redo().special().render(0.5).stamp(rainbow, 5, 5, 2).render(2.0))
+
+class TestBatch(unittest.TestCase):
+
+    @number("19.1")
+    def test_same_as_calls(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 8, 8)
+            result = run_batch(engine, sample_batch())
+            expected = PaintEngine(style, 8, 8)
+            for size, call in ((1, lambda: expected.on_paint(red, 1, 1)), (0, lambda: expected.on_paint(blue, 1, 2)),
+                               (0, lambda: expected.on_erase(red, 1, 1)), (None, expected.on_undo),
+                               (None, expected.on_undo), (None, expected.on_redo), (None, expected.on_redo),
+                               (None, expected.on_special)):
+                if size is not None:
+                    expected.grid.brush_size = size
+                call()
+            first = bytes(expected.render(0.5).pixels)
+            expected.grid.brush_size = 2
+            expected.on_paint(rainbow, 5, 5)
+            self.assertEqual(engine.grid.snapshot(), expected.grid.snapshot())
+            self.assertEqual(len(engine.ReplayTracker.pending()), len(expected.ReplayTracker.pending()))
+            self.assertEqual(result.values, [5, 1, 1, 1, 1, 1, 1, 1, 0, 13, 1])
+            self.assertEqual(result.frames, [first, bytes(expected.render(2.0).pixels)])
+            self.assertIsNone(result.touched)
+            self.assertEqual(engine.grid.brush_size, Grid.DEFAULT_BRUSH_SIZE)
+
+    @number("19.2")
+    def test_touched_and_errors(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 4, 4)
+        result = run_batch(engine, Batch().stamp(black, 0, 0, 1).undo().undo().redo())
+        self.assertEqual(result.values, [3, 1, 0, 1])
+        self.assertEqual(result.touched, {(0, 0), (1, 0), (0, 1)})
+        with self.assertRaises(ValueError):
+            run_batch(engine, bytes(Batch().special())[:-1])
+        with self.assertRaises(ValueError):
+            run_batch(engine, OP.pack(99, 0, 0, 0, 0, 0))
+        with self.assertRaises(ValueError):
+            run_batch(engine, OP.pack(0, 255, 0, 0, 0, 0))
+
+    @number("19.3")
+    def test_socket(self):
+        async def run():
+            server = CollabServer(PaintEngine(Grid.DRAW_STYLE_ADD, 8, 8), tick=3600)
+            await server.start()
+            client = await CollabClient.connect(*server.address[:2])
+            values, frames = await client.run_batch(sample_batch())
+            local = PaintEngine(Grid.DRAW_STYLE_ADD, 8, 8)
+            result = run_batch(local, sample_batch())
+            self.assertEqual((values, frames), (result.values, result.frames))
+            self.assertEqual(server.engine.grid.snapshot(), local.grid.snapshot())
+            with self.assertRaises(ValueError):
+                await client.run_batch(OP.pack(99, 0, 0, 0, 0, 0))
+            server.broadcast()
+            self.assertEqual(await client.receive(), protocol.SNAPSHOT) #a special was run
+            self.assertEqual(client.cells, dict(local.grid.snapshot()[1]))
+            await client.close()
+            await server.close()
+        asyncio.run(run())
+
+    @number("19.4")
+    def test_results_limit(self):
+        renders = protocol.MAX_PAYLOAD // (128 * 128 * 3) + 1 #one frame too many for a 128x128 grid
+        batch = Batch().stamp(red, 0, 0, 0)
+        for _ in range(renders):
+            batch.render()
+        self.assertEqual(render_count(batch), renders)
+        with self.assertRaises(ValueError):
+            render_count(bytes(batch)[:-1])
+        async def run():
+            server = CollabServer(PaintEngine(Grid.DRAW_STYLE_SET, 128, 128), tick=3600)
+            await server.start()
+            client = await CollabClient.connect(*server.address[:2])
+            with self.assertRaises(ValueError):
+                await client.run_batch(batch)
+            self.assertEqual(server.engine.grid.snapshot()[1], {}) #nothing was run
+            self.assertEqual(server.commands, 0)
+            values, frames = await client.run_batch(Batch().stamp(red, 0, 0, 0).render())
+            self.assertEqual((values, len(frames)), ([1, 0], 1))
+            await client.close()
+            await server.close()
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from benchmarks import suite
+
+class TestBenchSuite(unittest.TestCase):
+
+    @number("21.1")
+    def test_compare(self):
+        rows = suite.compare({"a": 1.2, "b": 1.3, "c": 5.0}, {"a": 1.0, "b": 1.0}, 0.25)
+        self.assertEqual(rows, [("a", 1.0, 1.2, False), ("b", 1.0, 1.3, True), ("c", None, 5.0, False)])
+
+    @number("21.2")
+    def test_run_and_baseline(self):
+        calls = [0] #a counter rather than a list, which would grow with every timed call
+        def noop():
+            calls[0] += 1
+        suite.benchmark("test.noop")(lambda: noop)
+        try:
+            reported = []
+            results = suite.run(["test.noop"], repeat=2, report=lambda *row: reported.append(row))
+        finally:
+            del suite.BENCHMARKS["test.noop"]
+        self.assertTrue(calls[0])
+        self.assertEqual(list(results), ["test.noop"])
+        self.assertGreater(results["test.noop"], 0)
+        self.assertEqual(reported, list(results.items()))
+        self.assertIn("get_color.SetLayerStore", suite.BENCHMARKS)
+        self.assertIn("special.ADD", suite.BENCHMARKS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            self.assertEqual(suite.load_baseline(path), {})
+            suite.save_baseline(path, results)
+            self.assertEqual(suite.load_baseline(path), results)
+
+    @number("21.3")
+    def test_prepared(self):
+        state = {"fresh": 0, "stale": 0}
+        def prepare():
+            state["ready"] = True
+        def work():
+            state["fresh" if state.pop("ready", False) else "stale"] += 1
+        suite.benchmark("test.prepared")(lambda: (work, prepare))
+        try:
+            results = suite.run(["test.prepared"], repeat=2)
+        finally:
+            del suite.BENCHMARKS["test.prepared"]
+        self.assertGreater(results["test.prepared"], 0)
+        self.assertGreater(state["fresh"], 0)
+        self.assertEqual(state["stale"], 0) #every call came after its own prepare()
+
+if __name__ == '__main__':
+    unittest.main()
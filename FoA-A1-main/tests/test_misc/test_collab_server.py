@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+from ed_utils.decorators import number
+
+import protocol
+from collab_server import CollabServer, CollabClient, _Client
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue, black
+
+class _Transport:
+    def __init__(self):
+        self.size = 0
+
+    def get_write_buffer_size(self):
+        return self.size
+
+class _Writer:
+    """Collects written messages, with a settable amount of unsent data."""
+
+    def __init__(self):
+        self.transport = _Transport()
+        self.messages = []
+
+    def write(self, data):
+        self.messages.append(data)
+
+    def is_closing(self):
+        return False
+
+class TestCollabServer(unittest.TestCase):
+
+    @number("18.1")
+    def test_protocol(self):
+        cells = [((0, 0), ((red.index, blue.index), False)), ((300, 2), ((), True))]
+        message = protocol.encode_cells(protocol.DELTA, 7, cells)
+        length, kind = protocol.HEADER.unpack_from(message)
+        self.assertEqual((length, kind), (len(message) - protocol.HEADER.size, protocol.DELTA))
+        self.assertEqual(protocol.decode_cells(message[protocol.HEADER.size:]), (7, cells))
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode_cells(message[protocol.HEADER.size:-1])
+        self.assertEqual(protocol.decode_welcome(protocol.encode_welcome(Grid.DRAW_STYLE_ADD, 5, 6)[5:]),
+                         (Grid.DRAW_STYLE_ADD, 5, 6))
+
+    @number("18.2")
+    def test_clients(self):
+        async def run():
+            server = CollabServer(PaintEngine(Grid.DRAW_STYLE_SEQUENCE, 10, 10), tick=3600)
+            server.apply(protocol.PAINT, protocol.PAINT_BODY.pack(black.index, 5, 5, 0))
+            await server.start()
+            host, port = server.address[:2]
+            a = await CollabClient.connect(host, port)
+            b = await CollabClient.connect(host, port)
+            self.assertEqual(b.cells, {(5, 5): ((black.index,), False)})
+            a.paint(red, 2, 2, 1)
+            a.paint(blue, 2, 2, 1)
+            b.undo()
+            await a.drain()
+            await b.drain()
+            while server.commands < 4:
+                await asyncio.sleep(0.01)
+            server.broadcast()
+            expected = dict(server.engine.grid.snapshot()[1])
+            for client in (a, b):
+                self.assertEqual(await client.receive(), protocol.DELTA)
+                self.assertEqual(client.cells, expected)
+            a.special()
+            await a.drain()
+            while server.commands < 5:
+                await asyncio.sleep(0.01)
+            server.broadcast()
+            self.assertEqual(await b.receive(), protocol.SNAPSHOT)
+            self.assertEqual(b.cells, dict(server.engine.grid.snapshot()[1]))
+            await a.close()
+            await b.close()
+            await server.close()
+        asyncio.run(run())
+
+    @number("18.3")
+    def test_coalesce(self):
+        server = CollabServer(PaintEngine(Grid.DRAW_STYLE_ADD, 8, 8))
+        client = _Client(_Writer())
+        server.clients.append(client)
+        for layer in (red, blue, red):
+            server.apply(protocol.PAINT, protocol.PAINT_BODY.pack(layer.index, 3, 3, 0))
+        server.apply(protocol.UNDO)
+        server.broadcast()
+        server.broadcast() #nothing changed, nothing sent
+        self.assertEqual(len(client.writer.messages), 1)
+        tick, cells = protocol.decode_cells(client.writer.messages[0][protocol.HEADER.size:])
+        self.assertEqual((tick, cells), (1, [((3, 3), server.engine.grid[3][3].stack_state())]))
+        self.assertEqual(len(cells[0][1][0]), 2)
+        with self.assertRaises(protocol.ProtocolError):
+            server.apply(99)
+
+    @number("18.4")
+    def test_back_pressure(self):
+        server = CollabServer(PaintEngine(Grid.DRAW_STYLE_SET, 8, 8), high_water=100)
+        fast, slow = _Client(_Writer()), _Client(_Writer())
+        server.clients += [fast, slow]
+        slow.writer.transport.size = 1000
+        for x in range(4):
+            server.apply(protocol.PAINT, protocol.PAINT_BODY.pack(red.index, x, 0, 0))
+            server.broadcast()
+        self.assertEqual(len(fast.writer.messages), 4)
+        self.assertEqual(slow.writer.messages, [])
+        self.assertEqual(list(slow.pending), [(x, 0) for x in range(4)])
+        # Still above half the high water mark: keep waiting.
+        slow.writer.transport.size = 60
+        server.apply(protocol.PAINT, protocol.PAINT_BODY.pack(blue.index, 0, 0, 0))
+        server.broadcast()
+        self.assertEqual(slow.writer.messages, [])
+        slow.writer.transport.size = 0
+        server.broadcast()
+        self.assertEqual(len(slow.writer.messages), 1)
+        _, cells = protocol.decode_cells(slow.writer.messages[0][protocol.HEADER.size:])
+        self.assertEqual(dict(cells), {(0, 0): ((blue.index,), False), **{(x, 0): ((red.index,), False) for x in range(1, 4)}})
+        self.assertFalse(slow.behind)
+        self.assertEqual(server.catch_ups, 1)
+        # A special while behind owes a snapshot instead.
+        slow.writer.transport.size = 1000
+        server.apply(protocol.SPECIAL)
+        server.broadcast()
+        slow.writer.transport.size = 0
+        server.broadcast()
+        self.assertEqual(protocol.HEADER.unpack_from(slow.writer.messages[-1])[1], protocol.SNAPSHOT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import threading
+import unittest
+from ed_utils.decorators import number
+
+from command_queue import CommandQueue, CommandProxy
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue
+
+class TestCommandQueue(unittest.TestCase):
+
+    @number("17.1")
+    def test_batch(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 6, 6)
+        proxy = CommandProxy(engine.commands, engine)
+        first = proxy.on_paint(red, 1, 1)
+        proxy.on_paint(blue, 4, 4)
+        proxy.on_undo()
+        # Nothing happens until the owning thread drains the queue.
+        self.assertFalse(first.done())
+        self.assertEqual(engine.grid[1][1].stack_state(), ((), False))
+        self.assertEqual(engine.apply_commands(), 3)
+        self.assertTrue(first.done())
+        self.assertEqual(engine.grid[1][1].stack_state(), ((red.index,), False))
+        self.assertEqual(engine.grid[4][4].stack_state(), ((), False))
+        self.assertEqual(proxy.grid, engine.grid)
+
+    @number("17.2")
+    def test_errors(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 3, 3)
+        bad = engine.commands.submit("on_paint", red)
+        good = engine.commands.submit("on_paint", red, 0, 0)
+        engine.apply_commands()
+        self.assertIsInstance(bad.exception(), TypeError)
+        self.assertIsNone(good.result())
+
+    @number("17.3")
+    def test_threads(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_ADD, 8, 8)
+        engine.grid.brush_size = 0
+        queue = CommandQueue(maxsize=16)
+        proxy = CommandProxy(queue, engine)
+        done = threading.Event()
+        def client(x):
+            for y in range(8):
+                proxy.on_paint(red, x, y)
+        threads = [threading.Thread(target=client, args=(x,)) for x in range(8)]
+        for t in threads:
+            t.start()
+        def wait():
+            for t in threads:
+                t.join()
+            done.set()
+        threading.Thread(target=wait).start()
+        while not done.is_set() or len(queue):
+            self.assertLessEqual(len(queue), 16) # submitters block instead of growing the queue
+            queue.drain(engine)
+        self.assertEqual(queue.applied, 64)
+        for x in range(8):
+            for y in range(8):
+                self.assertEqual(engine.grid[x][y].stack_state(), ((red.index,), False))
@@ -0,0 +1,121 @@
+import subprocess
+import sys
+import unittest
+from ed_utils.decorators import number
+
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue, black, invert
+
+def layer_sets(engine):
+    # Undoing an erase puts the layer back on top, so compare layers regardless of order.
+    return {square: (sorted(layers), inverted) for square, (layers, inverted) in engine.grid.snapshot()[1].items()}
+
+class TestEngine(unittest.TestCase):
+
+    @number("11.1")
+    def test_no_arcade(self):
+        # A fresh interpreter, since another test may already have imported arcade.
+        out = subprocess.run(
+            [sys.executable, "-c", "import sys, engine, main, grid_renderer, virtual_clock, visuals.complex; print('arcade' in sys.modules)"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        self.assertEqual(out, "False")
+
+    @number("11.2")
+    def test_paint_undo_redo(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 5, 5)
+        engine.on_paint(red, 2, 2)
+        self.assertEqual(engine.grid[2][2].get_color((0, 0, 0), 0, 2, 2), (255, 0, 0))
+        self.assertEqual(engine.grid[0][0].get_color((0, 0, 0), 0, 0, 0), (0, 0, 0))
+        engine.on_undo()
+        self.assertEqual(engine.grid[2][2].get_color((0, 0, 0), 0, 2, 2), (0, 0, 0))
+        engine.on_redo()
+        self.assertEqual(engine.grid[2][2].get_color((0, 0, 0), 0, 2, 2), (255, 0, 0))
+
+    @number("11.3")
+    def test_render(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 4, 3)
+        pixels = engine.render()
+        self.assertEqual(pixels.get_pixel(3, 2), tuple(PaintEngine.BG))
+        engine.on_paint(black, 0, 0)
+        engine.on_special()
+        pixels = engine.render()
+        self.assertEqual(pixels.get_pixel(0, 0), (255, 255, 255))
+        self.assertEqual(pixels.get_pixel(3, 2), (0, 0, 0))
+
+    @number("11.4")
+    def test_replay_and_reset(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_ADD, 4, 4)
+        engine.on_paint(red, 1, 1)
+        engine.on_paint(invert, 1, 1)
+        expected = engine.grid[1][1].get_color((0, 0, 0), 0, 1, 1)
+        engine.start_replay()
+        self.assertEqual(engine.grid[1][1].get_color((0, 0, 0), 0, 1, 1), (0, 0, 0))
+        while not engine.on_replay_next_step():
+            pass
+        self.assertEqual(engine.grid[1][1].get_color((0, 0, 0), 0, 1, 1), expected)
+        engine.reset(Grid.DRAW_STYLE_SEQUENCE)
+        self.assertEqual(engine.grid.draw_style, Grid.DRAW_STYLE_SEQUENCE)
+        self.assertTrue(engine.on_replay_next_step())
+
+    @number("11.5")
+    def test_erase(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 5, 5)
+            engine.grid.brush_size = 1
+            engine.on_paint(red, 2, 2)
+            engine.on_paint(black, 3, 2)
+            painted = layer_sets(engine)
+            engine.on_erase(red, 2, 2)
+            # Only squares holding red lose it.
+            self.assertNotIn(red.index, engine.grid[2][2].stack_state()[0])
+            self.assertIn(black.index, engine.grid[3][2].stack_state()[0])
+            self.assertEqual(engine.grid[2][1].stack_state(), ((), False))
+            engine.on_undo()
+            self.assertEqual(layer_sets(engine), painted)
+            engine.on_redo()
+            erased = engine.grid.snapshot()
+            engine.start_replay()
+            while not engine.on_replay_next_step():
+                pass
+            self.assertEqual(engine.grid.snapshot(), erased)
+
+    @number("11.6")
+    def test_update_order(self):
+        calls = []
+        class Recording(PaintEngine):
+            def update_input(self, delta_time):
+                calls.append("input")
+            def on_replay_next_step(self):
+                calls.append("replay")
+                return PaintEngine.on_replay_next_step(self)
+        engine = Recording(Grid.DRAW_STYLE_SET, 3, 3)
+        engine.on_paint(red, 1, 1)
+        engine.start_replay()
+        engine.on_update(engine.REPLAY_TIMER_DELTA)
+        # Held keys act before the replay step, as they did in MyWindow.on_update.
+        self.assertEqual(calls, ["input", "replay"])
+
+    @number("11.7")
+    def test_erase_undo_exact(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = PaintEngine(style, 4, 4)
+            engine.grid.brush_size = 0
+            engine.on_paint(red, 1, 1)
+            engine.on_paint(blue, 1, 1)
+            engine.on_paint(red, 1, 1)
+            if style == Grid.DRAW_STYLE_SET:
+                engine.on_paint(blue, 1, 1)
+                engine.on_special() #erasing and undoing keep the inversion
+            before = engine.grid[1][1].stack_state()
+            engine.on_erase(blue, 1, 1)
+            # Blue goes, whichever layer the store's own erase would remove.
+            erased = engine.grid[1][1].stack_state()
+            self.assertNotIn(blue.index, erased[0])
+            engine.on_undo()
+            self.assertEqual(engine.grid[1][1].stack_state(), before)
+            engine.on_redo()
+            self.assertEqual(engine.grid[1][1].stack_state(), erased)
+            engine.on_undo()
+            self.assertEqual(engine.grid[1][1].stack_state(), before)
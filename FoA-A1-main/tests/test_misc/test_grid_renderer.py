@@ -0,0 +1,85 @@
+import unittest
+from ed_utils.decorators import number
+
+from grid import Grid
+from grid_renderer import GridPixelBuffer, merge_runs
+from layer_util import pack_color
+from layers import black, red, rainbow
+
+class TestGridPixelBuffer(unittest.TestCase):
+
+    @number("9.1")
+    def test_pixels(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 7, 5)
+        grid[1][2].add(red)
+        grid[6][4].add(rainbow)
+        grid[6][4].add(black)
+        grid[0][0].add(rainbow)
+        buffer = GridPixelBuffer(7, 5)
+        self.assertTrue(buffer.update(grid, pack_color((255, 255, 255)), 3))
+        colors = grid.render((255, 255, 255), 3)
+        for x in range(7):
+            for y in range(5):
+                self.assertEqual(buffer.get_pixel(x, y), colors[x][y])
+        self.assertEqual(buffer.take_dirty(), (0, 0, 7, 5))
+        self.assertEqual(len(buffer.region((0, 0, 7, 5))), 7 * 5 * 3)
+
+    @number("9.2")
+    def test_dirty(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 8, 8)
+        buffer = GridPixelBuffer(8, 8)
+        buffer.update(grid, 0xFFFFFF, 0)
+        buffer.take_dirty()
+        # Nothing changed.
+        self.assertFalse(buffer.update(grid, 0xFFFFFF, 1))
+        self.assertIsNone(buffer.take_dirty())
+        grid[2][3].add(black)
+        grid[4][6].add(red)
+        self.assertTrue(buffer.update(grid, 0xFFFFFF, 2))
+        dirty = buffer.take_dirty()
+        self.assertEqual(dirty, (2, 3, 5, 7))
+        region = buffer.region(dirty)
+        self.assertEqual(len(region), 3 * 4 * 3)
+        self.assertEqual(tuple(region[0:3]), (0, 0, 0)) # (2, 3), bottom left of the region
+        self.assertEqual(tuple(region[-3:]), (255, 0, 0)) # (4, 6), top right
+
+    @number("9.3")
+    def test_mismatch(self):
+        with self.assertRaises(ValueError):
+            GridPixelBuffer(4, 4).update(Grid(Grid.DRAW_STYLE_SET, 4, 5), 0, 0)
+
+class TestMergeRuns(unittest.TestCase):
+
+    def assertCovers(self, rects, colors, width, height):
+        seen = [0] * (width * height)
+        for x0, y0, x1, y1, color in rects:
+            for x in range(x0, x1):
+                for y in range(y0, y1):
+                    seen[y * width + x] += 1
+                    self.assertEqual(colors[y * width + x], color)
+        self.assertEqual(seen, [1] * (width * height))
+
+    @number("9.4")
+    def test_flat(self):
+        self.assertEqual(merge_runs([5] * 12, 4, 3), [(0, 0, 4, 3, 5)])
+
+    @number("9.5")
+    def test_painted(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 16, 16)
+        for x in range(3, 9):
+            for y in range(2, 12):
+                grid[x][y].add(black)
+        grid[10][10].add(rainbow)
+        grid[11][10].add(red)
+        buffer = GridPixelBuffer(16, 16)
+        buffer.update(grid, 0xFFFFFF, 0)
+        rects = merge_runs(buffer.colors, 16, 16)
+        self.assertCovers(rects, buffer.colors, 16, 16)
+        self.assertEqual(len(rects), 10)
+
+    @number("9.6")
+    def test_checkerboard(self):
+        colors = [(x + y) % 2 for y in range(5) for x in range(6)]
+        rects = merge_runs(colors, 6, 5)
+        self.assertCovers(rects, colors, 6, 5)
+        self.assertEqual(len(rects), 30)
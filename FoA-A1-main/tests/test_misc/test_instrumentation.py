@@ -0,0 +1,57 @@
+import unittest
+from ed_utils.decorators import number
+
+import instrumentation
+from engine import PaintEngine
+from grid import Grid
+from layer_store import LayerStack
+from layers import black, rainbow
+from undo import UndoTracker
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        instrumentation.disable()
+
+    @number("24.1")
+    def test_zero_cost_when_disabled(self):
+        originals = (PaintEngine.on_paint, PaintEngine.render, LayerStack.get_color_packed,
+                     UndoTracker.add_action, rainbow.apply, rainbow.apply_packed)
+        self.assertIsNone(instrumentation.enabled())
+        stats = instrumentation.enable()
+        self.assertIs(instrumentation.enable(), stats)
+        self.assertIsNot(PaintEngine.on_paint, originals[0])
+        self.assertIs(instrumentation.disable(), stats)
+        self.assertEqual((PaintEngine.on_paint, PaintEngine.render, LayerStack.get_color_packed,
+                          UndoTracker.add_action, rainbow.apply, rainbow.apply_packed), originals)
+        self.assertIsNone(instrumentation.disable())
+
+    @number("24.2")
+    def test_counters(self):
+        with self.assertRaises(ValueError):
+            instrumentation.HotPathStats(0)
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 4, 4)
+        engine.grid.brush_size = 0
+        stats = instrumentation.enable()
+        engine.on_update(0.1)
+        engine.on_paint(rainbow, 1, 1)
+        engine.on_paint(black, 2, 2)
+        engine.render()
+        engine.on_update(0.1)
+        engine.on_undo()
+        engine.on_update(0.1)
+        self.assertEqual(stats.frame_count, 3) #the empty frame before the first on_update, and two more
+        first, second = list(stats.frames)[1:]
+        self.assertEqual(first.counters["paint"], 2)
+        self.assertEqual(first.counters["history"], 4) #each paint goes on the undo and replay trackers
+        self.assertEqual(first.counters["cells"], 3) #one rainbow square, then the shared black and empty stacks
+        self.assertEqual(first.counters["apply.rainbow"], 1)
+        self.assertEqual(second.counters["undo"], 1)
+        self.assertGreater(first.timings["paint"], 0)
+        summary = stats.summary(2)
+        self.assertEqual(summary["counters"]["paint"], {"mean": 1, "max": 2})
+        self.assertIn("render", summary["timings"])
+        self.assertIn("apply.rainbow", stats.report())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from ed_utils.decorators import number
+
+from engine import PaintEngine
+from grid import Grid
+from grid_renderer import GridPixelBuffer
+from layers import red, blue
+from offline_render import render_frames, render_replay, write_frame, write_png, write_ppm
+
+def read_png(data):
+    """Returns (width, height, rows) of an unfiltered RGB PNG."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, idat = 8, b""
+    while pos < len(data):
+        length, = struct.unpack(">I", data[pos:pos + 4])
+        kind, body = data[pos + 4:pos + 8], data[pos + 8:pos + 8 + length]
+        if kind == b"IHDR":
+            width, height = struct.unpack(">II", body[:8])
+        elif kind == b"IDAT":
+            idat += body
+        pos += length + 12
+    raw = zlib.decompress(idat)
+    stride = width * 3 + 1
+    return width, height, [raw[i * stride + 1:(i + 1) * stride] for i in range(height)]
+
+class TestOfflineRender(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = GridPixelBuffer(2, 2)
+        grid = Grid(Grid.DRAW_STYLE_SET, 2, 2)
+        grid[0][1].add(red) # top left
+        self.buffer.update(grid, 0xFFFFFF, 0)
+
+    @number("12.1")
+    def test_ppm(self):
+        out = io.BytesIO()
+        write_ppm(out, self.buffer)
+        self.assertEqual(out.getvalue(), b"P6\n2 2\n255\n" + bytes([255, 0, 0] + [255] * 9))
+
+    @number("12.2")
+    def test_png_scaled(self):
+        out = io.BytesIO()
+        write_png(out, self.buffer, scale=2)
+        width, height, rows = read_png(out.getvalue())
+        self.assertEqual((width, height), (4, 4))
+        self.assertEqual(rows[0], bytes([255, 0, 0] * 2 + [255] * 6))
+        self.assertEqual(rows[1], rows[0])
+        self.assertEqual(rows[3], bytes([255] * 12))
+
+    @number("12.3")
+    def test_bad_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                write_frame(os.path.join(directory, "frame.bmp"), self.buffer)
+
+    @number("12.4")
+    def test_frames(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 3, 3)
+        with tempfile.TemporaryDirectory() as directory:
+            pattern = os.path.join(directory, "sub", "{:02d}.ppm")
+            paths = list(render_frames(grid, [0, 1, 2], pattern))
+            self.assertEqual(paths, [pattern.format(i) for i in range(3)])
+            for path in paths:
+                self.assertTrue(os.path.exists(path))
+
+    @number("12.5")
+    def test_replay(self):
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 4, 4)
+        engine.on_paint(red, 0, 0)
+        engine.on_paint(blue, 3, 3)
+        engine.on_undo()
+        with tempfile.TemporaryDirectory() as directory:
+            paths = list(render_replay(engine, os.path.join(directory, "{}.png"), every=1))
+            # One frame per action, the last showing the undone blue.
+            self.assertEqual(len(paths), 3)
+            with open(paths[1], "rb") as f:
+                _, _, rows = read_png(f.read())
+            self.assertEqual(rows[0][9:12], bytes([0, 0, 255]))
+            with open(paths[2], "rb") as f:
+                _, _, rows = read_png(f.read())
+            self.assertEqual(rows[0][9:12], bytes([255, 255, 255]))
+            self.assertEqual(rows[3][0:3], bytes([255, 0, 0]))
@@ -0,0 +1,65 @@
+import os
+import pickle
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue, rainbow, sparkle, invert
+from offline_render import render_replay
+from parallel_render import render_replay_parallel
+
+def painted_engine(style):
+    engine = PaintEngine(style, 8, 8)
+    engine.on_paint(red, 1, 1)
+    engine.on_paint(rainbow, 5, 5)
+    engine.on_special()
+    engine.on_paint(sparkle, 3, 6)
+    engine.on_undo()
+    engine.on_paint(invert, 6, 2)
+    engine.on_paint(blue, 0, 7)
+    return engine
+
+class TestParallelRender(unittest.TestCase):
+
+    @number("13.1")
+    def test_pickle_layer(self):
+        self.assertIs(pickle.loads(pickle.dumps(rainbow)), rainbow)
+
+    @number("13.2")
+    def test_snapshot_restore(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            grid = painted_engine(style).grid
+            snapshot = pickle.loads(pickle.dumps(grid.snapshot()))
+            copy = Grid(Grid.DRAW_STYLE_SET, 8, 8)
+            copy.restore(snapshot)
+            self.assertEqual(copy.draw_style, style)
+            for x in range(8):
+                for y in range(8):
+                    self.assertEqual(copy[x][y].stack_state(), grid[x][y].stack_state())
+
+    @number("13.3")
+    def test_pending(self):
+        engine = painted_engine(Grid.DRAW_STYLE_SET)
+        pending = engine.ReplayTracker.pending()
+        self.assertEqual(len(pending), 7)
+        self.assertTrue(pending[4][1]) # the undo
+        self.assertEqual(len(engine.ReplayTracker.pending()), 7)
+
+    @number("13.4")
+    def test_matches_serial(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            with tempfile.TemporaryDirectory() as directory:
+                serial = painted_engine(style)
+                parallel = painted_engine(style)
+                times = [0, 0.5, 3]
+                a = list(render_replay(serial, os.path.join(directory, "a{}.ppm"), times, every=2))
+                b = list(render_replay_parallel(parallel, os.path.join(directory, "b{}.ppm"), times, every=2,
+                                                workers=2, segment_frames=1))
+                self.assertEqual(len(a), 4)
+                self.assertEqual(len(b), 4)
+                for path_a, path_b in zip(a, b):
+                    with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+                        self.assertEqual(fa.read(), fb.read())
+                self.assertEqual(parallel.grid.snapshot(), serial.grid.snapshot())
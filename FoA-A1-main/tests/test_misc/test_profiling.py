@@ -0,0 +1,65 @@
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from ed_utils.decorators import number
+
+import profiling
+from engine import PaintEngine
+from grid import Grid
+from layers import black
+
+class TestProfiling(unittest.TestCase):
+
+    @number("26.1")
+    def test_subsystems(self):
+        self.assertEqual(profiling.subsystem(profiling.__file__.replace("profiling.py", "layer_store.py")), "grid stores")
+        self.assertEqual(profiling.subsystem(os.path.join(profiling.DATA_STRUCTURES, "queue_adt.py")), "data structures")
+        self.assertIsNone(profiling.subsystem(profiling.__file__))
+        for name, group in (("engine.py", "engine"), ("batch.py", "engine"), ("command_queue.py", "engine"),
+                            ("autosave.py", "persistence"), ("paint_file.py", "persistence")):
+            self.assertEqual(profiling.subsystem(os.path.join(profiling.ROOT, name)), group)
+        # Every module a group names is in the tree.
+        for names in profiling.SUBSYSTEMS.values():
+            for name in names:
+                self.assertTrue(os.path.isfile(os.path.join(profiling.ROOT, name)), name)
+        # Another test runner may be tracing with shallow tracebacks, trace deeply while this runs.
+        limit = tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None
+        tracemalloc.stop()
+        tracemalloc.start(profiling.FRAMES)
+        try:
+            engine = PaintEngine(Grid.DRAW_STYLE_ADD, 16, 16) #a CircularQueue per square
+            engine.on_paint(black, 8, 8)
+            totals = profiling.memory_by_subsystem(tracemalloc.take_snapshot())
+        finally:
+            tracemalloc.stop()
+            if limit is not None:
+                tracemalloc.start(limit)
+        self.assertEqual(totals.most_common(1)[0][0], "grid stores")
+        self.assertGreater(totals["history"], 0)
+
+    @number("26.2")
+    def test_profiled(self):
+        with tempfile.TemporaryDirectory() as folder:
+            profile, snapshot = os.path.join(folder, "session.prof"), os.path.join(folder, "session.snapshot")
+            out = StringIO()
+            with redirect_stdout(out), profiling.profiled(profile, snapshot):
+                engine = PaintEngine(Grid.DRAW_STYLE_SET, 8, 8)
+                for _ in range(20):
+                    engine.on_paint(black, 4, 4)
+                    engine.on_undo()
+            stats = pstats.Stats(profile)
+            self.assertTrue(any(func == "on_paint" for _, _, func in stats.stats))
+            self.assertGreater(profiling.time_by_subsystem(stats)["grid stores"], 0)
+            self.assertGreater(len(tracemalloc.Snapshot.load(snapshot).traces), 0)
+            self.assertIn("grid stores", out.getvalue())
+            self.assertIn("history", out.getvalue())
+            self.assertGreater(profiling.time_by_subsystem(stats)["engine"], 0)
+        with profiling.profiled(): #nothing to do
+            pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+from ed_utils.decorators import number
+
+import protocol
+from engine import PaintEngine
+from grid import Grid
+from layers import red, blue, black, invert
+from replay_broadcast import ReplayBroadcast, ReplayServer, ReplayViewer
+
+def recorded_engine(style):
+    engine = PaintEngine(style, 7, 6)
+    for i in range(12):
+        engine.on_paint((red, blue, black)[i % 3], i % 7, i % 6)
+    engine.on_undo()
+    engine.on_special()
+    engine.on_paint(invert, 3, 3)
+    engine.on_undo()
+    engine.on_redo()
+    return engine
+
+def states_after(engine, played):
+    scratch = PaintEngine(engine.grid.draw_style, engine.grid.x, engine.grid.y)
+    for action, undo in engine.ReplayTracker.pending()[:played]:
+        if undo:
+            action.undo_apply(scratch.grid)
+        else:
+            action.redo_apply(scratch.grid)
+    return dict(scratch.grid.snapshot()[1])
+
+def split(data):
+    """The (kind, payload) messages in a byte string."""
+    messages = []
+    p = 0
+    while p < len(data):
+        length, kind = protocol.HEADER.unpack_from(data, p)
+        p += protocol.HEADER.size
+        messages.append((kind, data[p:p + length]))
+        p += length
+    return messages
+
+class TestReplayBroadcast(unittest.TestCase):
+
+    @number("20.1")
+    def test_seek(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            engine = recorded_engine(style)
+            before = engine.grid.snapshot()
+            broadcast = ReplayBroadcast(engine, keyframe_every=4)
+            self.assertEqual(engine.grid.snapshot(), before)
+            self.assertEqual(len(broadcast), 17)
+            self.assertEqual(len(broadcast.keyframes), 5)
+            for played in range(len(broadcast) + 1):
+                viewer = ReplayViewer(None, None)
+                viewer.width, viewer.height = 7, 6
+                for kind, payload in split(broadcast.seek(played)):
+                    viewer.apply(kind, payload)
+                self.assertEqual(viewer.tick, played)
+                self.assertEqual(viewer.cells, states_after(engine, played))
+            with self.assertRaises(IndexError):
+                broadcast.seek(18)
+
+    @number("20.2")
+    def test_viewers(self):
+        engine = recorded_engine(Grid.DRAW_STYLE_ADD)
+        broadcast = ReplayBroadcast(engine, keyframe_every=5)
+        final = states_after(engine, len(broadcast))
+
+        async def run():
+            server = ReplayServer(broadcast)
+            await server.start()
+            viewers = [await ReplayViewer.connect(*server.address[:2]) for _ in range(3)]
+            for viewer, (rate, start) in zip(viewers, ((0, 0), (200, 9), (0, 100))):
+                viewer.subscribe(rate, start)
+            await asyncio.gather(*(viewer.watch() for viewer in viewers))
+            for viewer in viewers:
+                self.assertEqual(viewer.tick, len(broadcast))
+                self.assertEqual(viewer.cells, final)
+                await viewer.close()
+            await server.close()
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from grid import Grid
+from layer_store import SetLayerStore, AdditiveLayerStore, SequenceLayerStore
+from layers import red, black
+from replay import ReplayTracker
+from undo import UndoTracker
+
+class TestReset(unittest.TestCase):
+
+    @number("10.1")
+    def test_grid_reset(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 4, 4)
+        set_store = grid[1][1]
+        grid[1][1].add(red)
+        grid.special()
+        grid.increase_brush_size()
+        grid.reset()
+        self.assertIs(grid[1][1], set_store)
+        self.assertEqual(grid.brush_size, Grid.DEFAULT_BRUSH_SIZE)
+        for x in range(4):
+            for y in range(4):
+                self.assertEqual(grid[x][y].get_color((1, 2, 3), 0, x, y), (1, 2, 3))
+
+    @number("10.2")
+    def test_grid_switch_style(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 3, 3)
+        set_store = grid[0][0]
+        grid[0][0].add(black)
+        grid.reset(Grid.DRAW_STYLE_ADD)
+        self.assertIsInstance(grid[0][0], AdditiveLayerStore)
+        grid[0][0].add(red)
+        grid.reset(Grid.DRAW_STYLE_SEQUENCE)
+        self.assertIsInstance(grid[2][2], SequenceLayerStore)
+        grid.reset(Grid.DRAW_STYLE_SET)
+        # The SET stores are reused, and cleared.
+        self.assertIs(grid[0][0], set_store)
+        self.assertEqual(grid[0][0].get_color((1, 2, 3), 0, 0, 0), (1, 2, 3))
+        self.assertEqual(grid.draw_style, Grid.DRAW_STYLE_SET)
+
+    @number("10.3")
+    def test_tracker_clear(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 3, 3)
+        undo = UndoTracker()
+        replay = ReplayTracker()
+        action = PaintAction([PaintStep((1, 1), red)])
+        undo.add_action(action)
+        replay.add_action(action)
+        undo.undo(grid)
+        undo.clear()
+        replay.clear()
+        self.assertIsNone(undo.undo(grid))
+        self.assertIsNone(undo.redo(grid))
+        self.assertTrue(replay.play_next_action(grid))
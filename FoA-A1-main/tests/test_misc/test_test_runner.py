@@ -0,0 +1,92 @@
+import json
+import re
+import time
+import unittest
+from io import StringIO
+from ed_utils.decorators import number, time_budget, InvalidValueException
+from ed_utils.json_test_runner import JSONTestRunner
+from ed_utils.parallel_runner import iter_tests, run_parallel, shard
+
+FIXTURE = "tests.test_misc.runner_fixture" #5 passing tests in 3 classes, owned by these tests
+
+def sample_tests():
+    # Defined here so test discovery doesn't pick the sample tests up.
+    class Sample(unittest.TestCase):
+
+        @number("0.1")
+        @time_budget(5)
+        def test_quick(self):
+            self.data = bytearray(200000)
+
+        @number("0.2")
+        @time_budget(0.01)
+        def test_slow(self):
+            time.sleep(0.05)
+
+    return Sample
+
+class TestTestRunner(unittest.TestCase):
+
+    @number("22.1")
+    def test_time_budget(self):
+        with self.assertRaises(InvalidValueException):
+            time_budget(0)
+        sample = sample_tests()
+        result = unittest.TestResult()
+        unittest.defaultTestLoader.loadTestsFromTestCase(sample).run(result)
+        self.assertEqual(result.testsRun, 2)
+        self.assertEqual(len(result.failures), 1)
+        self.assertIn("over its time budget", result.failures[0][1])
+        self.assertEqual(sample.test_slow.__number__, "0.2")
+
+    @number("22.2")
+    def test_json_timings(self):
+        stream = StringIO()
+        JSONTestRunner(stream=stream, slowest=1).run(unittest.defaultTestLoader.loadTestsFromTestCase(sample_tests()))
+        data = json.loads(stream.getvalue())
+        quick, slow = data["testcases"]
+        self.assertTrue(quick["passed"])
+        self.assertFalse(slow["passed"])
+        self.assertEqual((quick["time_budget"], slow["time_budget"]), (5, 0.01))
+        self.assertGreaterEqual(slow["time"], 0.05)
+        self.assertGreaterEqual(quick["peak_memory"], 200000)
+        self.assertEqual(len(data["slowest"]), 1)
+        self.assertTrue(data["slowest"][0]["name"].endswith("test_slow"))
+
+    @number("22.3")
+    def test_shard(self):
+        tests = list(iter_tests(unittest.defaultTestLoader.loadTestsFromNames(
+            [FIXTURE, "tests.test_misc.test_test_runner"])))
+        ids = [test.id() for test in tests]
+        for workers in (1, 2, 5):
+            shards = shard(tests, workers)
+            self.assertLessEqual(len(shards), workers)
+            self.assertEqual(sorted(sum(shards, [])), sorted(ids))
+            for ids_of_shard in shards: #a class is never split
+                classes = [test_id.rsplit(".", 1)[0] for test_id in ids_of_shard]
+                self.assertEqual(len(set(classes)), len([c for i, c in enumerate(classes) if i == 0 or classes[i - 1] != c]))
+        self.assertEqual(shard(tests, 3), shard(tests, 3))
+
+    @number("22.4")
+    def test_parallel_same_output(self):
+        def run(workers, for_ed):
+            stream = StringIO()
+            suite = unittest.defaultTestLoader.loadTestsFromName(FIXTURE)
+            self.assertTrue(run_parallel(suite, workers, for_ed, stream=stream))
+            if for_ed:
+                cases = json.loads(stream.getvalue())["testcases"]
+                for case in cases:
+                    del case["time"], case["peak_memory"]
+                return cases
+            return re.sub(r"in [0-9.]+s", "", stream.getvalue())
+        text = run(1, False)
+        self.assertIn("Ran 5 tests", text)
+        self.assertEqual(run(3, False), text)
+        self.assertEqual(run(1, True), run(2, True))
+        self.assertEqual(len(run(1, True)), 5)
+        stream = StringIO()
+        run_parallel(unittest.defaultTestLoader.loadTestsFromName(FIXTURE), 2, slowest=1, stream=stream)
+        self.assertIn("Slowest 1 tests:", stream.getvalue()) #the report goes to the stream too, not stdout
+
+if __name__ == '__main__':
+    unittest.main()
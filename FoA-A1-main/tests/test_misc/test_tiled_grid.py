@@ -0,0 +1,97 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from engine import PaintEngine
+from grid import Grid
+from layer_util import get_layers
+from tiled_grid import TiledGrid
+
+def session(engine, seed):
+    rng = random.Random(seed)
+    layers = [layer for layer in get_layers() if layer is not None]
+    for i in range(60):
+        choice = rng.random()
+        if choice < 0.1:
+            engine.on_special()
+        elif choice < 0.25:
+            engine.on_undo()
+        elif choice < 0.35:
+            engine.on_redo()
+        else:
+            engine.on_paint(rng.choice(layers), rng.randrange(engine.grid.x), rng.randrange(engine.grid.y))
+
+class TestTiledGrid(unittest.TestCase):
+
+    def assertSameGrid(self, tiled, grid):
+        for x in range(grid.x):
+            for y in range(grid.y):
+                self.assertEqual(tiled[x][y].get_color((10, 20, 30), 1, x, y), grid[x][y].get_color((10, 20, 30), 1, x, y))
+        self.assertEqual(tiled.snapshot(), grid.snapshot())
+
+    @number("16.1")
+    def test_matches_grid(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            tiled = TiledGrid(style, 11, 9, tile_size=4, cache_tiles=2, depth=2)
+            expected = PaintEngine(style, 11, 9)
+            engine = PaintEngine(style, grid=tiled)
+            session(expected, 1)
+            session(engine, 1)
+            self.assertLessEqual(len(tiled.cache), 2)
+            self.assertSameGrid(tiled, expected.grid)
+            # Replay through the tiles as well.
+            engine.start_replay()
+            expected.start_replay()
+            while not engine.on_replay_next_step():
+                expected.on_replay_next_step()
+            self.assertSameGrid(tiled, expected.grid)
+            tiled.close()
+
+    @number("16.2")
+    def test_overflow(self):
+        tiled = TiledGrid(Grid.DRAW_STYLE_ADD, 4, 4, tile_size=2, cache_tiles=1, depth=2)
+        layers = [layer for layer in get_layers() if layer is not None]
+        for layer in layers[:5]:
+            tiled[0][0].add(layer)
+        tiled[3][3].add(layers[0]) # evicts the tile holding (0, 0)
+        self.assertEqual(len(tiled.overflow), 1)
+        self.assertEqual(tiled[0][0].stack_state()[0], tuple(layer.index for layer in layers[:5]))
+        for _ in range(4):
+            tiled[0][0].erase(layers[0])
+        tiled[3][3].add(layers[1])
+        self.assertEqual(tiled.overflow, {})
+        self.assertEqual(tiled[0][0].stack_state()[0], (layers[4].index,))
+
+    @number("16.3")
+    def test_reset(self):
+        tiled = TiledGrid(Grid.DRAW_STYLE_SET, 8, 8, tile_size=4, cache_tiles=1)
+        tiled.special()
+        self.assertTrue(tiled[7][7].stack_state()[1])
+        self.assertTrue(tiled[0][0].stack_state()[1])
+        tiled.reset(Grid.DRAW_STYLE_SEQUENCE)
+        self.assertEqual(tiled.snapshot(), (Grid.DRAW_STYLE_SEQUENCE, {}))
+        with self.assertRaises(IndexError):
+            tiled[8]
+
+    @number("16.4")
+    def test_render_loads_each_tile_once(self):
+        tiled = TiledGrid(Grid.DRAW_STYLE_SET, 10, 9, tile_size=4, cache_tiles=2)
+        expected = PaintEngine(Grid.DRAW_STYLE_SET, 10, 9)
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, grid=tiled)
+        session(expected, 2)
+        session(engine, 2)
+        tiles = len(list(tiled._tiles()))
+        # Column by column, every column would reload the tiles it crosses.
+        loads = tiled.loads
+        pixels = engine.render(1)
+        self.assertLessEqual(tiled.loads - loads, tiles)
+        self.assertEqual(pixels.pixels, expected.render(1).pixels)
+        loads = tiled.loads
+        packed = tiled.render_packed(0x102030, 1)
+        self.assertLessEqual(tiled.loads - loads, tiles)
+        self.assertEqual(packed, expected.grid.render_packed(0x102030, 1))
+        loads = tiled.loads
+        colors = tiled.render((10, 20, 30), 1)
+        self.assertLessEqual(tiled.loads - loads, tiles)
+        self.assertEqual(colors[9][8], expected.grid.render((10, 20, 30), 1)[9][8])
+        tiled.close()
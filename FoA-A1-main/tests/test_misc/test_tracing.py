@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from ed_utils.decorators import number
+
+import instrumentation
+import tracing
+from engine import PaintEngine
+from grid import Grid
+from layers import black
+from undo import UndoTracker
+
+class TestTracing(unittest.TestCase):
+
+    def tearDown(self):
+        tracing.stop()
+        instrumentation.disable()
+
+    @number("25.1")
+    def test_ring(self):
+        with self.assertRaises(ValueError):
+            tracing.TraceRing(0)
+        ring = tracing.TraceRing(8)
+        for i in range(20):
+            ring.record("span", i, i + 1, {"i": i})
+        self.assertEqual(len(ring), 8)
+        self.assertEqual([span[4]["i"] for span in ring.spans()], list(range(12, 20))) #only the newest are kept
+        ring = tracing.TraceRing(4000)
+        def record():
+            for i in range(1000):
+                ring.record("span", i, i, {})
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(ring), 4000) #no two spans were given the same slot
+
+    @number("25.2")
+    def test_trace(self):
+        originals = (PaintEngine.on_paint, PaintEngine.render, UndoTracker.undo, Grid.special)
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 4, 4)
+        engine.grid.brush_size = 1
+        ring = tracing.start()
+        self.assertIs(tracing.start(), ring)
+        engine.on_paint(black, 0, 0)
+        engine.on_undo()
+        engine.on_special()
+        engine.start_replay()
+        while not engine.on_replay_next_step():
+            pass
+        engine.render()
+        self.assertIs(tracing.stop(), ring)
+        self.assertIsNone(tracing.active())
+        self.assertEqual((PaintEngine.on_paint, PaintEngine.render, UndoTracker.undo, Grid.special), originals)
+        events = ring.trace_events()["traceEvents"]
+        spans = [event for event in events if event["ph"] == "X"]
+        #the special replayed runs inside the third replay step
+        self.assertEqual([event["name"] for event in spans],
+                         ["on_paint", "undo", "special", "replay_step", "replay_step", "replay_step", "special", "replay_step", "render"])
+        self.assertEqual(spans[0]["args"], {"layer": "black", "x": 0, "y": 0, "brush": 1, "cells": 3})
+        self.assertEqual(spans[1]["args"], {"cells": 3})
+        self.assertTrue(all(event["dur"] >= 0 for event in spans))
+        self.assertEqual(spans, sorted(spans, key=lambda event: event["ts"]))
+        self.assertTrue(any(event["ph"] == "M" for event in events))
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "trace.json")
+            ring.dump(path)
+            with open(path) as file:
+                self.assertEqual(json.load(file)["traceEvents"], json.loads(json.dumps(events)))
+
+    @number("25.3")
+    def test_with_instrumentation(self):
+        originals = (PaintEngine.on_paint, PaintEngine.on_update, Grid.special)
+        engine = PaintEngine(Grid.DRAW_STYLE_SET, 4, 4)
+        stats = instrumentation.enable()
+        ring = tracing.start()
+        instrumentation.disable() #before tracing, though it was enabled first
+        engine.on_update(0.1)
+        engine.on_paint(black, 0, 0)
+        self.assertEqual([span[0] for span in ring.spans()], ["on_paint"])
+        self.assertEqual(stats.frame_count, 0)
+        self.assertEqual(stats.current.counters, {})
+        stats = instrumentation.enable()
+        tracing.stop()
+        engine.on_update(0.1)
+        engine.on_paint(black, 1, 1)
+        self.assertEqual(len(ring), 1)
+        self.assertEqual(stats.current.counters["paint"], 1)
+        instrumentation.disable()
+        self.assertEqual((PaintEngine.on_paint, PaintEngine.on_update, Grid.special), originals)
+
+if __name__ == '__main__':
+    unittest.main()
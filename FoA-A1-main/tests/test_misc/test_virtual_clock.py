@@ -0,0 +1,50 @@
+import unittest
+from ed_utils.decorators import number
+
+from engine import PaintEngine
+from grid import Grid
+from layers import black, rainbow
+from virtual_clock import VirtualClock, frame_hash, load_script
+
+class TestVirtualClock(unittest.TestCase):
+
+    @number("23.1")
+    def test_lockstep(self):
+        with self.assertRaises(ValueError):
+            VirtualClock(frame=0)
+        clock = VirtualClock(PaintEngine(Grid.DRAW_STYLE_SET, 8, 8), frame=0.1)
+        def script(window, sleep):
+            window.on_paint(black, 1, 1)
+            self.assertEqual(clock.engine.grid[1][1].stack_state(), ((), False)) #applied at the start of the next frame
+            sleep(0.25)
+            self.assertEqual(clock.frames, 3)
+            self.assertEqual(clock.engine.grid[1][1].stack_state(), ((black.index,), False))
+            for _ in range(5):
+                sleep(0.01)
+            self.assertEqual(clock.frames, 3)
+            sleep(0.05)
+            self.assertEqual(clock.frames, 4)
+            window.start_replay()
+        hashes = clock.run(script)
+        self.assertEqual(len(hashes), clock.frames)
+        self.assertTrue(clock.engine.enable_ui) #the replay was played to the end
+        self.assertAlmostEqual(clock.engine.timestamp, clock.now)
+        self.assertEqual(hashes[-1], hashes[3])
+        self.assertEqual(hashes[-1], frame_hash(clock.engine))
+
+    @number("23.2")
+    def test_scripts(self):
+        basic = load_script("visuals/basic.py")
+        first = VirtualClock().run(basic)
+        self.assertEqual(len(first), 241)
+        self.assertEqual(VirtualClock().run(basic), first)
+        clock = VirtualClock()
+        clock.run(basic)
+        self.assertEqual(clock.engine.grid.brush_size, 3)
+        self.assertEqual(clock.engine.grid[0][0].stack_state(), ((rainbow.index,), False)) #the last stamp
+        # The finished drawing doesn't depend on the frame rate.
+        script = load_script("visuals.complex")
+        self.assertEqual(VirtualClock(frame=0.05).run(script)[-1], VirtualClock(frame=1 / 30).run(script)[-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+"""
+Out-of-core grid for very large canvases.
+
+TiledGrid divides the canvas into square tiles. Every square has a fixed
+size slot in a memory-mapped file, and slots are laid out tile by tile so
+a tile is one contiguous run of the file. Only the tiles in an LRU cache
+are held as LayerStore objects; a tile is loaded from its slots when first
+touched, and written back when evicted if any square changed. Memory use
+is bounded by the cache size (plus any stacks too deep for a slot), not by
+the canvas size.
+
+A slot is one byte holding the layer count and the inverted flag, followed
+by up to `depth` layer indices, in stack_state() order. Deeper stacks are
+kept in an overflow dictionary instead.
+
+TiledGrid is a Grid, so painting, undo, replay and rendering all work
+through it unchanged. Whole-canvas loops go tile by tile, so each tile is
+loaded at most once per pass: rendering (Grid.render, render_packed and
+GridPixelBuffer.update) walks Grid.regions(), which TiledGrid yields one
+tile at a time, and special, reset and snapshot are overridden to do the
+same. Code that instead goes column by column over the whole canvas is
+still correct, but pages tiles in and out.
+"""
+
+from __future__ import annotations
+import mmap
+import tempfile
+from collections import OrderedDict
+
+from grid import Grid
+from layer_store import LayerStore
+
+class _TileColumn:
+    """Column x of a TiledGrid, as returned by grid[x]."""
+
+    __slots__ = ("grid", "x")
+
+    def __init__(self, grid: TiledGrid, x: int) -> None:
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y: int) -> LayerStore:
+        if not 0 <= y < self.grid.y:
+            raise IndexError(f"Square y={y} is outside the grid.")
+        size = self.grid.tile_size
+        return self.grid.tile(self.x // size, y // size)[self.x % size][y % size]
+
+    def __len__(self) -> int:
+        return self.grid.y
+
+class _TileColumns:
+    """Stands in for Grid.grid, so Grid methods indexing self.grid[x][y] go through the tile cache."""
+
+    __slots__ = ("grid",)
+
+    def __init__(self, grid: TiledGrid) -> None:
+        self.grid = grid
+
+    def __getitem__(self, x: int) -> _TileColumn:
+        if not 0 <= x < self.grid.x:
+            raise IndexError(f"Square x={x} is outside the grid.")
+        return _TileColumn(self.grid, x)
+
+    def __len__(self) -> int:
+        return self.grid.x
+
+class TiledGrid(Grid):
+    DEFAULT_TILE_SIZE = 32
+    DEFAULT_CACHE_TILES = 16
+    DEFAULT_DEPTH = 15
+    OVERFLOW = 0x7F #slot count meaning "look in self.overflow"
+    INVERTED = 0x80
+
+    def __init__(self, draw_style, x, y, path: str | None = None, tile_size: int = DEFAULT_TILE_SIZE,
+                 cache_tiles: int = DEFAULT_CACHE_TILES, depth: int = DEFAULT_DEPTH) -> None:
+        """
+        Initialise the TiledGrid object. No stores are created until squares are used.
+
+        Args:
+        - draw_style, x, y: as for Grid.
+        - path: file backing the slots, created or overwritten. By default an anonymous temporary file.
+        - tile_size: width and height of a tile, in squares.
+        - cache_tiles: tiles held in memory at once.
+        - depth: layers stored in a square's slot before it moves to the overflow dictionary.
+
+        Raises:
+        - ValueError: if a size is not positive, or depth is too large for a slot.
+
+        Complexity:
+        -Worst Case: O(1), the file is created sparse
+        -Best Case: O(1), the file is created sparse
+        """
+        if x <= 0 or y <= 0 or tile_size <= 0 or cache_tiles <= 0:
+            raise ValueError("Grid, tile and cache sizes should be positive.")
+        if not 0 < depth < self.OVERFLOW:
+            raise ValueError(f"Depth should be between 1 and {self.OVERFLOW - 1}.")
+        self.layer_choice = [None] * len(self.DRAW_STYLE_OPTIONS)
+        self.draw_style = draw_style
+        self.brush_size = self.DEFAULT_BRUSH_SIZE
+        self.x = x
+        self.y = y
+        self.store_pool = {}
+        self.store_class = self.identify_draw_style()
+        self.grid = _TileColumns(self)
+        self.tile_size = tile_size
+        self.cache_tiles = cache_tiles
+        self.depth = depth
+        self.slot = depth + 1
+        self.tiles_y = -(-y // tile_size)
+        self.tile_bytes = tile_size * tile_size * self.slot
+        size = -(-x // tile_size) * self.tiles_y * self.tile_bytes
+        self.file = open(path, "w+b") if path is not None else tempfile.TemporaryFile()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.cache = OrderedDict() #(tx, ty) -> tile, least recently used first
+        self.overflow = {} #(x, y) -> layers of stacks deeper than self.depth
+        self.free = [] #evicted tiles whose stores can be reused
+        self.loads = 0
+        self.writes = 0
+
+    def tile(self, tx: int, ty: int) -> list[list[LayerStore]]:
+        """
+        Returns tile (tx, ty) as columns of stores, loading it (and evicting
+        the least recently used tile) if it isn't cached.
+
+        Complexity:
+        -Worst Case: O(t*t*n), loading a tile of t*t squares of n layers, and writing one back
+        -Best Case: O(1), the tile is cached
+        """
+        key = (tx, ty)
+        tile = self.cache.get(key)
+        if tile is not None:
+            self.cache.move_to_end(key)
+            return tile
+        if len(self.cache) >= self.cache_tiles:
+            old_key, old = self.cache.popitem(last=False)
+            self._write_tile(old_key, old)
+            self.free.append(old)
+        tile = self._read_tile(key, self.free.pop() if self.free else None)
+        self.cache[key] = tile
+        return tile
+
+    def _offset(self, tx: int, ty: int) -> int:
+        return (tx * self.tiles_y + ty) * self.tile_bytes
+
+    def _read_tile(self, key: tuple[int, int], tile: list[list[LayerStore]] | None) -> list[list[LayerStore]]:
+        """Fill `tile` (or a new one) from the tile's slots."""
+        size, slot = self.tile_size, self.slot
+        if tile is None:
+            tile = [[self.store_class() for _ in range(size)] for _ in range(size)]
+        tx, ty = key
+        base = self._offset(tx, ty)
+        data = self.map[base:base + self.tile_bytes]
+        self.loads += 1
+        for lx in range(size):
+            column = tile[lx]
+            for ly in range(size):
+                p = (lx * size + ly) * slot
+                head = data[p]
+                if head == 0:
+                    column[ly].clear()
+                    continue
+                count = head & ~self.INVERTED
+                if count == self.OVERFLOW:
+                    layers = self.overflow[(tx * size + lx, ty * size + ly)]
+                else:
+                    layers = data[p + 1:p + 1 + count]
+                column[ly].restore_state(layers, bool(head & self.INVERTED))
+        return tile
+
+    def _write_tile(self, key: tuple[int, int], tile: list[list[LayerStore]]) -> None:
+        """Write the tile's stores back to its slots, if any changed."""
+        size, slot, depth = self.tile_size, self.slot, self.depth
+        tx, ty = key
+        data = bytearray(self.tile_bytes)
+        for lx in range(size):
+            column = tile[lx]
+            for ly in range(size):
+                layers, inverted = column[ly].stack_state()
+                p = (lx * size + ly) * slot
+                square = (tx * size + lx, ty * size + ly)
+                if len(layers) > depth:
+                    self.overflow[square] = layers
+                    count = self.OVERFLOW
+                else:
+                    if square in self.overflow:
+                        del self.overflow[square]
+                    count = len(layers)
+                    data[p + 1:p + 1 + count] = bytes(layers)
+                data[p] = count | (self.INVERTED if inverted else 0)
+        base = self._offset(tx, ty)
+        if self.map[base:base + self.tile_bytes] != data:
+            self.map[base:base + self.tile_bytes] = data
+            self.writes += 1
+
+    def _tiles(self):
+        """Every (tx, ty, square x range, square y range), in file order."""
+        size = self.tile_size
+        for tx in range(-(-self.x // size)):
+            for ty in range(self.tiles_y):
+                yield tx, ty, range(min(size, self.x - tx * size)), range(min(size, self.y - ty * size))
+
+    def regions(self):
+        """
+        Same as Grid.regions, one block per tile in file order,
+        so a whole-grid loop loads each tile once.
+
+        Complexity:
+        -Worst Case: O(x*y*n), loading every tile, spread over the iteration
+        -Best Case: O(x*y/(t*t)), every tile is cached
+        """
+        size = self.tile_size
+        for tx, ty, xs, ys in self._tiles():
+            yield tx * size, ty * size, self.tile(tx, ty), xs, ys
+
+    def flush(self) -> None:
+        """
+        Write every cached tile back to the file.
+
+        Complexity:
+        -Worst Case: O(c*t*t*n), c cached tiles of t*t squares of n layers
+        -Best Case: O(c*t*t), nothing stored
+        """
+        for key, tile in self.cache.items():
+            self._write_tile(key, tile)
+        self.map.flush()
+
+    def close(self) -> None:
+        """Write back the cached tiles and close the file."""
+        self.flush()
+        self.cache.clear()
+        self.free.clear()
+        self.map.close()
+        self.file.close()
+
+    def reset(self, draw_style=None):
+        """
+        Return the grid to its initial state, optionally switching draw style.
+        The file is emptied rather than every square being cleared.
+
+        Complexity:
+        -Worst Case: O(c*t*t), clearing the cached tiles
+        -Best Case: O(c*t*t), clearing the cached tiles
+        """
+        self.brush_size = self.DEFAULT_BRUSH_SIZE
+        if draw_style is not None and draw_style != self.draw_style:
+            self.draw_style = draw_style
+            self.store_class = self.identify_draw_style()
+            self.cache.clear() #stores of the old style can't be reused
+            self.free.clear()
+        size = len(self.map)
+        self.map.close()
+        self.file.truncate(0) #drops the old slots, leaving the file sparse again
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.overflow.clear()
+        for tile in self.cache.values():
+            for column in tile:
+                for store in column:
+                    store.clear()
+
+    def special(self):
+        """
+        Activate the special affect on all grid squares, one tile at a time.
+
+        Complexity:
+        -Worst Case: O(x*y*n), every square's special, plus loading and writing every tile
+        -Best Case: O(x*y), same as Grid.special
+        """
+        for tx, ty, xs, ys in self._tiles():
+            tile = self.tile(tx, ty)
+            for lx in xs:
+                column = tile[lx]
+                for ly in ys:
+                    column[ly].special()
+
+    def snapshot(self):
+        """
+        Same as Grid.snapshot, visiting the squares one tile at a time.
+
+        Complexity:
+        -Worst Case: O(x*y*n), same as Grid.snapshot plus loading every tile
+        -Best Case: O(x*y), every square is empty
+        """
+        states = {}
+        size = self.tile_size
+        for tx, ty, xs, ys in self._tiles():
+            tile = self.tile(tx, ty)
+            for lx in xs:
+                column = tile[lx]
+                for ly in ys:
+                    state = column[ly].stack_state()
+                    if state[0] or state[1]:
+                        states[(tx * size + lx, ty * size + ly)] = state
+        return self.draw_style, states
@@ -0,0 +1,168 @@
+"""
+Span tracing, exported as Chrome trace events.
+
+start() wraps the traced functions so each call records a span (start,
+duration, thread and a few attributes) into a TraceRing, and stop() puts
+the originals back, so tracing costs nothing while it is off. The ring
+holds the most recent spans only, so it can be left running through a
+long session and dumped after a stall to see what led up to it.
+
+Traced spans, with their attributes:
+- on_paint: layer, x, y, brush, cells (squares changed)
+- try_draw: x, y (MyWindow only, if window.py has been imported)
+- undo, redo: the UndoTracker's, with cells
+- replay_step: ReplayTracker.play_next_action, with finished
+- special: Grid.special, with cells
+- render: PaintEngine.render, with cells; frame: MyWindow.on_draw
+
+    ring = tracing.start()
+    ...
+    tracing.stop().dump("trace.json")   # open in https://ui.perfetto.dev
+"""
+
+from __future__ import annotations
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from engine import PaintEngine
+from grid import Grid
+from instrumentation import patches
+from replay import ReplayTracker
+from undo import UndoTracker
+
+class TraceRing:
+    CAPACITY = 1 << 16
+
+    def __init__(self, capacity: int = CAPACITY) -> None:
+        """
+        A fixed-size ring of (name, start ns, end ns, thread id, attributes) spans.
+
+        Recording takes no lock: a ticket from itertools.count and a list item
+        assignment are each atomic under the GIL, so threads recording at once
+        get different slots. Once full, each span overwrites the oldest one.
+
+        Raises:
+        - ValueError: if capacity isn't positive.
+
+        Complexity:
+        -Worst Case: O(c), allocating the c slots
+        -Best Case: O(c), allocating the c slots
+        """
+        if capacity <= 0:
+            raise ValueError("Ring should hold at least one span.")
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.tickets = itertools.count()
+        self.origin = time.perf_counter_ns() #trace timestamps are relative to this
+
+    def record(self, name: str, start: int, end: int, attributes: dict) -> None:
+        """Record a span, `start` and `end` being time.perf_counter_ns() values."""
+        self.slots[next(self.tickets) % self.capacity] = (name, start, end, threading.get_ident(), attributes)
+
+    def spans(self) -> list[tuple]:
+        """The spans still in the ring, oldest first."""
+        return sorted((span for span in self.slots if span is not None), key=lambda span: span[1])
+
+    def __len__(self) -> int:
+        return sum(1 for span in self.slots if span is not None)
+
+    def trace_events(self) -> dict:
+        """
+        The spans as a Chrome trace ("X" complete events, times in microseconds),
+        with the names of threads that are still running.
+
+        Complexity:
+        -Worst Case: O(c log c), sorting a full ring
+        -Best Case: O(c), an empty ring is still scanned
+        """
+        pid = os.getpid()
+        origin = self.origin
+        spans = self.spans()
+        events = [
+            {"name": name, "cat": "paint", "ph": "X", "ts": (start - origin) / 1000, "dur": (end - start) / 1000,
+             "pid": pid, "tid": tid, "args": attributes}
+            for name, start, end, tid, attributes in spans
+        ]
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for tid in sorted({span[3] for span in spans}):
+            if tid in names:
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": names[tid]}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str) -> None:
+        """Write the trace as JSON, for chrome://tracing or Perfetto."""
+        with open(path, "w") as file:
+            json.dump(self.trace_events(), file)
+
+_USER = "tracing"
+_active: TraceRing | None = None
+
+def _span(ring: TraceRing, name: str, describe, func):
+    """Wrap func to record a span, with attributes describe(args, result)."""
+    perf_counter_ns = time.perf_counter_ns
+    @functools.wraps(func)
+    def traced(*args, **kwargs):
+        start = perf_counter_ns()
+        result = func(*args, **kwargs)
+        ring.record(name, start, perf_counter_ns(), describe(args, result))
+        return result
+    return traced
+
+def _paint(args, result) -> dict:
+    engine = args[0]
+    replay = engine.ReplayTracker
+    cells = len(replay.recent(1)[0][0].steps) if len(replay.action) else 0 #on_paint just added its action
+    layer, x, y = args[1:4]
+    return {"layer": layer.name, "x": x, "y": y, "brush": engine.grid.brush_size, "cells": cells}
+
+def _render(args, result) -> dict:
+    grid = args[0].grid
+    return {"cells": grid.x * grid.y}
+
+def _history(args, action) -> dict:
+    return {"cells": len(action.steps) if action is not None else 0}
+
+def _special(args, result) -> dict:
+    grid = args[0]
+    return {"cells": grid.x * grid.y}
+
+def active() -> TraceRing | None:
+    """The ring being recorded into, or None when tracing is off."""
+    return _active
+
+def start(capacity: int = TraceRing.CAPACITY) -> TraceRing:
+    """
+    Start tracing into a new ring, returning it.
+    Already tracing, the ring being recorded into is returned as it is.
+    """
+    global _active
+    if _active is not None:
+        return _active
+    ring = TraceRing(capacity)
+    for owner, method, name, describe in (
+            (PaintEngine, "on_paint", "on_paint", _paint),
+            (PaintEngine, "render", "render", _render),
+            (UndoTracker, "undo", "undo", _history),
+            (UndoTracker, "redo", "redo", _history),
+            (ReplayTracker, "play_next_action", "replay_step", lambda args, finished: {"finished": finished}),
+            (Grid, "special", "special", _special)):
+        patches.patch(_USER, owner, method, functools.partial(_span, ring, name, describe))
+    window = sys.modules.get("window") #only trace the window if it's in use, importing it imports arcade
+    if window is not None:
+        patches.patch(_USER, window.MyWindow, "try_draw",
+                      functools.partial(_span, ring, "try_draw", lambda args, result: {"x": args[1], "y": args[2]}))
+        patches.patch(_USER, window.MyWindow, "on_draw", functools.partial(_span, ring, "frame", lambda args, result: {}))
+    _active = ring
+    return ring
+
+def stop() -> TraceRing | None:
+    """Stop tracing, restoring the original code. Returns the ring recorded into, if any."""
+    global _active
+    patches.restore(_USER)
+    ring, _active = _active, None
+    return ring
@@ -115,3 +115,66 @@ class UndoTracker:
         self.undo_stack.push(action) #push it to undo_stack
         return action
 
+    def history(self) -> tuple[list[PaintAction], list[PaintAction]]:
+        """
+        The actions that can be undone and redone, each list bottom of the stack first.
+
+        Args:
+        - None
+
+        Raises:
+        -None
+
+        Returns:
+        -(undo actions, redo actions)
+
+        Complexity:
+        -Worst Case: O(n), where n is the number of stacked actions
+        -Best Case: O(1), both stacks are empty
+        """
+        return ([self.undo_stack.array[i] for i in range(len(self.undo_stack))],
+                [self.redo_stack.array[i] for i in range(len(self.redo_stack))])
+
+    def restore(self, undo: list[PaintAction], redo: list[PaintAction]) -> None:
+        """
+        Replace both stacks with actions from history().
+
+        Args:
+        - undo, redo: the actions to stack, bottom first
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(n), where n is the number of actions
+        -Best Case: O(1), both lists are empty
+        """
+        self.clear()
+        for action in undo:
+            self.undo_stack.push(action)
+        for action in redo:
+            self.redo_stack.push(action)
+
+    def clear(self) -> None:
+        """
+        Forget every action, keeping the existing stacks.
+
+        Args:
+        - None
+
+        Raises:
+        -None
+
+        Returns:
+        -None
+
+        Complexity:
+        -Worst Case: O(1), clear() on ArrayStack only resets the length
+        -Best Case: O(1), clear() on ArrayStack only resets the length
+        """
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
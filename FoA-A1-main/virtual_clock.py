@@ -0,0 +1,133 @@
+"""
+Deterministic, headless driver for the visual test scripts.
+
+The scripts in visuals/ take the window and a `sleep` function: run_with_func
+runs them on a thread beside a real window, pacing them with time.sleep.
+VirtualClock instead runs a script on the calling thread against a
+PaintEngine, and its sleep() plays the frames that would have been drawn in
+that time by calling on_update with a fixed delta. The script and the frames
+advance in lockstep on a virtual clock, so nothing waits on real time, and
+every frame's render can be hashed and compared between runs.
+
+    python -m virtual_clock visuals/complex.py [--frame 0.0166] [--hashes] [--profile PATH] [--memprofile PATH]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import importlib
+import os
+import time
+from typing import Callable
+
+from command_queue import CommandProxy
+from engine import PaintEngine
+import profiling
+
+def frame_hash(engine: PaintEngine) -> str:
+    """A short digest of the engine's grid, rendered at its current timestamp."""
+    return hashlib.sha1(bytes(engine.render().pixels)).hexdigest()[:16]
+
+class VirtualClock:
+    FRAME = 1 / 60 #seconds per frame, arcade's default update rate
+
+    def __init__(self, engine: PaintEngine | None = None, frame: float = FRAME, hashes: bool = True) -> None:
+        """
+        Args:
+        - engine: the engine to drive, by default a new one with MyWindow's grid size.
+        - frame: the fixed delta passed to on_update, in seconds.
+        - hashes: whether to render and hash every frame into self.hashes.
+
+        Raises:
+        - ValueError: if frame isn't positive.
+
+        Complexity:
+        -Worst Case: O(x*y), building the default engine
+        -Best Case: O(1), an engine is given
+        """
+        if frame <= 0:
+            raise ValueError("Frames should last some time.")
+        self.engine = engine if engine is not None else PaintEngine()
+        self.frame = frame
+        self.frames = 0
+        self.scripted = 0.0 #total time the script has slept
+        self.hashes = [] if hashes else None
+
+    @property
+    def now(self) -> float:
+        """Virtual seconds since the clock started. Counted in frames, so it never drifts."""
+        return self.frames * self.frame
+
+    def step(self) -> None:
+        """
+        Play one frame: on_update with the fixed delta, then the render on_draw would show.
+
+        Complexity:
+        -Worst Case: O(c*m + comp + x*y*n), c queued commands, a replay step and a full render
+        -Best Case: O(1), nothing to do and no hashing
+        """
+        self.engine.on_update(self.frame)
+        self.frames += 1
+        if self.hashes is not None:
+            self.hashes.append(frame_hash(self.engine))
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Play the frames a window would draw while the script slept for `seconds`.
+        Sleeps are summed, so many short ones add up to the same frames as one long one.
+        """
+        self.scripted += seconds
+        while self.now < self.scripted - 1e-9:
+            self.step()
+
+    def run(self, script: Callable, settle: bool = True) -> list[str] | None:
+        """
+        Run `script(window, sleep=self.sleep)`, where `window` queues calls on the
+        engine as run_with_func's does, so they take effect at the start of the next frame.
+
+        Args:
+        - script: a function from visuals/, or anything taking the same arguments.
+        - settle: afterwards, keep playing frames until the queued calls have been
+                  applied and any replay has finished.
+
+        Returns:
+        - the frame hashes, if hashing.
+
+        Complexity:
+        -Worst Case: O(f*(x*y*n)), f frames played and hashed
+        -Best Case: O(1), nothing slept and nothing to settle
+        """
+        script(CommandProxy(self.engine.commands, self.engine), sleep=self.sleep)
+        if settle:
+            while len(self.engine.commands) or not self.engine.enable_ui:
+                self.step()
+        return self.hashes
+
+def load_script(path: str) -> Callable:
+    """The test_ function of a visuals/ script, given its path or module name."""
+    name = os.path.splitext(path)[0].replace(os.sep, ".") if path.endswith(".py") else path
+    module = importlib.import_module(name)
+    scripts = [value for key, value in vars(module).items() if key.startswith("test_") and callable(value)]
+    if len(scripts) != 1:
+        raise ValueError(f"Expected one test_ function in {path}, found {len(scripts)}.")
+    return scripts[0]
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description="Run a visual test script headless, on a virtual clock.")
+    p.add_argument("script", help="e.g. visuals/complex.py")
+    p.add_argument("--frame", help="Seconds per frame.", type=float, default=VirtualClock.FRAME)
+    p.add_argument("--hashes", help="Print every frame's hash.", action="store_true")
+    profiling.add_arguments(p)
+    args = p.parse_args(argv)
+    script = load_script(args.script)
+    start = time.perf_counter()
+    with profiling.profiled(args.profile, args.memprofile):
+        clock = VirtualClock(frame=args.frame)
+        hashes = clock.run(script)
+    elapsed = time.perf_counter() - start
+    if args.hashes:
+        print("\n".join(hashes))
+    print(f"{clock.frames} frames, {clock.now:.2f} virtual seconds in {elapsed * 1000:.0f} ms, final frame {hashes[-1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Interactive arcade front end for the paint engine.
+"""
+
+import arcade
+import arcade.key as keys
+from arcade.gl import geometry
+import math
+from engine import PaintEngine
+from grid import Grid
+from grid_renderer import merge_runs
+import layer_util
+from layer_util import get_layers, unpack_color
+from layers import lighten
+
+# The grid is drawn as one nearest-neighbour scaled texture, one texel per square.
+GRID_VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 uv;
+void main() {
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+    uv = in_uv;
+}
+"""
+GRID_FRAGMENT_SHADER = """
+#version 330
+uniform sampler2D grid_texture;
+in vec2 uv;
+out vec4 fragColor;
+void main() {
+    fragColor = vec4(texture(grid_texture, uv).rgb, 1.0);
+}
+"""
+
+_TEXTURE_CACHE: dict[str, arcade.Texture] = {}
+
+def load_button_texture(path: str) -> arcade.Texture:
+    """Load an image as a texture, only reading it from disk once per process."""
+    texture = _TEXTURE_CACHE.get(path)
+    if texture is None:
+        texture = _TEXTURE_CACHE[path] = arcade.load_texture(path)
+    return texture
+
+class MyWindow(arcade.Window, PaintEngine):
+    """ Painter Window """
+
+    SCREEN_WIDTH = 800
+    SCREEN_HEIGHT = 700
+    SIDEBAR_WIDTH = 100
+    BUTTONS_HEIGHT = 100
+    SCREEN_TITLE = "Paint"
+
+    GRID_SIZE_X = 32
+    GRID_SIZE_Y = 32
+
+    DRAW_MODE_IMAGES = {
+        Grid.DRAW_STYLE_SET: "img/on_off.png",
+        Grid.DRAW_STYLE_ADD: "img/additive.png",
+        Grid.DRAW_STYLE_SEQUENCE: "img/sequence.png",
+    }
+
+    # "texture": one texture for the whole grid.
+    # "shapes": merged solid rectangles in a retained ShapeElementList.
+    GRID_RENDERER = "texture"
+
+    BG = [255, 255, 255]
+
+    # SCAFFOLD PART
+    # Unless you're adding new features, you shouldn't need to touch this.
+
+    def __init__(self) -> None:
+        """Initialise visual and logic variables."""
+        arcade.Window.__init__(self, self.SCREEN_WIDTH, self.SCREEN_HEIGHT, self.SCREEN_TITLE)
+        arcade.set_background_color(self.BG)
+        self.z_pressed = False
+        self.y_pressed = False
+        self.z_timer = 0
+        self.y_timer = 0
+        self.sidebar_key = None
+        self.action_buttons = None
+        self.sidebar_labels = []
+        self.stats_overlay = None #instrumentation overlay text, toggled with F3
+        self.draw_calls = 0 #draw calls made by the last on_draw, counted as they are made
+        self.setup_grid_renderer()
+        PaintEngine.__init__(self, Grid.DRAW_STYLE_SET, self.GRID_SIZE_X, self.GRID_SIZE_Y)
+
+    def setup_grid_renderer(self) -> None:
+        """Create the GPU objects used to draw the grid."""
+        self.grid_shapes = arcade.ShapeElementList()
+        if self.GRID_RENDERER != "texture":
+            return
+        self.grid_texture = self.ctx.texture(
+            (self.GRID_SIZE_X, self.GRID_SIZE_Y),
+            components=3,
+            filter=(self.ctx.NEAREST, self.ctx.NEAREST),
+        )
+        self.grid_program = self.ctx.program(
+            vertex_shader=GRID_VERTEX_SHADER,
+            fragment_shader=GRID_FRAGMENT_SHADER,
+        )
+        self.grid_program["grid_texture"] = 0
+        # Normalised device coordinates of the drawing panel (left of the sidebar).
+        panel_width = 2 * (self.SCREEN_WIDTH - self.SIDEBAR_WIDTH) / self.SCREEN_WIDTH
+        self.grid_quad = geometry.quad_2d(size=(panel_width, 2), pos=(panel_width / 2 - 1, 0))
+
+    def reset(self) -> None:
+        """Reset the screen."""
+        self.selected_layer_index = -1
+        self.dragging = None
+        self.prev_drawn = None
+        self.prev_pos = None
+        self.draw_size = 2
+
+        # Visual calculations
+        self.DRAW_PANEL = self.SCREEN_WIDTH - self.SIDEBAR_WIDTH
+        self.GRID_SQ_WIDTH = self.DRAW_PANEL / self.GRID_SIZE_X
+        self.GRID_SQ_HEIGHT = self.SCREEN_HEIGHT / self.GRID_SIZE_Y
+        self.LAYER_BUTTON_SIZE = self.SIDEBAR_WIDTH / 2
+        # Action button sprites
+        if self.action_buttons is None:
+            self.build_action_buttons()
+        self.draw_mode_button.texture = load_button_texture(self.DRAW_MODE_IMAGES[self.draw_style])
+
+        PaintEngine.reset(self)
+
+    def build_action_buttons(self) -> None:
+        """Create the action button sprites. Only the draw mode icon changes after this."""
+        self.action_buttons = arcade.SpriteList()
+        self.draw_mode_button = arcade.Sprite(
+            texture=load_button_texture(self.DRAW_MODE_IMAGES[self.draw_style]),
+            scale=50/48,
+        )
+        self.draw_mode_button.center_x = self.DRAW_PANEL + self.LAYER_BUTTON_SIZE / 2
+        self.draw_mode_button.center_y = self.LAYER_BUTTON_SIZE / 2
+        self.action_buttons.append(self.draw_mode_button)
+        self.replay_button = arcade.Sprite(
+            texture=load_button_texture("img/replay.png"),
+            scale=50/48,
+        )
+        self.replay_button.center_x = self.DRAW_PANEL + 3 * self.LAYER_BUTTON_SIZE / 2
+        self.replay_button.center_y = self.LAYER_BUTTON_SIZE / 2
+        self.action_buttons.append(self.replay_button)
+        self.brush_big_button = arcade.Sprite(
+            texture=load_button_texture("img/brush_up.png"),
+            scale=50/48,
+        )
+        self.brush_big_button.center_x = self.DRAW_PANEL + self.LAYER_BUTTON_SIZE / 2
+        self.brush_big_button.center_y = 3 * self.LAYER_BUTTON_SIZE / 2
+        self.action_buttons.append(self.brush_big_button)
+        self.brush_small_button = arcade.Sprite(
+            texture=load_button_texture("img/brush_down.png"),
+            scale=50/48,
+        )
+        self.brush_small_button.center_x = self.DRAW_PANEL + 3 * self.LAYER_BUTTON_SIZE / 2
+        self.brush_small_button.center_y = 3 * self.LAYER_BUTTON_SIZE / 2
+        self.action_buttons.append(self.brush_small_button)
+        self.special_button = arcade.Sprite(
+            texture=load_button_texture("img/special.png"),
+            scale=50/48,
+        )
+        self.special_button.center_x = self.DRAW_PANEL + self.LAYER_BUTTON_SIZE / 2
+        self.special_button.center_y = 5 * self.LAYER_BUTTON_SIZE / 2
+        self.action_buttons.append(self.special_button)
+
+    def setup(self) -> None:
+        """Set up the game and initialize the variables."""
+        self.reset()
+
+    def on_draw(self) -> None:
+        """Draw everything"""
+        self.clear()
+        self.draw_calls = 0
+        # UI - Layers
+        self.draw_sidebar()
+        # UI - Draw Modes / Action buttons
+        self.action_buttons.draw()
+        self.draw_calls += 1
+        # Grid
+        self.draw_grid()
+        if self.stats_overlay is not None:
+            self.draw_stats_overlay()
+
+    def toggle_stats_overlay(self) -> None:
+        """Show per-frame timings and counters over the grid, instrumenting the hot paths while it is shown."""
+        import instrumentation
+        if self.stats_overlay is None:
+            instrumentation.enable()
+            self.stats_overlay = arcade.Text(
+                "", 8, self.SCREEN_HEIGHT - 8, (0, 0, 0), 10, width=320, multiline=True, font_name="Courier New", anchor_y="top",
+            )
+            self.stats_overlay_frame = -1
+        else:
+            instrumentation.disable()
+            self.stats_overlay = None
+
+    def draw_stats_overlay(self) -> None:
+        """Draw the overlay, refreshing its text twice a second rather than every frame."""
+        import instrumentation
+        stats = instrumentation.enabled()
+        if stats is None: #disabled elsewhere
+            self.stats_overlay = None
+            return
+        if stats.frame_count - self.stats_overlay_frame >= 30:
+            self.stats_overlay_frame = stats.frame_count
+            self.stats_overlay.text = stats.report()
+        self.stats_overlay.draw()
+        self.draw_calls += 1
+
+    def draw_sidebar(self) -> None:
+        """Draw the layer buttons, rebuilding them only when their look has changed."""
+        key = (self.selected_layer_index, self.enable_ui, layer_util.cur_layer_index)
+        if key != self.sidebar_key:
+            self.build_sidebar(rebuild_labels=self.sidebar_key is None or key[2] != self.sidebar_key[2])
+            self.sidebar_key = key
+        self.sidebar_shapes.draw()
+        self.draw_calls += 1
+        for label in self.sidebar_labels:
+            label.draw()
+            self.draw_calls += 1
+
+    def build_sidebar(self, rebuild_labels: bool = True) -> None:
+        """Build the retained shapes (and optionally labels) for the layer buttons."""
+        self.sidebar_shapes = arcade.ShapeElementList()
+        if rebuild_labels:
+            self.sidebar_labels = []
+        for i, layer in enumerate(get_layers()):
+            if layer is None: break
+            xstart = (i % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            xend = ((i % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = self.SCREEN_HEIGHT - (i//2) * self.LAYER_BUTTON_SIZE
+            yend = self.SCREEN_HEIGHT - (i//2+1) * self.LAYER_BUTTON_SIZE
+            bg = lighten.apply(layer.bg or self.BG[:], 0, 0, 0) if self.selected_layer_index == i else (layer.bg or self.BG[:])
+            if not self.enable_ui:
+                bg = lighten.apply(bg, 0, 0, 0)
+            center_x, center_y = (xstart+xend)/2, (ystart+yend)/2
+            self.sidebar_shapes.append(arcade.create_rectangle_filled(
+                center_x, center_y, xend-xstart, ystart-yend, bg,
+            ))
+            self.sidebar_shapes.append(arcade.create_rectangle_outline(
+                center_x, center_y, xend-xstart, ystart-yend, (0, 0, 0), border_width=1,
+            ))
+            if rebuild_labels:
+                self.sidebar_labels.append(arcade.Text(
+                    str(i), xstart, center_y, (0, 0, 0), 18, width=int(xend-xstart), align="center", bold=True, anchor_y="center",
+                ))
+
+    def draw_grid(self) -> None:
+        """Draw the grid with a single draw call, uploading only the squares that changed."""
+        self.render()
+        dirty = self.grid_pixels.take_dirty()
+        if self.GRID_RENDERER == "shapes":
+            if dirty is not None:
+                self.build_grid_shapes()
+            self.grid_shapes.draw()
+            self.draw_calls += 1
+            return
+        if dirty is not None:
+            x0, y0, x1, y1 = dirty
+            self.grid_texture.write(self.grid_pixels.region(dirty), viewport=(x0, y0, x1 - x0, y1 - y0))
+        self.grid_texture.use(0)
+        self.grid_quad.render(self.grid_program)
+        self.draw_calls += 1
+
+    def build_grid_shapes(self) -> None:
+        """Rebuild the retained grid shapes, one rectangle per run of identical colour."""
+        self.grid_shapes = arcade.ShapeElementList()
+        for x0, y0, x1, y1, color in merge_runs(self.grid_pixels.colors, self.GRID_SIZE_X, self.GRID_SIZE_Y):
+            self.grid_shapes.append(arcade.create_rectangle_filled(
+                self.GRID_SQ_WIDTH * (x0 + x1) / 2,
+                self.GRID_SQ_HEIGHT * (y0 + y1) / 2,
+                self.GRID_SQ_WIDTH * (x1 - x0),
+                self.GRID_SQ_HEIGHT * (y1 - y0),
+                unpack_color(color),
+            ))
+
+    def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
+        """Called when the mouse buttons are pressed."""
+        if x > self.DRAW_PANEL:
+            if not self.enable_ui:
+                return
+            # Buttons
+            for i, layer in enumerate(get_layers()):
+                if layer is None: break
+                xstart = (i % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+                xend = ((i % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+                ystart = self.SCREEN_HEIGHT - (i//2) * self.LAYER_BUTTON_SIZE
+                yend = self.SCREEN_HEIGHT - (i//2+1) * self.LAYER_BUTTON_SIZE
+                if xstart <= x < xend and yend <= y < ystart:
+                    self.selected_layer_index = i
+                    break
+            # Actions
+            xstart = self.DRAW_PANEL
+            xend = self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = self.LAYER_BUTTON_SIZE
+            yend = 0
+            if xstart <= x < xend and yend <= y < ystart:
+                self.change_draw_mode()
+            xstart = self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            xend = 2 * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = self.LAYER_BUTTON_SIZE
+            yend = 0
+            if xstart <= x < xend and yend <= y < ystart:
+                self.start_replay()
+            xstart = self.DRAW_PANEL
+            xend = self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = 2 * self.LAYER_BUTTON_SIZE
+            yend = self.LAYER_BUTTON_SIZE
+            if xstart <= x < xend and yend <= y < ystart:
+                self.on_increase_brush_size()
+            xstart = self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            xend = 2 * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = 2 * self.LAYER_BUTTON_SIZE
+            yend = self.LAYER_BUTTON_SIZE
+            if xstart <= x < xend and yend <= y < ystart:
+                self.on_decrease_brush_size()
+            xstart = self.DRAW_PANEL
+            xend = 1 * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = 3 * self.LAYER_BUTTON_SIZE
+            yend = 2 * self.LAYER_BUTTON_SIZE
+            if xstart <= x < xend and yend <= y < ystart:
+                self.on_special()
+        else:
+            self.dragging = True
+            self.try_draw(x, y)
+
+    def on_mouse_release(self, x: int, y: int, button: int, modifiers: int):
+        """Called when the mouse buttons are released."""
+        self.dragging = False
+        self.prev_drawn = None
+        self.prev_pos = None
+
+    def on_mouse_motion(self, x, y, dx, dy) -> None:
+        """Called when the mouse moves."""
+        if not self.dragging:
+            return
+        if not(0 <= self.selected_layer_index < len(get_layers())):
+            return
+        if x > self.DRAW_PANEL:
+            return
+        self.try_draw(x, y)
+
+    def on_key_press(self, symbol: int, modifiers: int) -> None:
+        """Called when a keyboard key is pressed."""
+        if symbol == keys.F3:
+            self.toggle_stats_overlay()
+            return
+        if not self.enable_ui:
+            return
+        self.z_pressed = keys.Z == symbol and (modifiers & keys.MOD_CTRL)
+        self.y_pressed = keys.Y == symbol and (modifiers & keys.MOD_CTRL)
+        if self.z_pressed:
+            self.on_undo()
+            self.z_timer = 0.5
+        if self.y_pressed:
+            self.on_redo()
+            self.y_timer = 0.5
+
+    def on_key_release(self, symbol: int, modifiers: int) -> None:
+        """Called when a keyboard key is released."""
+        self.z_pressed = False
+        self.y_pressed = False
+
+    def try_draw(self, x, y) -> None:
+        """Attempt to draw at a position, but safely fail if an invalid square."""
+        if self.selected_layer_index == -1:
+            return
+        layer = get_layers()[self.selected_layer_index]
+        if self.prev_pos is not None:
+            # Try draw in increments of 0.5 to avoid skipping squares.
+            mhat_dist = abs(x - self.prev_pos[0]) + abs(y - self.prev_pos[1])
+            increment = 0.5
+            points_to_draw = []
+            for d in range(1, math.ceil(mhat_dist/increment)+1):
+                distance = min(d * increment / mhat_dist, 1)
+                nx = distance * (x - self.prev_pos[0]) + self.prev_pos[0]
+                ny = distance * (y - self.prev_pos[1]) + self.prev_pos[1]
+                nx_pos = int(nx // self.GRID_SQ_WIDTH)
+                ny_pos = int(ny // self.GRID_SQ_HEIGHT)
+                points_to_draw.append((nx_pos, ny_pos))
+        else:
+            x_pos = int(x // self.GRID_SQ_WIDTH)
+            y_pos = int(y // self.GRID_SQ_HEIGHT)
+            points_to_draw = [
+                (x_pos, y_pos)
+            ]
+        for px, py in points_to_draw:
+            if self.prev_drawn is None or (px, py) != self.prev_drawn:
+                if 0 <= px < self.GRID_SIZE_X and 0 <= py < self.GRID_SIZE_Y:
+                    self.on_paint(layer, px, py)
+                    self.prev_drawn = (px, py)
+        self.prev_pos = (x, y)
+
+    def on_update(self, delta_time) -> None:
+        """Movement and game logic."""
+        PaintEngine.on_update(self, delta_time) #arcade.Window comes first in the MRO, so call it explicitly
+
+    def update_input(self, delta_time) -> None:
+        """Holding ctrl+z or ctrl+y repeats the undo or redo."""
+        if self.z_pressed:
+            self.z_timer -= delta_time
+            if self.z_timer <= 0:
+                self.on_undo()
+                self.z_timer += 0.05
+        if self.y_pressed:
+            self.y_timer -= delta_time
+            if self.y_timer <= 0:
+                self.on_redo()
+                self.y_timer += 0.05